@@ -6,6 +6,7 @@ from sqlalchemy import pool
 from alembic import context
 from app.models.user_models import Base
 from app.models.quiz_models import *
+from app.models.rate_limit_models import *
 from app.settings.config import settings
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,33 @@
+"""users email prefix index
+
+Revision ID: 5c1e9b7d2a40
+Revises: 8eae666f4506
+Create Date: 2026-10-18 23:02:44.170518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e9b7d2a40'
+down_revision: Union[str, Sequence[str], None] = '8eae666f4506'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_users_email_prefix',
+        'users',
+        [sa.text('lower(email) text_pattern_ops')],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_email_prefix', table_name='users')
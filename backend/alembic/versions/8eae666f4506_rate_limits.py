@@ -0,0 +1,32 @@
+"""rate limits
+
+Revision ID: 8eae666f4506
+Revises: eb0300b737dc
+Create Date: 2026-10-18 22:41:27.903615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8eae666f4506'
+down_revision: Union[str, Sequence[str], None] = 'eb0300b737dc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('rate_limits',
+    sa.Column('bucket', sa.String(), nullable=False),
+    sa.Column('tat', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('bucket')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('rate_limits')
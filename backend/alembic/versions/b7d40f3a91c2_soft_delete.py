@@ -0,0 +1,42 @@
+"""soft delete
+
+Revision ID: b7d40f3a91c2
+Revises: 5c1e9b7d2a40
+Create Date: 2026-10-18 23:31:09.662871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d40f3a91c2'
+down_revision: Union[str, Sequence[str], None] = '5c1e9b7d2a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('deleted_at', sa.TIMESTAMP(timezone=True), nullable=True))
+    op.add_column('quizzes', sa.Column('deleted_at', sa.TIMESTAMP(timezone=True), nullable=True))
+    op.create_index('ix_users_deleted_at', 'users', ['deleted_at'], unique=False, postgresql_where=sa.text('deleted_at IS NOT NULL'))
+    op.create_index('ix_quizzes_deleted_at', 'quizzes', ['deleted_at'], unique=False, postgresql_where=sa.text('deleted_at IS NOT NULL'))
+    # Foreign keys already cascade on delete; these indexes keep the cascades and
+    # the batched purge from scanning whole child tables.
+    op.create_index(op.f('ix_quizzes_owner_id'), 'quizzes', ['owner_id'], unique=False)
+    op.create_index(op.f('ix_questions_quiz_id'), 'questions', ['quiz_id'], unique=False)
+    op.create_index(op.f('ix_favourites_quiz_id'), 'favourites', ['quiz_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_favourites_quiz_id'), table_name='favourites')
+    op.drop_index(op.f('ix_questions_quiz_id'), table_name='questions')
+    op.drop_index(op.f('ix_quizzes_owner_id'), table_name='quizzes')
+    op.drop_index('ix_quizzes_deleted_at', table_name='quizzes', postgresql_where=sa.text('deleted_at IS NOT NULL'))
+    op.drop_index('ix_users_deleted_at', table_name='users', postgresql_where=sa.text('deleted_at IS NOT NULL'))
+    op.drop_column('quizzes', 'deleted_at')
+    op.drop_column('users', 'deleted_at')
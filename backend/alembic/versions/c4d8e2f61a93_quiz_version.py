@@ -0,0 +1,28 @@
+"""quiz version
+
+Revision ID: c4d8e2f61a93
+Revises: b7d40f3a91c2
+Create Date: 2026-10-18 23:41:27.308164
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d8e2f61a93'
+down_revision: Union[str, Sequence[str], None] = 'b7d40f3a91c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('quizzes', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('quizzes', 'version')
@@ -0,0 +1,99 @@
+"""answers jsonb
+
+Revision ID: e3fa1d809635
+Revises: a61530c835ad
+Create Date: 2026-10-18 22:10:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3fa1d809635'
+down_revision: Union[str, Sequence[str], None] = 'a61530c835ad'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('questions', sa.Column('answers_options', postgresql.JSONB(), nullable=True))
+
+    # Answers used to be {"1": "...", "2": "..."} objects, sometimes double encoded
+    # as a JSON string. Store them as an array ordered by key and renumber
+    # correct_answer to the 1-based position of its option.
+    op.execute("""
+        WITH documents AS (
+            SELECT id,
+                   correct_answer,
+                   CASE WHEN json_typeof(answers) = 'string'
+                        THEN (answers #>> '{}')::jsonb
+                        ELSE answers::jsonb
+                   END AS doc
+            FROM questions
+        ),
+        options AS (
+            SELECT d.id,
+                   d.correct_answer,
+                   e.key,
+                   e.value,
+                   row_number() OVER (
+                       PARTITION BY d.id
+                       ORDER BY CASE WHEN e.key ~ '^[0-9]+$' THEN e.key::int END, e.key
+                   ) AS position
+            FROM documents d, jsonb_each(d.doc) e
+            WHERE jsonb_typeof(d.doc) = 'object'
+        ),
+        canonical AS (
+            SELECT id,
+                   jsonb_agg(value ORDER BY position) AS answers,
+                   max(position) FILTER (WHERE key = correct_answer) AS correct_position
+            FROM options
+            GROUP BY id
+        )
+        UPDATE questions q
+        SET answers_options = c.answers,
+            correct_answer = COALESCE(c.correct_position::text, q.correct_answer)
+        FROM canonical c
+        WHERE q.id = c.id
+    """)
+    op.execute("""
+        UPDATE questions
+        SET answers_options = CASE WHEN json_typeof(answers) = 'string'
+                                   THEN (answers #>> '{}')::jsonb
+                                   ELSE answers::jsonb
+                              END
+        WHERE answers_options IS NULL
+    """)
+
+    op.drop_column('questions', 'answers')
+    op.alter_column('questions', 'answers_options', new_column_name='answers', nullable=False)
+    op.create_index(
+        'ix_questions_answers',
+        'questions',
+        ['answers'],
+        postgresql_using='gin',
+        postgresql_ops={'answers': 'jsonb_path_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_questions_answers', table_name='questions')
+    op.add_column('questions', sa.Column('answers_object', sa.JSON(), nullable=True))
+    op.execute("""
+        UPDATE questions
+        SET answers_object = CASE WHEN jsonb_typeof(answers) = 'array'
+            THEN (
+                SELECT json_object_agg(position::text, value ORDER BY position)
+                FROM jsonb_array_elements(answers) WITH ORDINALITY AS e(value, position)
+            )
+            ELSE answers::json
+        END
+    """)
+    op.drop_column('questions', 'answers')
+    op.alter_column('questions', 'answers_object', new_column_name='answers', nullable=False)
@@ -0,0 +1,28 @@
+"""user token version
+
+Revision ID: eb0300b737dc
+Revises: e3fa1d809635
+Create Date: 2026-10-18 22:18:02.514937
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'eb0300b737dc'
+down_revision: Union[str, Sequence[str], None] = 'e3fa1d809635'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'token_version')
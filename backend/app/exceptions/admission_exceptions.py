@@ -0,0 +1,4 @@
+class CapacityExceededException(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Capacity exceeded, retry after {retry_after}s")
+        self.retry_after = retry_after
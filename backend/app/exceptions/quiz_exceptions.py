@@ -14,4 +14,10 @@ class QuestionsNotFoundException(Exception):
     pass
 
 class ActionAlreadyDoneException(Exception):
-    pass
\ No newline at end of file
+    pass
+
+class InvalidFieldsException(Exception):
+    pass
+
+class ImportingQuizException(Exception):
+    pass
@@ -0,0 +1,110 @@
+import argparse
+import asyncio
+import json
+import sys
+
+from app.loadtest.runner import LoadTest, parse_rates
+from app.loadtest.scenarios import DEFAULT_RATES, SCENARIOS
+from app.loadtest.stats import compare_reports, format_comparison, regressions
+
+
+def run(args):
+    rates = parse_rates(args.rate, {} if args.only else DEFAULT_RATES)
+    if not rates:
+        sys.exit("No scenario has a rate above zero")
+
+    load_test = LoadTest(
+        args.base_url,
+        rates,
+        args.duration,
+        warmup=args.warmup,
+        users=args.users,
+        seed_quizzes=args.seed_quizzes,
+        max_in_flight=args.max_in_flight,
+        timeout=args.timeout,
+    )
+    report = asyncio.run(load_test.run())
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    total = report["total"]
+    print(
+        f"{total['requests']} requests, {total['throughput_rps']} req/s, "
+        f"p50 {total['latency_ms']['p50']}ms, p95 {total['latency_ms']['p95']}ms, "
+        f"p99 {total['latency_ms']['p99']}ms, {total['errors']} errors",
+        file=sys.stderr,
+    )
+    for name, stats in report["scenarios"].items():
+        print(
+            f"{name}: {stats['completed']} completed, {stats['failed']} failed, "
+            f"{stats['dropped']} dropped",
+            file=sys.stderr,
+        )
+    print(f"Report written to {args.output}", file=sys.stderr)
+
+
+def compare(args):
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+
+    rows = compare_reports(base, head)
+    print(format_comparison(rows))
+
+    if args.max_p95_increase is not None:
+        slower = regressions(rows, "p95", args.max_p95_increase)
+        if slower:
+            sys.exit(f"p95 grew by more than {args.max_p95_increase}%: {slower}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m app.loadtest",
+        description="Drive a running API with scripted user scenarios",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run a load test, write a report")
+    run_parser.add_argument("--base-url", default="http://localhost:7000")
+    run_parser.add_argument(
+        "--rate",
+        action="append",
+        default=[],
+        metavar="SCENARIO=PER_SECOND",
+        help=f"arrival rate of a scenario, one of {', '.join(SCENARIOS)}; "
+        f"0 disables it (defaults: {DEFAULT_RATES})",
+    )
+    run_parser.add_argument(
+        "--only", action="store_true", help="run only the scenarios given with --rate"
+    )
+    run_parser.add_argument("--duration", type=float, default=60, help="seconds")
+    run_parser.add_argument(
+        "--warmup", type=float, default=10, help="seconds of load not measured"
+    )
+    run_parser.add_argument("--users", type=int, default=20)
+    run_parser.add_argument(
+        "--seed-quizzes",
+        type=int,
+        default=50,
+        help="import quizzes until the catalogue has at least this many",
+    )
+    run_parser.add_argument("--max-in-flight", type=int, default=500)
+    run_parser.add_argument("--timeout", type=float, default=60)
+    run_parser.add_argument("-o", "--output", default="loadtest-report.json")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser("compare", help="compare two reports")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("head")
+    compare_parser.add_argument(
+        "--max-p95-increase",
+        type=float,
+        metavar="PERCENT",
+        help="exit with an error when a route's p95 grew by more than this",
+    )
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    args.handler(args)
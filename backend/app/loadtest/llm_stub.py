@@ -0,0 +1,59 @@
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import uuid
+
+from fastapi import Body, FastAPI
+
+# Stands in for the OpenAI compatible completion API during load tests:
+#   uvicorn app.loadtest.llm_stub:app --port 8001
+# and run the API with LLM_BASE_URL=http://localhost:8001/
+LATENCY_SECONDS = float(os.environ.get("LLM_STUB_LATENCY_MS", "2000")) / 1000
+JITTER_SECONDS = float(os.environ.get("LLM_STUB_JITTER_MS", "500")) / 1000
+QUESTION_COUNT = re.compile(r"EXACTLY (\d+) quiz questions")
+
+app = FastAPI(title="LLM stub")
+
+
+def fake_questions(count: int) -> list:
+    return [
+        {
+            "Q": f"Which statement about the text is true ({i})?",
+            "A": {str(n): f"Statement {n}" for n in range(1, 5)},
+            "C": str(random.randint(1, 4)),
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+@app.post("/chat/completions")
+async def chat_completions(request: dict = Body(...)):
+    prompt = request["messages"][-1]["content"]
+    match = QUESTION_COUNT.search(prompt)
+    content = json.dumps(fake_questions(int(match.group(1)) if match else 5))
+
+    await asyncio.sleep(max(0.0, random.gauss(LATENCY_SECONDS, JITTER_SECONDS)))
+
+    prompt_tokens = sum(len(m["content"]) for m in request["messages"]) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "stub"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
@@ -0,0 +1,153 @@
+import asyncio
+import random
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from app.loadtest.scenarios import (
+    SCENARIOS,
+    Catalogue,
+    ScenarioFailed,
+    VirtualUser,
+    seed_quizzes,
+)
+from app.loadtest.stats import Recorder, build_report
+
+
+def parse_rates(values: List[str], defaults: Dict[str, float]) -> Dict[str, float]:
+    rates = dict(defaults)
+    for value in values:
+        name, _, rate = value.partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(
+                f"Unknown scenario {name!r}, choose from {list(SCENARIOS)}"
+            )
+        rates[name] = float(rate)
+    return {name: rate for name, rate in rates.items() if rate > 0}
+
+
+class LoadTest:
+    """Open model load: scenario arrivals are a Poisson process per scenario.
+
+    New arrivals do not wait for earlier ones, so a slow server shows up as
+    latency instead of a lower request rate. Arrivals beyond max_in_flight
+    are dropped and counted rather than queued in the client.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        rates: Dict[str, float],
+        duration: float,
+        warmup: float = 0,
+        users: int = 20,
+        seed_quizzes: int = 50,
+        max_in_flight: int = 500,
+        timeout: float = 60,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.base_url = base_url
+        self.rates = rates
+        self.duration = duration
+        self.warmup = warmup
+        self.users_count = users
+        self.seed_quizzes = seed_quizzes
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.transport = transport
+        self.recorder = Recorder()
+        self.catalogue = Catalogue()
+        self.in_flight = 0
+        self.tasks = set()
+
+    def config(self) -> dict:
+        return {
+            "base_url": self.base_url,
+            "rates": self.rates,
+            "duration_seconds": self.duration,
+            "warmup_seconds": self.warmup,
+            "users": self.users_count,
+            "seed_quizzes": self.seed_quizzes,
+            "max_in_flight": self.max_in_flight,
+        }
+
+    async def set_up(self, client: httpx.AsyncClient) -> List[VirtualUser]:
+        users = [
+            VirtualUser(client, self.recorder, f"loadtest-{i}@example.com")
+            for i in range(self.users_count)
+        ]
+        for user in users:
+            await user.sign_up()
+            await user.log_in()
+
+        response = await users[0].request(
+            "GET", "/quizzes", params={"limit": self.seed_quizzes}
+        )
+        existing = response.json()["items"]
+        self.catalogue.add(quiz["id"] for quiz in existing)
+        await seed_quizzes(
+            users[0], self.catalogue, max(0, self.seed_quizzes - len(existing))
+        )
+        return users
+
+    async def run_scenario(self, name: str, user: VirtualUser):
+        stats = self.recorder.scenario(name)
+        stats.started += 1
+        try:
+            await SCENARIOS[name](user, self.catalogue)
+            stats.completed += 1
+        except ScenarioFailed as e:
+            stats.failed += 1
+            stats.failures[str(e)] += 1
+        except Exception as e:
+            stats.failed += 1
+            stats.failures[type(e).__name__] += 1
+        finally:
+            self.in_flight -= 1
+
+    async def arrivals(self, name: str, rate: float, users: List[VirtualUser]):
+        deadline = time.monotonic() + self.warmup + self.duration
+        next_arrival = time.monotonic()
+        while True:
+            next_arrival += random.expovariate(rate)
+            if next_arrival >= deadline:
+                return
+            await asyncio.sleep(max(0.0, next_arrival - time.monotonic()))
+
+            if self.in_flight >= self.max_in_flight:
+                self.recorder.scenario(name).dropped += 1
+                continue
+            self.in_flight += 1
+            task = asyncio.create_task(self.run_scenario(name, random.choice(users)))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def start_recording(self):
+        if self.warmup:
+            await asyncio.sleep(self.warmup)
+        # Counts from the warm-up are discarded along with its latencies.
+        self.recorder.scenarios.clear()
+        self.recorder.recording = True
+
+    async def run(self) -> dict:
+        limits = httpx.Limits(max_connections=self.max_in_flight)
+        async with httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=self.timeout,
+            limits=limits,
+            transport=self.transport,
+        ) as client:
+            users = await self.set_up(client)
+
+            await asyncio.gather(
+                self.start_recording(),
+                *(
+                    self.arrivals(name, rate, users)
+                    for name, rate in self.rates.items()
+                ),
+            )
+            # Scenarios still running at the deadline are part of the run.
+            await asyncio.gather(*self.tasks)
+
+        return build_report(self.recorder, self.duration, self.config())
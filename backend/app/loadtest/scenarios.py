@@ -0,0 +1,235 @@
+import json
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from app.loadtest.stats import Recorder
+
+PASSWORD = "loadtest-password"
+SEARCH_TERMS = ("history", "biology", "physics", "europe", "cells", "energy", "war")
+TOPIC_SENTENCES = (
+    "The French Revolution began in 1789 and reshaped politics across Europe.",
+    "Mitochondria produce most of the chemical energy used by the cell.",
+    "Energy is conserved in a closed system, it only changes its form.",
+    "The Treaty of Versailles ended the First World War in 1919.",
+    "Photosynthesis turns light, water and carbon dioxide into glucose.",
+    "Newton's second law relates force, mass and acceleration.",
+)
+
+
+class ScenarioFailed(Exception):
+    pass
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, email: str):
+        self.client = client
+        self.recorder = recorder
+        self.email = email
+        self.token: Optional[str] = None
+
+    async def request(
+        self,
+        method: str,
+        route: str,
+        url: Optional[str] = None,
+        expect=(200,),
+        **kwargs,
+    ) -> httpx.Response:
+        if self.token is not None:
+            kwargs["headers"] = {"Authorization": f"Bearer {self.token}"}
+
+        recording = self.recorder.recording
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url or route, **kwargs)
+        except httpx.HTTPError as e:
+            if recording:
+                self.recorder.record(
+                    f"{method} {route}", type(e).__name__, time.perf_counter() - started
+                )
+            raise ScenarioFailed(f"{method} {route}: {type(e).__name__}")
+
+        # The body is read by the client before it returns, so this includes
+        # streaming exports.
+        if recording:
+            self.recorder.record(
+                f"{method} {route}",
+                str(response.status_code),
+                time.perf_counter() - started,
+            )
+        if response.status_code not in expect:
+            raise ScenarioFailed(f"{method} {route}: {response.status_code}")
+        return response
+
+    async def sign_up(self):
+        await self.request(
+            "POST",
+            "/users",
+            json={"email": self.email, "password": PASSWORD},
+            expect=(201, 409),
+        )
+
+    async def log_in(self):
+        response = await self.request(
+            "POST",
+            "/login",
+            data={"username": self.email, "password": PASSWORD},
+        )
+        self.token = response.json()["access_token"]
+
+
+class Catalogue:
+    """Quiz ids known to the harness, shared by all virtual users."""
+
+    def __init__(self):
+        self.quiz_ids: List[int] = []
+
+    def add(self, quiz_ids):
+        known = set(self.quiz_ids)
+        self.quiz_ids.extend(id for id in quiz_ids if id not in known)
+
+    def pick(self, count: int = 1) -> List[int]:
+        if not self.quiz_ids:
+            raise ScenarioFailed("No quizzes in the catalogue")
+        return random.sample(self.quiz_ids, min(count, len(self.quiz_ids)))
+
+
+def quiz_document(title: str, questions: int) -> bytes:
+    return json.dumps(
+        {
+            "quiz_title": title,
+            "questions": [
+                {
+                    "question": f"{random.choice(TOPIC_SENTENCES)} Question {i}?",
+                    "answers": {str(n): f"Answer {n}" for n in range(1, 5)},
+                    "correct_answer": str(random.randint(1, 4)),
+                }
+                for i in range(1, questions + 1)
+            ],
+        }
+    ).encode()
+
+
+def study_notes(sentences: int) -> bytes:
+    return " ".join(random.choices(TOPIC_SENTENCES, k=sentences)).encode()
+
+
+async def seed_quizzes(user: VirtualUser, catalogue: Catalogue, quizzes: int):
+    for i in range(quizzes):
+        title = f"Load test {random.choice(SEARCH_TERMS)} quiz {i}"
+        response = await user.request(
+            "POST",
+            "/quizzes/import",
+            files={"file": ("quiz.json", quiz_document(title, 20), "application/json")},
+            data={"title": title},
+            expect=(201,),
+        )
+        catalogue.add([response.json()["quiz_id"]])
+
+
+async def browse_catalogue(user: VirtualUser, catalogue: Catalogue):
+    page = random.randint(0, 4)
+    response = await user.request(
+        "GET", "/quizzes", params={"limit": 10, "skip": page * 10}
+    )
+    quizzes = response.json()["items"]
+    catalogue.add(quiz["id"] for quiz in quizzes)
+    if quizzes:
+        quiz_id = random.choice(quizzes)["id"]
+        await user.request("GET", "/quizzes/{id}", f"/quizzes/{quiz_id}")
+
+
+async def search(user: VirtualUser, catalogue: Catalogue):
+    response = await user.request(
+        "GET",
+        "/quizzes",
+        params={
+            "search": random.choice(SEARCH_TERMS),
+            "fields": "id,title,owner,favourites",
+            "limit": 20,
+        },
+    )
+    catalogue.add(quiz["id"] for quiz in response.json()["items"])
+
+
+async def favourite(user: VirtualUser, catalogue: Catalogue):
+    [quiz_id] = catalogue.pick()
+    await user.request(
+        "POST",
+        "/quizzes/favourites",
+        json={"quiz_id": quiz_id, "dir": 1},
+        expect=(201, 409),
+    )
+    await user.request("GET", "/quizzes/my_favourite_quizzes")
+    await user.request(
+        "POST",
+        "/quizzes/favourites",
+        json={"quiz_id": quiz_id, "dir": 0},
+        expect=(201, 404),
+    )
+
+
+async def play(user: VirtualUser, catalogue: Catalogue):
+    [quiz_id] = catalogue.pick()
+    await user.request("GET", "/quizzes/{id}", f"/quizzes/{quiz_id}")
+    await user.request("GET", "/quizzes/play/{id}", f"/quizzes/play/{quiz_id}")
+
+
+async def export(user: VirtualUser, catalogue: Catalogue):
+    [quiz_id] = catalogue.pick()
+    format = random.choice(("json", "xml", "pdf"))
+    await user.request(
+        "GET",
+        f"/quizzes/{{quiz_id}}/export/{format}",
+        f"/quizzes/{quiz_id}/export/{format}",
+    )
+    if random.random() < 0.2:
+        await user.request(
+            "POST",
+            "/quizzes/export",
+            json={"quiz_ids": catalogue.pick(5), "formats": ["json", "xml"]},
+        )
+
+
+async def upload(user: VirtualUser, catalogue: Catalogue):
+    # Goes through text extraction and the LLM; point LLM_BASE_URL at the stub.
+    response = await user.request(
+        "POST",
+        "/quizzes",
+        files={"file": ("notes.txt", study_notes(40), "text/plain")},
+        data={
+            "title": f"Uploaded {random.choice(SEARCH_TERMS)}",
+            "total_questions": "5",
+        },
+        params={"published": "false"},
+        expect=(201,),
+    )
+    quiz_id = response.json()["id"]
+    await user.request("GET", "/quizzes/play/{id}", f"/quizzes/play/{quiz_id}")
+    # Removed again so repeated runs see a catalogue of the same size.
+    await user.request("DELETE", "/quizzes/{id}", f"/quizzes/{quiz_id}", expect=(204,))
+
+
+Scenario = Callable[[VirtualUser, Catalogue], Awaitable[None]]
+
+SCENARIOS: Dict[str, Scenario] = {
+    "browse": browse_catalogue,
+    "search": search,
+    "favourite": favourite,
+    "play": play,
+    "export": export,
+    "upload": upload,
+}
+
+# Arrivals per second of each scenario; a read heavy mix by default.
+DEFAULT_RATES: Dict[str, float] = {
+    "browse": 10,
+    "search": 5,
+    "favourite": 2,
+    "play": 5,
+    "export": 1,
+    "upload": 0.1,
+}
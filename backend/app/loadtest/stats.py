@@ -0,0 +1,197 @@
+import math
+import subprocess
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+REPORT_VERSION = 1
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def latency_summary(values: List[float]) -> dict:
+    values = sorted(values)
+    summary = {
+        "mean": sum(values) / len(values) * 1000 if values else 0.0,
+        "max": values[-1] * 1000 if values else 0.0,
+    }
+    for p in PERCENTILES:
+        summary[f"p{p}"] = percentile(values, p) * 1000
+    return {name: round(value, 3) for name, value in summary.items()}
+
+
+class RouteStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+
+    def record(self, status: str, elapsed: float):
+        self.latencies.append(elapsed)
+        self.statuses[status] += 1
+
+    @property
+    def errors(self) -> int:
+        return sum(
+            count
+            for status, count in self.statuses.items()
+            if not status.isdigit() or int(status) >= 500
+        )
+
+    def to_dict(self, seconds: float) -> dict:
+        return {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "throughput_rps": round(len(self.latencies) / seconds, 3),
+            "latency_ms": latency_summary(self.latencies),
+            "statuses": dict(sorted(self.statuses.items())),
+        }
+
+
+class ScenarioStats:
+    def __init__(self):
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.failures: Counter = Counter()
+
+    def to_dict(self) -> dict:
+        return {
+            "started": self.started,
+            "completed": self.completed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "failures": dict(self.failures.most_common(10)),
+        }
+
+
+class Recorder:
+    """Collects request latencies by route template, e.g. "GET /quizzes/{id}".
+
+    Requests started before recording is enabled (the warm-up) are not kept.
+    """
+
+    def __init__(self):
+        self.recording = False
+        self.routes: Dict[str, RouteStats] = {}
+        self.scenarios: Dict[str, ScenarioStats] = {}
+
+    def record(self, route: str, status: str, elapsed: float):
+        stats = self.routes.get(route)
+        if stats is None:
+            stats = self.routes[route] = RouteStats()
+        stats.record(status, elapsed)
+
+    def scenario(self, name: str) -> ScenarioStats:
+        stats = self.scenarios.get(name)
+        if stats is None:
+            stats = self.scenarios[name] = ScenarioStats()
+        return stats
+
+    def total(self) -> RouteStats:
+        total = RouteStats()
+        for stats in self.routes.values():
+            total.latencies.extend(stats.latencies)
+            total.statuses.update(stats.statuses)
+        return total
+
+
+def git_revision() -> Optional[dict]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return {"commit": commit, "dirty": bool(dirty)}
+
+
+def build_report(recorder: Recorder, seconds: float, config: dict) -> dict:
+    return {
+        "version": REPORT_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "config": config,
+        "measured_seconds": round(seconds, 3),
+        "total": recorder.total().to_dict(seconds),
+        "routes": {
+            route: stats.to_dict(seconds)
+            for route, stats in sorted(recorder.routes.items())
+        },
+        "scenarios": {
+            name: stats.to_dict() for name, stats in sorted(recorder.scenarios.items())
+        },
+    }
+
+
+def change(base: float, head: float) -> Optional[float]:
+    if not base:
+        return None
+    return round((head - base) / base * 100, 1)
+
+
+COMPARED_METRICS = ("throughput_rps", "p50", "p95", "p99")
+
+
+def metric_value(stats: Optional[dict], metric: str) -> Optional[float]:
+    if stats is None:
+        return None
+    if metric == "throughput_rps":
+        return stats["throughput_rps"]
+    return stats["latency_ms"][metric]
+
+
+def compare_reports(base: dict, head: dict) -> List[dict]:
+    rows = []
+    routes = sorted(set(base["routes"]) | set(head["routes"]))
+    for route in ["total", *routes]:
+        before = base["total"] if route == "total" else base["routes"].get(route)
+        after = head["total"] if route == "total" else head["routes"].get(route)
+        row = {"route": route}
+        for metric in COMPARED_METRICS:
+            values = (metric_value(before, metric), metric_value(after, metric))
+            row[metric] = {
+                "base": values[0],
+                "head": values[1],
+                "change_percent": change(*values) if None not in values else None,
+            }
+        rows.append(row)
+    return rows
+
+
+def format_comparison(rows: List[dict]) -> str:
+    def cell(values: dict) -> str:
+        if values["base"] is None or values["head"] is None:
+            return "n/a"
+        delta = values["change_percent"]
+        delta = "" if delta is None else f" ({delta:+.1f}%)"
+        return f"{values['base']:.1f} -> {values['head']:.1f}{delta}"
+
+    width = max(len(row["route"]) for row in rows)
+    header = (f"{m:<28}" for m in COMPARED_METRICS)
+    lines = ["  ".join([f"{'route':<{width}}", *header]).rstrip()]
+    for row in rows:
+        cells = (f"{cell(row[m]):<28}" for m in COMPARED_METRICS)
+        lines.append("  ".join([f"{row['route']:<{width}}", *cells]).rstrip())
+    return "\n".join(lines)
+
+
+def regressions(rows: List[dict], metric: str, threshold_percent: float) -> List[str]:
+    return [
+        row["route"]
+        for row in rows
+        if row[metric]["change_percent"] is not None
+        and row[metric]["change_percent"] > threshold_percent
+    ]
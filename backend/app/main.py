@@ -1,12 +1,52 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.routers import auth, quiz, user
+from app.metrics import flush_metrics
+from app.middleware import MetricsMiddleware, ProfilingMiddleware
+from app.routers import auth, monitoring, quiz, user
+from app.services.pdf_services import shutdown_render_pool
+from app.services.provisioning_services import shutdown_hashing_pool
+from app.services.purge_services import run_purger
 from app.settings.config import settings
+from app.settings import database
+from app.settings.database import engine, replica_monitor
+from app.startup import warm_up
+from app.utils import password_pool
+from app.watchdog import loop_watchdog
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.eager_startup:
+        await warm_up()
+    if settings.loop_watchdog_enabled:
+        loop_watchdog.start()
+    replica_monitor.start()
+    purger = asyncio.create_task(run_purger())
+    metrics_flusher = None
+    if monitoring.metrics_store is not None:
+        metrics_flusher = asyncio.create_task(
+            flush_metrics(monitoring.metrics_store, settings.metrics_flush_seconds)
+        )
+    yield
+    purger.cancel()
+    await loop_watchdog.stop()
+    if metrics_flusher is not None:
+        metrics_flusher.cancel()
+        await asyncio.gather(metrics_flusher, return_exceptions=True)
+    shutdown_render_pool()
+    shutdown_hashing_pool()
+    password_pool.executor.shutdown(cancel_futures=True)
+    await replica_monitor.stop()
+    await engine.dispose()
+    if database.read_engine is not None:
+        await database.read_engine.dispose()
 
-print(settings.database_username)
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 origins = ["http://localhost:3000"]
 
@@ -17,7 +57,11 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(quiz.router)
 app.include_router(user.router)
 app.include_router(auth.router)
+app.include_router(monitoring.router)
+app.include_router(monitoring.metrics_router)
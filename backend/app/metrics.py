@@ -0,0 +1,388 @@
+import asyncio
+import bisect
+import fcntl
+import glob
+import json
+import math
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SLOW_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def snapshot(self) -> dict:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+
+        return {"buckets": buckets, "count": self.count, "sum": self.sum}
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def snapshot(self) -> float:
+        return self.value
+
+
+class Gauge(Counter):
+    def set(self, value: float):
+        self.value = value
+
+
+class Metric:
+    """A named metric with one child per combination of label values."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        type: str,
+        labels: Sequence[str],
+        factory: Callable,
+    ):
+        self.name = name
+        self.help = help
+        self.type = type
+        self.label_names = tuple(labels)
+        self.factory = factory
+        self.children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"{self.name} expects labels {self.label_names}")
+            child = self.children[values] = self.factory()
+        return child
+
+    def __getattr__(self, name):
+        # Unlabelled metrics are used directly: REQUESTS.inc(), LATENCY.observe(...)
+        if name in ("inc", "set", "observe", "time") and not self.label_names:
+            return getattr(self.labels(), name)
+        raise AttributeError(name)
+
+    def snapshot(self) -> dict:
+        return {
+            "help": self.help,
+            "type": self.type,
+            "labels": list(self.label_names),
+            "samples": [
+                [list(values), child.snapshot()]
+                for values, child in list(self.children.items())
+            ],
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self.collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Metric:
+        return self.register(Metric(name, help, "counter", labels, Counter))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Metric:
+        return self.register(Metric(name, help, "gauge", labels, Gauge))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Metric:
+        return self.register(
+            Metric(name, help, "histogram", labels, lambda: Histogram(buckets))
+        )
+
+    def on_collect(self, collector: Callable[[], None]):
+        self.collectors.append(collector)
+        return collector
+
+    def snapshot(self) -> dict:
+        for collector in self.collectors:
+            collector()
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+
+registry = MetricsRegistry()
+
+
+class QueryStats:
+    __slots__ = ("count", "seconds", "scope")
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.count = 0
+        self.seconds = 0.0
+        self.scope = scope
+
+
+# Set per request by the metrics middleware, filled in by the engine listeners.
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "current_query_stats", default=None
+)
+
+
+def route_path(scope) -> str:
+    route = scope.get("route")
+    # Unmatched paths are not used as label values, they are unbounded.
+    return route.path if route is not None else "unmatched"
+
+
+def process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def without_gauges(snapshot: dict) -> dict:
+    return {
+        name: metric for name, metric in snapshot.items() if metric["type"] != "gauge"
+    }
+
+
+class MultiProcessStore:
+    """Shares snapshots between uvicorn workers through one file per process.
+
+    Counters and histograms of every process, including ones that have exited,
+    are summed on scrape. Gauges only make sense per process, so they get a pid
+    label and are dropped when a process shuts down cleanly.
+
+    Files of processes that are no longer running are folded into a single
+    metrics-exited.json on scrape, so recycled workers and restarts do not grow
+    the directory.
+    """
+
+    EXITED = "exited"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, pid: Union[int, str]) -> str:
+        return os.path.join(self.directory, f"metrics-{pid}.json")
+
+    @contextmanager
+    def lock(self):
+        with open(os.path.join(self.directory, "merge.lock"), "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def exited_paths(self) -> List[str]:
+        paths = []
+        for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+            try:
+                pid = int(os.path.basename(path)[len("metrics-") : -len(".json")])
+            except ValueError:
+                continue
+            if pid != os.getpid() and not process_alive(pid):
+                paths.append(path)
+        return paths
+
+    def merge_exited(self):
+        with self.lock():
+            paths = self.exited_paths()
+            if not paths:
+                return
+
+            snapshots = []
+            for path in [self.path(self.EXITED), *paths]:
+                try:
+                    with open(path) as f:
+                        process = json.load(f)
+                except (FileNotFoundError, ValueError):
+                    continue
+                snapshots.append({"metrics": without_gauges(process["metrics"])})
+
+            merged = {
+                name: {
+                    **metric,
+                    "samples": [
+                        [list(values), value]
+                        for values, value in metric["samples"].items()
+                    ],
+                }
+                for name, metric in merge_snapshots(snapshots).items()
+            }
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump({"pid": self.EXITED, "metrics": merged}, f)
+            os.replace(tmp_path, self.path(self.EXITED))
+
+            for path in paths:
+                os.remove(path)
+
+    def write(self, snapshot: dict, include_gauges: bool = True):
+        if not include_gauges:
+            snapshot = without_gauges(snapshot)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"pid": os.getpid(), "metrics": snapshot}, f)
+        os.replace(tmp_path, self.path(os.getpid()))
+
+    def read_all(self) -> List[dict]:
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (FileNotFoundError, ValueError):
+                continue
+        return snapshots
+
+
+def merge_snapshots(snapshots: List[dict]) -> dict:
+    merged = {}
+
+    for process in snapshots:
+        for name, metric in process["metrics"].items():
+            target = merged.setdefault(
+                name,
+                {
+                    "help": metric["help"],
+                    "type": metric["type"],
+                    "labels": list(metric["labels"]),
+                    "samples": {},
+                },
+            )
+            if metric["type"] == "gauge":
+                if "pid" not in target["labels"]:
+                    target["labels"].append("pid")
+                for values, value in metric["samples"]:
+                    target["samples"][(*values, str(process["pid"]))] = value
+                continue
+
+            for values, value in metric["samples"]:
+                key = tuple(values)
+                current = target["samples"].get(key)
+                if current is None:
+                    target["samples"][key] = value
+                elif metric["type"] == "histogram":
+                    target["samples"][key] = {
+                        "buckets": {
+                            bound: count + value["buckets"][bound]
+                            for bound, count in current["buckets"].items()
+                        },
+                        "count": current["count"] + value["count"],
+                        "sum": current["sum"] + value["sum"],
+                    }
+                else:
+                    target["samples"][key] = current + value
+
+    return merged
+
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_labels(names: Sequence[str], values: Sequence[str], **extra) -> str:
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (
+        (
+            name,
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def render_prometheus(metrics: dict) -> str:
+    lines = []
+
+    for name, metric in metrics.items():
+        samples = metric["samples"]
+        if not isinstance(samples, dict):
+            samples = {tuple(values): value for values, value in samples}
+
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        labels = metric["labels"]
+
+        for values, value in samples.items():
+            if metric["type"] != "histogram":
+                lines.append(
+                    f"{name}{format_labels(labels, values)} {format_value(value)}"
+                )
+                continue
+
+            for bound, count in value["buckets"].items():
+                lines.append(
+                    f"{name}_bucket{format_labels(labels, values, le=bound)} {count}"
+                )
+            lines.append(
+                f"{name}_count{format_labels(labels, values)} {value['count']}"
+            )
+            lines.append(
+                f"{name}_sum{format_labels(labels, values)} {format_value(value['sum'])}"
+            )
+
+    return "\n".join(lines) + "\n"
+
+
+def collect_metrics(store: Optional[MultiProcessStore] = None) -> str:
+    snapshot = registry.snapshot()
+    if store is None:
+        return render_prometheus(snapshot)
+
+    store.write(snapshot)
+    store.merge_exited()
+    return render_prometheus(merge_snapshots(store.read_all()))
+
+
+async def flush_metrics(store: MultiProcessStore, interval_seconds: float):
+    try:
+        while True:
+            await asyncio.sleep(interval_seconds)
+            store.write(registry.snapshot())
+    finally:
+        store.write(registry.snapshot(), include_gauges=False)
@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+from app.metrics import (
+    COUNT_BUCKETS,
+    QueryStats,
+    current_query_stats,
+    registry,
+    route_path,
+)
+from app.profiling import PROFILE_HEADER, profiler
+from app.watchdog import request_scopes
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency, including streaming the response body",
+    ["method", "route", "status"],
+)
+DB_QUERIES_PER_REQUEST = registry.histogram(
+    "db_queries_per_request",
+    "Number of SQL statements executed per HTTP request",
+    ["route"],
+    buckets=COUNT_BUCKETS,
+)
+DB_SECONDS_PER_REQUEST = registry.histogram(
+    "db_query_seconds_per_request",
+    "Time spent in SQL statements per HTTP request",
+    ["route"],
+)
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = QueryStats(scope)
+        token = current_query_stats.set(stats)
+        task = asyncio.current_task()
+        request_scopes[task] = scope
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_query_stats.reset(token)
+            request_scopes.pop(task, None)
+
+            route = route_path(scope)
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"], route, str(status_code)
+            ).observe(elapsed)
+            DB_QUERIES_PER_REQUEST.labels(route).observe(stats.count)
+            DB_SECONDS_PER_REQUEST.labels(route).observe(stats.seconds)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self.header = PROFILE_HEADER.encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = next(
+            (value.decode() for name, value in scope["headers"] if name == self.header),
+            None,
+        )
+        trigger = profiler.trigger(token)
+        profile = (
+            profiler.start(scope["method"], scope["path"], trigger) if trigger else None
+        )
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-profile-id", profile.id.encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            await profiler.finish(profile, route_path(scope), status_code)
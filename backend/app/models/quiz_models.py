@@ -1,29 +1,61 @@
-from sqlalchemy import JSON, Boolean, Column, ForeignKey, Integer, String
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, String
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql.expression import text
 from sqlalchemy.sql.sqltypes import TIMESTAMP
+from sqlalchemy.types import TypeDecorator
 
-from app.settings.database import Base
+from app.schemas.quiz_schemas import option_position
+from app.settings.database import Base, SoftDeleteMixin
 
 
-class Quiz(Base):
+class AnswerOptions(TypeDecorator):
+    """Answer options stored as a JSONB array, exposed as {"1": ..., "2": ...}."""
+
+    impl = JSONB
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if isinstance(value, dict):
+            return [value[key] for key in sorted(value, key=option_position)]
+        return value
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, list):
+            return {str(position): text for position, text in enumerate(value, 1)}
+        return value
+
+
+class Quiz(Base, SoftDeleteMixin):
     __tablename__ = "quizzes"
+    __table_args__ = (
+        Index(
+            "ix_quizzes_deleted_at",
+            "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, nullable=False)
     title = Column(String, nullable=False)
     content = Column(String, nullable=False)
     published = Column(Boolean, server_default="TRUE", nullable=False)
+    # Bumped on every edit; keys the rendered PDF cache.
+    version = Column(Integer, server_default="0", nullable=False)
     created_at = Column(
         TIMESTAMP(timezone=True), nullable=False, server_default=text("now()")
     )
 
     owner_id = Column(
-        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
     )
 
     owner = relationship("User", back_populates="quizzes")
     questions = relationship(
-        "Question", back_populates="quiz", cascade="all, delete-orphan"
+        "Question",
+        back_populates="quiz",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
 
@@ -34,19 +66,33 @@ class Favourite(Base):
         Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
     )
     quiz_id = Column(
-        Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), primary_key=True
+        Integer,
+        ForeignKey("quizzes.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
     )
 
 
 class Question(Base):
     __tablename__ = "questions"
+    __table_args__ = (
+        Index(
+            "ix_questions_answers",
+            "answers",
+            postgresql_using="gin",
+            postgresql_ops={"answers": "jsonb_path_ops"},
+        ),
+    )
 
     id = Column(Integer, primary_key=True, nullable=False)
     quiz_id = Column(
-        Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), nullable=False
+        Integer,
+        ForeignKey("quizzes.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
     )
     question_text = Column(String, nullable=False)
-    answers = Column(JSON, nullable=False)
+    answers = Column(AnswerOptions, nullable=False)
     correct_answer = Column(String, nullable=False)
 
     quiz = relationship("Quiz", back_populates="questions")
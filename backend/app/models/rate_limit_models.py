@@ -0,0 +1,11 @@
+from sqlalchemy import Column, String
+from sqlalchemy.sql.sqltypes import TIMESTAMP
+
+from app.settings.database import Base
+
+
+class RateLimit(Base):
+    __tablename__ = "rate_limits"
+
+    bucket = Column(String, primary_key=True, nullable=False)
+    tat = Column(TIMESTAMP(timezone=True), nullable=False)
@@ -1,15 +1,18 @@
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from typing import Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy import select
+from sqlalchemy import bindparam, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.user_models import User
 from app.schemas.token_schemas import TokenData
 from app.settings.config import settings
-from app.settings.database import get_db
+from app.settings.database import get_db, hide_deleted
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
@@ -17,6 +20,61 @@ SECRET_KEY = settings.secret_key
 ALGORITHM = settings.algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 
+CURRENT_USER = hide_deleted(
+    select(User.id, User.is_admin, User.token_version).where(User.id == bindparam("id"))
+)
+
+
+class AuthenticatedUser:
+    __slots__ = ("id", "is_admin", "token_version", "expires_at")
+
+    def __init__(self, id: int, is_admin: bool, token_version: int, expires_at: float):
+        self.id = id
+        self.is_admin = is_admin
+        self.token_version = token_version
+        self.expires_at = expires_at
+
+
+class AuthenticatedUserCache:
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, AuthenticatedUser]" = OrderedDict()
+
+    def get(self, user_id: int) -> Optional[AuthenticatedUser]:
+        user = self._entries.get(user_id)
+        if user is None:
+            return None
+
+        if user.expires_at < time.monotonic():
+            del self._entries[user_id]
+            return None
+
+        self._entries.move_to_end(user_id)
+        return user
+
+    def put(self, id: int, is_admin: bool, token_version: int) -> AuthenticatedUser:
+        user = AuthenticatedUser(
+            id, bool(is_admin), token_version, time.monotonic() + self.ttl_seconds
+        )
+        self._entries[id] = user
+        self._entries.move_to_end(id)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id: int) -> None:
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+user_cache = AuthenticatedUserCache(
+    settings.auth_cache_max_entries, settings.auth_cache_ttl_seconds
+)
+
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -37,7 +95,7 @@ def verify_access_token(token: str, credentials_exception) -> TokenData:
         if id is None:
             raise credentials_exception
 
-        token_data = TokenData(id=id)
+        token_data = TokenData(id=id, version=payload.get("ver", 0))
         return token_data
 
     except JWTError:
@@ -57,10 +115,18 @@ async def get_current_user(
 
     user_id = int(token_data.id)
 
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    user = user_cache.get(user_id)
 
     if user is None:
+        result = await db.execute(CURRENT_USER, {"id": user_id})
+        row = result.one_or_none()
+
+        if row is None:
+            raise credentials_exception
+
+        user = user_cache.put(row.id, row.is_admin, row.token_version)
+
+    if user.token_version != token_data.version:
         raise credentials_exception
 
     return user
@@ -0,0 +1,246 @@
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from jose import JWTError, jwt
+
+from app.settings.config import settings
+
+PROFILE_HEADER = "x-profile"
+PROFILE_TOKEN_SCOPE = "profile"
+AWAITING_FRAME = "<awaiting>"
+PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+SOURCE_ROOTS = sorted(
+    {os.path.abspath(path) for path in sys.path if path}, key=len, reverse=True
+)
+
+
+def create_profiling_token(admin_id: int) -> str:
+    # No user_id claim, so it can never be used as an access token.
+    expire = datetime.utcnow() + timedelta(
+        minutes=settings.profile_token_expire_minutes
+    )
+    return jwt.encode(
+        {"scope": PROFILE_TOKEN_SCOPE, "admin_id": str(admin_id), "exp": expire},
+        settings.secret_key,
+        algorithm=settings.algorithm,
+    )
+
+
+def verify_profiling_token(token: str) -> bool:
+    try:
+        payload = jwt.decode(
+            token, settings.secret_key, algorithms=[settings.algorithm]
+        )
+    except JWTError:
+        return False
+    return payload.get("scope") == PROFILE_TOKEN_SCOPE
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename
+    for root in SOURCE_ROOTS:
+        if path.startswith(root):
+            path = path[len(root) :].lstrip(os.sep)
+            break
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """Samples the event loop thread while the profiled request's task runs.
+
+    Samples taken while another task (or nothing) runs on the loop are counted
+    as time the request spent awaiting.
+    """
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self.thread_id = threading.get_ident()
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def run(self):
+        while not self._stopped.wait(self.interval_seconds):
+            self.sample()
+
+    def sample(self):
+        self.samples += 1
+        # asyncio keeps the running task per loop; reading it from another
+        # thread is racy but good enough for a statistical profile.
+        current_tasks = getattr(asyncio.tasks, "_current_tasks", {})
+        if current_tasks.get(self.loop) is not self.task:
+            self.stacks[AWAITING_FRAME] += 1
+            return
+
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is not None:
+            self.stacks[collapse_stack(frame)] += 1
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str, trigger: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.started_at = time.time()
+        self.sampler = StackSampler(settings.profile_interval_ms / 1000)
+        self.started_tracing = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(settings.profile_traceback_frames)
+            self.started_tracing = True
+        tracemalloc.reset_peak()
+        self.memory_at_start = tracemalloc.get_traced_memory()[0]
+        self.sampler.start()
+        self.started = time.perf_counter()
+
+    def stop(self, route: str, status_code: int):
+        self.duration = time.perf_counter() - self.started
+        self.sampler.stop()
+        self.route = route
+        self.status_code = status_code
+        self.memory_at_end, self.memory_peak = tracemalloc.get_traced_memory()
+
+    def collect(self) -> dict:
+        top_allocations = [
+            {"location": str(stat.traceback[0]), "bytes": stat.size}
+            for stat in tracemalloc.take_snapshot().statistics("lineno")[:10]
+        ]
+        if self.started_tracing:
+            tracemalloc.stop()
+
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status_code,
+            "trigger": self.trigger,
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(),
+            "duration_seconds": self.duration,
+            "samples": self.sampler.samples,
+            "interval_ms": settings.profile_interval_ms,
+            "memory_start_bytes": self.memory_at_start,
+            "memory_end_bytes": self.memory_at_end,
+            "memory_peak_bytes": self.memory_peak,
+            "top_allocations": top_allocations,
+        }
+
+
+class ProfileStore:
+    def __init__(self, directory: str, max_profiles: int):
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    def save(self, metadata: dict, stacks: Counter):
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, metadata["id"])
+
+        with open(f"{base}.collapsed", "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(f"{base}.json", "w") as f:
+            json.dump(metadata, f)
+
+        self.evict()
+
+    def list(self) -> List[dict]:
+        if not os.path.isdir(self.directory):
+            return []
+
+        profiles = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    profiles.append(json.load(f))
+            except (FileNotFoundError, ValueError):
+                continue
+        return sorted(profiles, key=lambda profile: profile["started_at"], reverse=True)
+
+    def collapsed_path(self, profile_id: str) -> Optional[str]:
+        if not PROFILE_ID.match(profile_id):
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.collapsed")
+        return path if os.path.exists(path) else None
+
+    def evict(self):
+        for profile in self.list()[self.max_profiles :]:
+            for suffix in (".json", ".collapsed"):
+                try:
+                    os.remove(os.path.join(self.directory, profile["id"] + suffix))
+                except FileNotFoundError:
+                    pass
+
+
+profile_store = ProfileStore(settings.profile_dir, settings.profile_max_files)
+
+
+class Profiler:
+    """Profiles at most one request at a time to bound the overhead."""
+
+    def __init__(self, sample_rate: float):
+        self.sample_rate = sample_rate
+        self.active: Optional[RequestProfile] = None
+
+    def trigger(self, token: Optional[str]) -> Optional[str]:
+        if token is not None and verify_profiling_token(token):
+            return "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    def start(self, method: str, path: str, trigger: str) -> Optional[RequestProfile]:
+        if self.active is not None:
+            return None
+
+        self.active = RequestProfile(method, path, trigger)
+        self.active.start()
+        return self.active
+
+    def save(self, profile: RequestProfile):
+        profile_store.save(profile.collect(), profile.sampler.stacks)
+
+    async def finish(self, profile: RequestProfile, route: str, status_code: int):
+        try:
+            profile.stop(route, status_code)
+            # Snapshotting tracemalloc and writing files stays off the loop.
+            await asyncio.get_running_loop().run_in_executor(None, self.save, profile)
+        finally:
+            self.active = None
+
+
+profiler = Profiler(settings.profile_sample_rate)
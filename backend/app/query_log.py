@@ -0,0 +1,228 @@
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from app.metrics import current_query_stats, registry, route_path
+from app.settings.config import settings
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERIES = registry.counter(
+    "db_slow_queries_total", "SQL statements slower than the slow query threshold"
+)
+
+WHITESPACE = re.compile(r"\s+")
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r"(?<![\w$.])\d+(?:\.\d+)?\b")
+PARAMETER_LIST = re.compile(
+    r"\(\s*(?:\$\d+|%\(\w+\)s|\?)(?:\s*,\s*(?:\$\d+|%\(\w+\)s|\?))+\s*\)"
+)
+REPEATED_ROWS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+
+EXPLAINABLE = re.compile(r"^\s*SELECT\b(?!.*\bFOR\s+(?:NO\s+KEY\s+)?UPDATE\b)", re.S)
+CALL = re.compile(r"\b(\w+)\s*\(")
+# Words that are followed by a parenthesis without calling a function.
+NOT_CALLS = frozenset(
+    "all and any array as case cast else exists filter from in join lateral not on "
+    "or over row select then using values when where with".split()
+)
+# Functions without side effects, as used by the ORM queries.
+PURE_FUNCTIONS = frozenset(
+    "abs array_agg avg bool_and bool_or coalesce count date_trunc extract greatest "
+    "json_agg jsonb_agg least length lower max min now nullif round string_agg sum "
+    "upper".split()
+)
+
+
+def can_analyze(sql: str) -> bool:
+    # EXPLAIN ANALYZE runs the statement and a rollback does not undo every
+    # side effect (advisory locks, sequences), so only SELECTs that call
+    # nothing but known pure functions are analyzed; others get a plain plan.
+    calls = {name.lower() for name in CALL.findall(sql)}
+    return not (calls - NOT_CALLS - PURE_FUNCTIONS)
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(statement: str) -> str:
+    sql = WHITESPACE.sub(" ", statement).strip()
+    sql = STRING_LITERAL.sub("?", sql)
+    sql = NUMBER_LITERAL.sub("?", sql)
+    sql = PARAMETER_LIST.sub("(...)", sql)
+    return REPEATED_ROWS.sub("(...)", sql)
+
+
+def parameters_shape(parameters, executemany: bool) -> str:
+    if executemany:
+        rows = list(parameters)
+        first = parameters_shape(rows[0], False) if rows else "()"
+        return f"{len(rows)} x {first}"
+    if isinstance(parameters, dict):
+        types = ", ".join(f"{k}: {type(v).__name__}" for k, v in parameters.items())
+        return f"{{{types}}}"
+    return f"({', '.join(type(value).__name__ for value in parameters or ())})"
+
+
+class StatementStats:
+    __slots__ = (
+        "sql",
+        "calls",
+        "total_seconds",
+        "max_seconds",
+        "slow_calls",
+        "routes",
+        "parameters",
+        "explain",
+        "analyzed",
+        "explained_at",
+    )
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.slow_calls = 0
+        self.routes: Dict[str, int] = {}
+        self.parameters: Optional[str] = None
+        self.explain = None
+        self.analyzed = False
+        self.explained_at: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "sql": self.sql,
+            "calls": self.calls,
+            "total_seconds": self.total_seconds,
+            "mean_seconds": self.total_seconds / self.calls if self.calls else 0.0,
+            "max_seconds": self.max_seconds,
+            "slow_calls": self.slow_calls,
+            "routes": dict(sorted(self.routes.items(), key=lambda item: -item[1])),
+            "parameters": self.parameters,
+            "explain": self.explain,
+            "explain_analyzed": self.analyzed,
+            "explained_at": (
+                datetime.fromtimestamp(self.explained_at).isoformat()
+                if self.explained_at is not None
+                else None
+            ),
+        }
+
+
+class SlowQueryLog:
+    """Per process statement statistics, like a small pg_stat_statements.
+
+    Every statement is counted; statements over the threshold are logged and may
+    get an EXPLAIN (ANALYZE, BUFFERS) captured in the background.
+    """
+
+    def __init__(
+        self,
+        threshold_seconds: float,
+        max_statements: int,
+        explain_sample_rate: float,
+        explain_interval_seconds: float,
+    ):
+        self.threshold_seconds = threshold_seconds
+        self.max_statements = max_statements
+        self.explain_sample_rate = explain_sample_rate
+        self.explain_interval_seconds = explain_interval_seconds
+        self.statements: Dict[str, StatementStats] = {}
+        self.explaining = False
+
+    def record(self, engine, statement: str, parameters, executemany: bool, elapsed):
+        sql = normalize_sql(statement)
+        stats = self.statements.get(sql)
+        if stats is None:
+            if len(self.statements) >= self.max_statements:
+                cheapest = min(
+                    self.statements.values(), key=lambda stats: stats.total_seconds
+                )
+                del self.statements[cheapest.sql]
+            stats = self.statements[sql] = StatementStats(sql)
+
+        request = current_query_stats.get()
+        route = (
+            route_path(request.scope)
+            if request is not None and request.scope is not None
+            else "background"
+        )
+        stats.calls += 1
+        stats.total_seconds += elapsed
+        stats.max_seconds = max(stats.max_seconds, elapsed)
+        stats.routes[route] = stats.routes.get(route, 0) + 1
+
+        if elapsed < self.threshold_seconds:
+            return
+
+        stats.slow_calls += 1
+        stats.parameters = parameters_shape(parameters, executemany)
+        SLOW_QUERIES.inc()
+        logger.warning(f"Slow query ({elapsed * 1000:.0f}ms) in {route}: {sql}")
+
+        if not executemany and self.should_explain(stats):
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            self.explaining = True
+            loop.create_task(self.explain(engine, stats, statement, parameters))
+
+    def should_explain(self, stats: StatementStats) -> bool:
+        if self.explaining or not EXPLAINABLE.match(stats.sql):
+            return False
+        if (
+            stats.explained_at is not None
+            and time.time() - stats.explained_at < self.explain_interval_seconds
+        ):
+            return False
+        return random.random() < self.explain_sample_rate
+
+    async def explain(self, engine, stats: StatementStats, statement, parameters):
+        analyze = can_analyze(statement)
+        options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+        try:
+            async with engine.connect() as conn:
+                conn = await conn.execution_options(skip_query_log=True)
+                async with conn.begin() as transaction:
+                    await conn.exec_driver_sql(
+                        "SET LOCAL statement_timeout = "
+                        f"{int(settings.slow_query_explain_timeout_ms)}"
+                    )
+                    result = await conn.exec_driver_sql(
+                        f"EXPLAIN ({options}) {statement}",
+                        parameters,
+                    )
+                    plan = result.scalar()
+                    stats.explain = json.loads(plan) if isinstance(plan, str) else plan
+                    stats.analyzed = analyze
+                    stats.explained_at = time.time()
+                    await transaction.rollback()
+        except Exception:
+            logger.exception(f"Could not explain slow query: {stats.sql}")
+        finally:
+            self.explaining = False
+
+    def top(self, limit: int, order_by: str = "total_seconds") -> List[dict]:
+        statements = sorted(
+            self.statements.values(),
+            key=lambda stats: getattr(stats, order_by),
+            reverse=True,
+        )
+        return [stats.to_dict() for stats in statements[:limit]]
+
+    def clear(self):
+        self.statements.clear()
+
+
+slow_query_log = SlowQueryLog(
+    settings.slow_query_threshold_ms / 1000,
+    settings.slow_query_max_statements,
+    settings.slow_query_explain_sample_rate,
+    settings.slow_query_explain_interval_seconds,
+)
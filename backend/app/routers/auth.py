@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.exceptions.admission_exceptions import CapacityExceededException
 from app.oauth2 import create_access_token
 from app.schemas.token_schemas import Token
+from app.services.admission_services import limit_by_ip, limit_login
 from app.services.auth_services import get_user_for_loging
+from app.settings.config import settings
 from app.settings.database import get_db
 
 router = APIRouter(tags=["Authentication"])
@@ -14,15 +17,32 @@ router = APIRouter(tags=["Authentication"])
     "/login",
     response_model=Token,
     summary="Log in",
-    responses={403: {"description": "Invalid credentials"}},
+    responses={
+        403: {"description": "Invalid credentials"},
+        429: {"description": "Too many login attempts"},
+        503: {"description": "Server is busy"},
+    },
+    dependencies=[
+        Depends(limit_by_ip("login", settings.login_ip_rate_limit)),
+        Depends(limit_login(settings.login_rate_limit)),
+    ],
 )
 async def login(
     user_credentials: OAuth2PasswordRequestForm = Depends(),
     db: AsyncSession = Depends(get_db),
 ):
-    user = await get_user_for_loging(user_credentials, db)
+    try:
+        user = await get_user_for_loging(user_credentials, db)
+    except CapacityExceededException as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please try again later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
 
-    access_token = create_access_token(data={"user_id": user.id})
+    access_token = create_access_token(
+        data={"user_id": user.id, "ver": user.token_version}
+    )
 
     return {
         "access_token": access_token,
@@ -0,0 +1,129 @@
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from app.metrics import MultiProcessStore, collect_metrics, registry
+from app.oauth2 import AuthenticatedUser
+from app.profiling import PROFILE_HEADER, create_profiling_token, profile_store
+from app.query_log import slow_query_log
+from app.settings.config import settings
+from app.settings.database import engine, pool_stats, read_engine
+from app.utils import password_pool, require_admin
+
+router = APIRouter(prefix="/monitoring", tags=["Monitoring"])
+metrics_router = APIRouter(tags=["Monitoring"])
+
+metrics_store = (
+    MultiProcessStore(settings.metrics_multiproc_dir)
+    if settings.metrics_multiproc_dir
+    else None
+)
+
+DB_POOL_CHECKED_OUT = registry.gauge(
+    "db_pool_checked_out", "Connections currently checked out", ["pool"]
+)
+DB_POOL_OVERFLOW = registry.gauge(
+    "db_pool_overflow", "Connections open beyond pool_size", ["pool"]
+)
+DB_POOL_WAITING = registry.gauge(
+    "db_pool_waiting", "Callers waiting for a connection", ["pool"]
+)
+DB_POOL_TIMEOUTS = registry.counter(
+    "db_pool_timeouts_total", "Connection checkouts that timed out", ["pool"]
+)
+DB_POOL_CHECKOUT_SECONDS = registry.histogram(
+    "db_pool_checkout_seconds", "Time spent waiting for a connection", ["pool"]
+)
+PASSWORD_HASH_IN_FLIGHT = registry.gauge(
+    "password_hash_in_flight", "Password hashes running or queued"
+)
+PASSWORD_HASH_REJECTED = registry.counter(
+    "password_hash_rejected_total", "Password hashes rejected with a full queue"
+)
+PASSWORD_HASH_WAIT_SECONDS = registry.counter(
+    "password_hash_wait_seconds_total", "Time password hashes spent queued"
+)
+
+
+@registry.on_collect
+def collect_pool_metrics():
+    pools = {"primary": engine.pool}
+    if read_engine is not None:
+        pools["replica"] = read_engine.pool
+
+    for name, pool in pools.items():
+        DB_POOL_CHECKED_OUT.labels(name).set(pool.checkedout())
+        DB_POOL_OVERFLOW.labels(name).set(max(0, pool.overflow()))
+        DB_POOL_WAITING.labels(name).set(pool.metrics.waiting)
+        DB_POOL_TIMEOUTS.labels(name).value = pool.metrics.timeouts
+        DB_POOL_CHECKOUT_SECONDS.children[(name,)] = pool.metrics.checkout_seconds
+
+    stats = password_pool.stats()
+    PASSWORD_HASH_IN_FLIGHT.set(stats["in_flight"])
+    PASSWORD_HASH_REJECTED.labels().value = stats["rejected"]
+    PASSWORD_HASH_WAIT_SECONDS.labels().value = stats["wait_seconds_total"]
+
+
+@router.get("/db-pool", summary="Database connection pool usage")
+async def get_pool_stats(admin: AuthenticatedUser = Depends(require_admin)):
+    return pool_stats()
+
+
+@router.post("/profiles/token", summary="Token to profile requests on demand")
+async def get_profiling_token(admin: AuthenticatedUser = Depends(require_admin)):
+    return {"header": PROFILE_HEADER, "token": create_profiling_token(admin.id)}
+
+
+@router.get("/profiles", summary="Recorded request profiles, newest first")
+async def get_profiles(admin: AuthenticatedUser = Depends(require_admin)):
+    return profile_store.list()
+
+
+@router.get(
+    "/profiles/{profile_id}",
+    summary="Collapsed stacks of a profile, for flamegraph.pl or speedscope",
+)
+async def get_profile(
+    profile_id: str, admin: AuthenticatedUser = Depends(require_admin)
+):
+    path = profile_store.collapsed_path(profile_id)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found"
+        )
+    return FileResponse(
+        path, media_type="text/plain", filename=f"{profile_id}.collapsed"
+    )
+
+
+@router.get("/slow-queries", summary="Statements by time spent, with EXPLAIN plans")
+async def get_slow_queries(
+    limit: int = Query(default=20, ge=1, le=500),
+    order_by: Literal[
+        "total_seconds", "max_seconds", "calls", "slow_calls"
+    ] = "total_seconds",
+    admin: AuthenticatedUser = Depends(require_admin),
+):
+    return slow_query_log.top(limit, order_by)
+
+
+@router.delete(
+    "/slow-queries",
+    summary="Reset the statement statistics",
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+async def clear_slow_queries(admin: AuthenticatedUser = Depends(require_admin)):
+    slow_query_log.clear()
+
+
+@metrics_router.get(
+    "/metrics", summary="Metrics in the Prometheus text format", include_in_schema=False
+)
+def get_metrics(authorization: Optional[str] = Header(None)):
+    if settings.metrics_token and authorization != f"Bearer {settings.metrics_token}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+
+    return PlainTextResponse(
+        collect_metrics(metrics_store), media_type="text/plain; version=0.0.4"
+    )
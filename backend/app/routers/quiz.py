@@ -5,23 +5,29 @@ from fastapi import (
     Depends,
     Form,
     HTTPException,
+    Query,
     Response,
     UploadFile,
     status,
 )
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.exceptions.admission_exceptions import CapacityExceededException
 from app.exceptions.quiz_exceptions import (
     ActionAlreadyDoneException,
     CreatingQuizException,
+    ImportingQuizException,
+    InvalidFieldsException,
     QuestionsNotFoundException,
     QuizNotFoundException,
     UserNotAuthorizedException,
     WrongFileTypeException,
 )
-from app.models.user_models import User as User_model
-from app.oauth2 import get_current_user
+from app.oauth2 import AuthenticatedUser, get_current_user
 from app.schemas.quiz_schemas import (
+    BulkExportRequest,
     FavouriteCreate,
     MessageResponse,
     PaginatedQuizResponse,
@@ -29,12 +35,16 @@ from app.schemas.quiz_schemas import (
     QuestionUpdate,
     Quiz,
     QuizCreate,
+    QuizImportResponse,
     QuizOut,
 )
+from app.services.admission_services import generation_slots, limit_by_user
 from app.services.quiz_services import (
     add_to_favourites,
+    export_bulk,
     export_json,
     export_pdf,
+    export_pdf_variants,
     export_moodle_xml,
     get_all_quizzes,
     get_my_favourite_quizzes,
@@ -42,23 +52,51 @@ from app.services.quiz_services import (
     get_one_quiz,
     get_questions,
     insert_new_quiz,
+    parse_fields,
     remove_quiz,
     update_questions,
     update_quiz_values,
 )
-from app.settings.database import get_db
+from app.services.import_services import import_quiz
+from app.settings.config import settings
+from app.settings.database import get_db, get_read_db
 
 router = APIRouter(prefix="/quizzes", tags=["Quizzes"])
 
+FIELDS_QUERY = Query(
+    default=None,
+    description="Comma separated subset of quiz fields to return, "
+    "e.g. id,title,owner,favourites",
+)
+
+
+def sparse_fields(fields: Optional[str] = FIELDS_QUERY) -> Optional[List[str]]:
+    try:
+        return parse_fields(fields)
+    except InvalidFieldsException:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Unknown fields requested",
+        )
+
 
-@router.get("", response_model=PaginatedQuizResponse, summary="Get all public quizzes")
+@router.get(
+    "",
+    response_model=PaginatedQuizResponse,
+    summary="Get all public quizzes",
+    responses={422: {"description": "Unknown fields requested"}},
+)
 async def get_quizzes(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     limit: int = 10,
     skip: int = 0,
     search: Optional[str] = "",
+    fields: Optional[List[str]] = Depends(sparse_fields),
 ):
-    return await get_all_quizzes(db, limit, skip, search)
+    result = await get_all_quizzes(db, limit, skip, search, fields)
+    if fields:
+        return JSONResponse(jsonable_encoder(result))
+    return result
 
 
 @router.post(
@@ -68,21 +106,33 @@ async def get_quizzes(
     summary="Create new quiz",
     responses={
         422: {"description": "Wrong file type error"},
+        429: {"description": "Too many quizzes generated"},
         500: {"description": "Creating quiz error"},
+        503: {"description": "Too many quizzes are being generated"},
     },
+    dependencies=[
+        Depends(limit_by_user("quiz_generation", settings.quiz_generation_rate_limit))
+    ],
 )
 async def create_quiz(
     file: UploadFile,
     title: str = Form(...),
     total_questions: str = Form(default="20"),
     db: AsyncSession = Depends(get_db),
-    current_user: User_model = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     published: bool = True,
 ):
     total_questions = int(total_questions)
     try:
-        return await insert_new_quiz(
-            file, title, total_questions, db, current_user, published
+        async with generation_slots.slot():
+            return await insert_new_quiz(
+                file, title, total_questions, db, current_user, published
+            )
+    except CapacityExceededException as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many quizzes are being generated, please try again later",
+            headers={"Retry-After": str(e.retry_after)},
         )
     except WrongFileTypeException:
         raise HTTPException(
@@ -96,34 +146,95 @@ async def create_quiz(
         )
 
 
+@router.post(
+    "/import",
+    status_code=status.HTTP_201_CREATED,
+    response_model=QuizImportResponse,
+    summary="Import quiz from Moodle XML or JSON export",
+    responses={
+        422: {"description": "Wrong file type or malformed file"},
+    },
+)
+async def import_quiz_file(
+    file: UploadFile,
+    title: str = Form(...),
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    published: bool = True,
+):
+    try:
+        return await import_quiz(file, title, db, current_user, published)
+    except WrongFileTypeException:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Wrong file type, please send only xml or json",
+        )
+    except ImportingQuizException as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Importing quiz error: {e}",
+        )
+
+
 @router.get(
     "/my_favourite_quizzes",
     response_model=PaginatedQuizResponse,
     summary="Get quizzes marked as favourites",
+    responses={422: {"description": "Unknown fields requested"}},
 )
 async def my_favourite_quizzes(
-    db: AsyncSession = Depends(get_db),
-    current_user: User_model = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     limit: int = 10,
     skip: int = 0,
     search: Optional[str] = "",
+    fields: Optional[List[str]] = Depends(sparse_fields),
 ):
-    return await get_my_favourite_quizzes(db, current_user, limit, skip, search)
+    result = await get_my_favourite_quizzes(
+        db, current_user, limit, skip, search, fields
+    )
+    if fields:
+        return JSONResponse(jsonable_encoder(result))
+    return result
 
 
 @router.get(
     "/my_quizzes",
     response_model=PaginatedQuizResponse,
     summary="Get quizzes created by user",
+    responses={422: {"description": "Unknown fields requested"}},
 )
 async def my_quizzes(
-    db: AsyncSession = Depends(get_db),
-    current_user: User_model = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
     limit: int = 10,
     skip: int = 0,
     search: Optional[str] = "",
+    fields: Optional[List[str]] = Depends(sparse_fields),
 ):
-    return await get_my_quizzes(db, current_user, limit, skip, search)
+    result = await get_my_quizzes(db, current_user, limit, skip, search, fields)
+    if fields:
+        return JSONResponse(jsonable_encoder(result))
+    return result
+
+
+@router.post(
+    "/export",
+    summary="Export many quizzes as a ZIP archive",
+    responses={404: {"description": "No quizzes match the request"}},
+)
+async def export_quizzes(
+    export_request: BulkExportRequest,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+):
+    try:
+        return await export_bulk(export_request, db, current_user)
+    except QuizNotFoundException:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No quizzes match the export request",
+        )
 
 
 @router.post(
@@ -138,7 +249,7 @@ async def my_quizzes(
 async def add_quiz_to_favourites(
     favourite: FavouriteCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User_model = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
 ):
     try:
         return await add_to_favourites(favourite, db, current_user)
@@ -166,7 +277,7 @@ async def add_quiz_to_favourites(
 async def play_the_quiz(
     id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User_model = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
 ):
     try:
         return await get_questions(id, db, current_user)
@@ -191,17 +302,28 @@ async def play_the_quiz(
     "/{id}",
     response_model=QuizOut,
     summary="Get one quiz",
-    responses={404: {"description": "Quiz not found"}},
+    responses={
+        404: {"description": "Quiz not found"},
+        422: {"description": "Unknown fields requested"},
+    },
 )
-async def get_quiz(id: int, db: AsyncSession = Depends(get_db)):
+async def get_quiz(
+    id: int,
+    db: AsyncSession = Depends(get_read_db),
+    fields: Optional[List[str]] = Depends(sparse_fields),
+):
     try:
-        return await get_one_quiz(id, db)
+        quiz = await get_one_quiz(id, db, fields)
     except QuizNotFoundException:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Quiz with id: {id} was not found",
         )
 
+    if fields:
+        return JSONResponse(jsonable_encoder(quiz))
+    return quiz
+
 
 @router.delete(
     "/{id}",
@@ -215,7 +337,7 @@ async def get_quiz(id: int, db: AsyncSession = Depends(get_db)):
 async def delete_quiz(
     id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: User_model = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
 ):
     try:
         await remove_quiz(id, db, current_user)
@@ -246,7 +368,7 @@ async def update_quiz(
     id: int,
     updated_quiz: QuizCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User_model = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
 ):
     try:
         return await update_quiz_values(id, updated_quiz, db, current_user)
@@ -276,7 +398,7 @@ async def update_quiz_questions(
     id: int,
     questions: List[QuestionUpdate],
     db: AsyncSession = Depends(get_db),
-    current_user: User_model = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_current_user),
 ):
     try:
         result = await update_questions(id, questions, db, current_user)
@@ -300,7 +422,7 @@ async def update_quiz_questions(
 )
 async def export_quiz_json(
     quiz_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     try:
         return await export_json(quiz_id, db)
@@ -318,7 +440,7 @@ async def export_quiz_json(
 )
 async def export_xml(
     quiz_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     try:
         return await export_moodle_xml(quiz_id, db)
@@ -332,17 +454,58 @@ async def export_xml(
 @router.get(
     "/{quiz_id}/export/pdf",
     status_code=status.HTTP_201_CREATED,
-    responses={404: {"description": "Quiz not found"}},
+    responses={
+        403: {"description": "User not authorized to perform this action"},
+        404: {"description": "Quiz not found"},
+    },
 )
 async def export_quiz_pdf(
     quiz_id: int,
-    db: AsyncSession = Depends(get_db),
-    current_user: User_model = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+):
+    try:
+        return await export_pdf(quiz_id, db, current_user)
+    except QuizNotFoundException:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Quiz with id: {quiz_id} was not found",
+        )
+    except UserNotAuthorizedException:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to perform requested action",
+        )
+
+
+@router.get(
+    "/{quiz_id}/export/pdf/variants",
+    status_code=status.HTTP_201_CREATED,
+    summary="Export shuffled exam variants",
+    responses={
+        403: {"description": "User not authorized to perform this action"},
+        404: {"description": "Quiz not found"},
+    },
+)
+async def export_quiz_pdf_variants(
+    quiz_id: int,
+    variants: int = Query(default=2, ge=1, le=26),
+    seed: Optional[int] = None,
+    archive: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
 ):
     try:
-        return await export_pdf(quiz_id, db)
+        return await export_pdf_variants(
+            quiz_id, db, variants, seed, archive, current_user
+        )
     except QuizNotFoundException:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Quiz with id: {quiz_id} was not found",
         )
+    except UserNotAuthorizedException:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to perform requested action",
+        )
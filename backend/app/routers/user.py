@@ -1,20 +1,40 @@
-from typing import List
+from typing import Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Response,
+    UploadFile,
+    status,
+)
 from psycopg2 import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.exceptions.admission_exceptions import CapacityExceededException
+from app.exceptions.quiz_exceptions import WrongFileTypeException
 from app.exceptions.user_exceptions import UserNotFoundException
-from app.models.user_models import User
-from app.oauth2 import get_current_user
-from app.schemas.user_schemas import UserCreate, UserOut
+from app.oauth2 import AuthenticatedUser, get_current_user
+from app.schemas.user_schemas import UserAdminUpdate, UserCreate, UserOut, UserPage
+from app.services.admission_services import limit_by_ip
+from app.services.provisioning_services import (
+    REPORT_MEDIA_TYPES,
+    provision_users,
+    provisioning_format,
+    provisioning_report,
+    provisioning_summary,
+)
 from app.services.user_services import (
     create_new_user,
     delete_account,
+    export_users,
     get_one_user,
     get_users,
+    set_admin,
 )
-from app.settings.database import get_db
+from app.settings.config import settings
+from app.settings.database import get_db, get_read_db
 from app.utils import require_admin
 
 router = APIRouter(prefix="/users", tags=["Users"])
@@ -25,11 +45,22 @@ router = APIRouter(prefix="/users", tags=["Users"])
     status_code=status.HTTP_201_CREATED,
     response_model=UserOut,
     summary="Sign up",
-    responses={500: {"description": "User creation failed"}},
+    responses={
+        429: {"description": "Too many sign ups"},
+        500: {"description": "User creation failed"},
+        503: {"description": "Server is busy"},
+    },
+    dependencies=[Depends(limit_by_ip("signup", settings.signup_rate_limit))],
 )
 async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
     try:
         return await create_new_user(user, db)
+    except CapacityExceededException as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please try again later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except IntegrityError:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT, detail="User already exists"
@@ -41,6 +72,40 @@ async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
         )
 
 
+@router.post(
+    "/bulk",
+    summary="Create many users from a CSV or NDJSON file",
+    description="Rows need email and password columns, is_admin is optional. "
+    "Returns a per-row report in the same format as the upload.",
+    response_class=Response,
+    responses={422: {"description": "Wrong file type"}},
+)
+async def create_users_in_bulk(
+    file: UploadFile,
+    db: AsyncSession = Depends(get_db),
+    admin: AuthenticatedUser = Depends(require_admin),
+):
+    try:
+        format = provisioning_format(file.filename)
+    except WrongFileTypeException:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Wrong file type, please send only csv or ndjson",
+        )
+
+    results = await provision_users(file.file, format, db)
+    summary = provisioning_summary(results)
+
+    return Response(
+        content=provisioning_report(results, format),
+        media_type=REPORT_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="provisioning.{format}"',
+            "X-Users-Created": str(summary.get("created", 0)),
+        },
+    )
+
+
 @router.delete(
     "/delete_account",
     status_code=status.HTTP_204_NO_CONTENT,
@@ -48,7 +113,8 @@ async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
     responses={404: {"description": "User not found"}},
 )
 async def delete_youself(
-    db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
 ):
     try:
         await delete_account(db, current_user)
@@ -67,7 +133,7 @@ async def delete_youself(
     summary="Get user data",
     responses={404: {"description": "User not found"}},
 )
-async def get_user(id: int, db: AsyncSession = Depends(get_db)):
+async def get_user(id: int, db: AsyncSession = Depends(get_read_db)):
     try:
         return await get_one_user(id, db)
     except UserNotFoundException:
@@ -77,12 +143,45 @@ async def get_user(id: int, db: AsyncSession = Depends(get_db)):
         )
 
 
-@router.get("", response_model=List[UserOut], summary="Get all users")
+@router.get(
+    "",
+    response_model=UserPage,
+    summary="Get all users",
+    description="Pages are ordered by id, pass next_cursor as after_id to get "
+    "the next one. format=ndjson or format=csv streams every matching user.",
+)
 async def get_all_users(
-    db: AsyncSession = Depends(get_db), admin: User = Depends(require_admin)
+    db: AsyncSession = Depends(get_read_db),
+    admin: AuthenticatedUser = Depends(require_admin),
+    limit: int = Query(default=50, ge=1, le=500),
+    after_id: Optional[int] = None,
+    email_prefix: Optional[str] = None,
+    format: Literal["json", "ndjson", "csv"] = "json",
+):
+    if format != "json":
+        return export_users(format, email_prefix)
+    return await get_users(db, limit, after_id, email_prefix)
+
+
+@router.put(
+    "/{id}/admin",
+    response_model=UserOut,
+    summary="Grant or revoke administrator permissions",
+    responses={404: {"description": "User not found"}},
+)
+async def update_user_admin(
+    id: int,
+    update: UserAdminUpdate,
+    db: AsyncSession = Depends(get_db),
+    admin: AuthenticatedUser = Depends(require_admin),
 ):
-    users = await get_users(db)
-    return users
+    try:
+        return await set_admin(id, update.is_admin, db)
+    except UserNotFoundException:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User with id: {id} does not exist",
+        )
 
 
 @router.delete(
@@ -92,7 +191,9 @@ async def get_all_users(
     responses={404: {"description": "User not found"}},
 )
 async def delete_user(
-    id: int, db: AsyncSession = Depends(get_db), admin: User = Depends(require_admin)
+    id: int,
+    db: AsyncSession = Depends(get_db),
+    admin: AuthenticatedUser = Depends(require_admin),
 ):
     try:
         user = await get_one_user(id, db)
@@ -1,11 +1,15 @@
 from datetime import datetime
-from typing import Dict, List, Literal
+from typing import Dict, List, Literal, Optional
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 from app.schemas.user_schemas import UserOut
 
 
+def option_position(key: str):
+    return (0, int(key), "") if key.isdigit() else (1, 0, key)
+
+
 class QuizBase(BaseModel):
     title: str
     content: str
@@ -46,10 +50,23 @@ class FavouriteCreate(BaseModel):
 
 class QuestionUpdate(BaseModel):
     model_config = ConfigDict(from_attributes=True)
+    id: Optional[int] = None
     question_text: str
     answers: Dict[str, str]
     correct_answer: str
 
+    @model_validator(mode="after")
+    def number_answers(self):
+        keys = sorted(self.answers, key=option_position)
+        numbered = [str(position) for position in range(1, len(keys) + 1)]
+        if keys == numbered:
+            return self
+
+        renumbered = dict(zip(keys, numbered))
+        self.answers = {renumbered[key]: self.answers[key] for key in keys}
+        self.correct_answer = renumbered.get(self.correct_answer, self.correct_answer)
+        return self
+
 
 class QuestionOut(QuestionUpdate):
     model_config = ConfigDict(from_attributes=True)
@@ -62,3 +79,16 @@ class QuestionOut(QuestionUpdate):
 
 class MessageResponse(BaseModel):
     message: str
+
+
+class BulkExportRequest(BaseModel):
+    quiz_ids: Optional[List[int]] = None
+    search: Optional[str] = None
+    only_mine: bool = False
+    formats: List[Literal["json", "xml", "pdf"]] = Field(default=["json"], min_length=1)
+
+
+class QuizImportResponse(BaseModel):
+    quiz_id: int
+    imported: int
+    skipped: int
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import List, Optional
 
 from pydantic import BaseModel, EmailStr
 
@@ -13,6 +14,11 @@ class UserOut(BaseModel):
         orm_mode = True
 
 
+class UserPage(BaseModel):
+    items: List[UserOut]
+    next_cursor: Optional[int] = None
+
+
 class UserCreate(BaseModel):
     email: EmailStr
     password: str
@@ -22,3 +28,7 @@ class UserCreate(BaseModel):
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
+
+
+class UserAdminUpdate(BaseModel):
+    is_admin: bool
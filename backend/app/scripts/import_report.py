@@ -0,0 +1,72 @@
+import argparse
+import re
+import subprocess
+import sys
+from typing import Dict, Iterable, List, NamedTuple
+
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)$")
+
+
+class ImportCost(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def parse_import_times(lines: Iterable[str]) -> List[ImportCost]:
+    costs = []
+    for line in lines:
+        match = IMPORT_TIME_LINE.match(line.rstrip("\n"))
+        if match:
+            self_us, cumulative_us, module = match.groups()
+            costs.append(ImportCost(module, int(self_us), int(cumulative_us)))
+    return costs
+
+
+def import_costs_by_package(costs: List[ImportCost]) -> Dict[str, int]:
+    packages = {}
+    for cost in costs:
+        package = cost.module.partition(".")[0]
+        packages[package] = packages.get(package, 0) + cost.self_us
+    return dict(sorted(packages.items(), key=lambda item: item[1], reverse=True))
+
+
+def import_report(module: str):
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        sys.stderr.write(process.stderr)
+        sys.exit(process.returncode)
+    return parse_import_times(process.stderr.splitlines())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Show what importing the application spends its time on"
+    )
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument(
+        "--by-package", action="store_true", help="sum self time per package"
+    )
+    args = parser.parse_args()
+
+    costs = import_report(args.module)
+    total = max(cost.cumulative_us for cost in costs)
+    print(f"import {args.module}: {total / 1000:.0f}ms, {len(costs)} modules")
+
+    if args.by_package:
+        packages = import_costs_by_package(costs)
+        for package, self_us in list(packages.items())[: args.top]:
+            print(f"{self_us / 1000:10.1f}ms  {package}")
+    else:
+        costs.sort(key=lambda cost: cost.cumulative_us, reverse=True)
+        print(f"{'cumulative':>12}  {'self':>10}  module")
+        for cost in costs[: args.top]:
+            print(
+                f"{cost.cumulative_us / 1000:10.1f}ms"
+                f"  {cost.self_us / 1000:8.1f}ms  {cost.module}"
+            )
@@ -0,0 +1,50 @@
+import argparse
+import asyncio
+import sys
+
+# Imported before the other app modules to get through the models/database cycle.
+import app.models.user_models  # noqa: F401
+from app.services.provisioning_services import (
+    provision_users,
+    provisioning_format,
+    provisioning_report,
+    provisioning_summary,
+    shutdown_hashing_pool,
+)
+from app.settings.database import AsyncSessionLocal
+
+
+async def provision(path: str, output: str):
+    format = provisioning_format(path)
+
+    with open(path, "rb") as stream:
+        async with AsyncSessionLocal() as db:
+            results = await provision_users(stream, format, db)
+
+    report = provisioning_report(results, format)
+    if output == "-":
+        sys.stdout.write(report)
+    else:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(report)
+
+    summary = ", ".join(
+        f"{count} {status}" for status, count in provisioning_summary(results).items()
+    )
+    print(f"Processed {len(results)} rows: {summary}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Create users from a CSV or NDJSON file"
+    )
+    parser.add_argument("path", help="csv, ndjson or jsonl file with email,password")
+    parser.add_argument(
+        "-o", "--output", default="-", help="where to write the per-row report"
+    )
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(provision(args.path, args.output))
+    finally:
+        shutdown_hashing_pool()
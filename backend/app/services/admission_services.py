@@ -0,0 +1,294 @@
+import ipaddress
+import math
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import List, Optional, Tuple, Union
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security.oauth2 import OAuth2PasswordRequestForm
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.exceptions.admission_exceptions import CapacityExceededException
+from app.oauth2 import AuthenticatedUser, get_current_user
+from app.settings.config import settings
+from app.settings.database import AsyncSessionLocal, SQLALCHEMY_DATABASE_URL
+
+RATE_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+DEFAULT_RETRY_AFTER_SECONDS = 30
+RATE_LIMIT_PURGE_EVERY = 1000
+
+# Generic cell rate algorithm: the shared-state equivalent of a token bucket
+# that needs a single timestamp per bucket and one round trip per request.
+GCRA_HIT = text("""
+    WITH hit AS (
+        INSERT INTO rate_limits AS r (bucket, tat)
+        VALUES (:bucket, now() + make_interval(secs => :interval))
+        ON CONFLICT (bucket) DO UPDATE
+        SET tat = greatest(r.tat, now()) + make_interval(secs => :interval)
+        WHERE greatest(r.tat, now()) + make_interval(secs => :interval)
+            <= now() + make_interval(secs => :period)
+        RETURNING r.bucket
+    )
+    SELECT CASE
+        WHEN EXISTS (SELECT 1 FROM hit) THEN 0.0
+        ELSE (
+            SELECT extract(epoch FROM greatest(tat, now()) - now())::float8
+            FROM rate_limits
+            WHERE bucket = :bucket
+        ) + CAST(:interval AS float8) - CAST(:period AS float8)
+    END AS retry_after
+    """)
+PURGE_RATE_LIMITS = text("DELETE FROM rate_limits WHERE tat < now()")
+
+
+def parse_rate(rate: str) -> Optional[Tuple[int, float]]:
+    if not rate:
+        return None
+
+    count, _, period = rate.partition("/")
+    period = period.strip()
+    seconds = RATE_PERIODS[period] if period in RATE_PERIODS else float(period)
+    if int(count) <= 0 or seconds <= 0:
+        raise ValueError(f"Invalid rate limit: {rate}")
+    return int(count), float(seconds)
+
+
+def retry_after_seconds(seconds: float) -> int:
+    return max(1, math.ceil(seconds))
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, tokens: float, updated_at: float):
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+
+class MemoryRateLimiter:
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    async def hit(self, bucket: str, capacity: int, period: float) -> float:
+        now = time.monotonic()
+        refill_rate = capacity / period
+
+        entry = self._buckets.get(bucket)
+        if entry is None:
+            entry = TokenBucket(capacity, now)
+            self._buckets[bucket] = entry
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            elapsed = now - entry.updated_at
+            entry.tokens = min(capacity, entry.tokens + elapsed * refill_rate)
+            entry.updated_at = now
+            self._buckets.move_to_end(bucket)
+
+        if entry.tokens >= 1:
+            entry.tokens -= 1
+            return 0.0
+        return (1 - entry.tokens) / refill_rate
+
+    def clear(self):
+        self._buckets.clear()
+
+
+class PostgresRateLimiter:
+    def __init__(self):
+        self.hits = 0
+
+    async def hit(self, bucket: str, capacity: int, period: float) -> float:
+        self.hits += 1
+        async with AsyncSessionLocal() as db:
+            retry_after = await db.scalar(
+                GCRA_HIT,
+                {"bucket": bucket, "interval": period / capacity, "period": period},
+            )
+            if self.hits % RATE_LIMIT_PURGE_EVERY == 0:
+                await db.execute(PURGE_RATE_LIMITS)
+            await db.commit()
+        return max(0.0, float(retry_after or 0))
+
+
+class ConcurrencyLimiter:
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.in_flight = 0
+        self.completed = 0
+        self.busy_seconds = 0.0
+
+    def retry_after(self) -> int:
+        if not self.completed:
+            return DEFAULT_RETRY_AFTER_SECONDS
+        return retry_after_seconds(self.busy_seconds / self.completed)
+
+    @asynccontextmanager
+    async def hold(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.completed += 1
+            self.busy_seconds += time.perf_counter() - started
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.in_flight >= self.limit:
+            raise CapacityExceededException(self.retry_after())
+
+        self.in_flight += 1
+        try:
+            async with self.hold():
+                yield
+        finally:
+            self.in_flight -= 1
+
+
+class PostgresConcurrencyLimiter(ConcurrencyLimiter):
+    """Slots are session advisory locks, held on a dedicated connection.
+
+    The connections are not pooled: a slot held for a whole generation does
+    not take a pool connection, and closing the connection releases the lock
+    even when the unlock never ran, e.g. because the request was cancelled.
+    """
+
+    def __init__(self, name: str, limit: int):
+        super().__init__(name, limit)
+        self.lock_key = zlib.crc32(name.encode()) & 0x7FFFFFFF
+        self.lock_engine = create_async_engine(
+            SQLALCHEMY_DATABASE_URL, poolclass=NullPool
+        )
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self.lock_engine.connect() as conn:
+            for slot in range(self.limit):
+                acquired = await conn.scalar(
+                    text("SELECT pg_try_advisory_lock(:key, :slot)"),
+                    {"key": self.lock_key, "slot": slot},
+                )
+                if acquired:
+                    break
+            else:
+                raise CapacityExceededException(self.retry_after())
+            await conn.commit()
+
+            self.in_flight += 1
+            try:
+                async with self.hold():
+                    yield
+            finally:
+                self.in_flight -= 1
+                try:
+                    await conn.execute(
+                        text("SELECT pg_advisory_unlock(:key, :slot)"),
+                        {"key": self.lock_key, "slot": slot},
+                    )
+                    await conn.commit()
+                except BaseException:
+                    # Never hand back a connection that may still hold the lock.
+                    await conn.invalidate()
+                    raise
+
+
+if settings.rate_limit_backend == "postgres":
+    rate_limiter = PostgresRateLimiter()
+    generation_slots = PostgresConcurrencyLimiter(
+        "quiz_generation", settings.max_concurrent_generations
+    )
+else:
+    rate_limiter = MemoryRateLimiter(settings.rate_limit_max_keys)
+    generation_slots = ConcurrencyLimiter(
+        "quiz_generation", settings.max_concurrent_generations
+    )
+
+
+async def enforce_rate_limit(bucket: str, rate: Optional[Tuple[int, float]]):
+    if rate is None:
+        return
+
+    retry_after = await rate_limiter.hit(bucket, *rate)
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, please try again later",
+            headers={"Retry-After": str(retry_after_seconds(retry_after))},
+        )
+
+
+def parse_networks(
+    value: str,
+) -> List[Union[ipaddress.IPv4Network, ipaddress.IPv6Network]]:
+    return [
+        ipaddress.ip_network(network.strip(), strict=False)
+        for network in value.split(",")
+        if network.strip()
+    ]
+
+
+TRUSTED_PROXIES = parse_networks(settings.trusted_proxies)
+
+
+def is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+
+def client_ip(request: Request) -> str:
+    host = request.client.host if request.client else "unknown"
+    if not is_trusted_proxy(host):
+        return host
+
+    # Each proxy appends the address it got the request from, so the first
+    # untrusted address from the right is the client.
+    forwarded = request.headers.get("x-forwarded-for", "")
+    addresses = [address.strip() for address in forwarded.split(",")]
+    for address in reversed(addresses):
+        if address and not is_trusted_proxy(address):
+            return address
+    return host
+
+
+def limit_by_ip(name: str, rate: str):
+    parsed_rate = parse_rate(rate)
+
+    async def dependency(request: Request):
+        await enforce_rate_limit(f"{name}:ip:{client_ip(request)}", parsed_rate)
+
+    return dependency
+
+
+def limit_login(rate: str):
+    parsed_rate = parse_rate(rate)
+
+    # Keyed on the account as well, so a class behind one NAT logging in at
+    # once does not share a single bucket. Routes pair it with a looser
+    # limit_by_ip, so one address cannot try unlimited accounts.
+    async def dependency(
+        request: Request, credentials: OAuth2PasswordRequestForm = Depends()
+    ):
+        username = credentials.username.strip().lower()
+        await enforce_rate_limit(
+            f"login:{username}:ip:{client_ip(request)}", parsed_rate
+        )
+
+    return dependency
+
+
+def limit_by_user(name: str, rate: str):
+    parsed_rate = parse_rate(rate)
+
+    async def dependency(current_user: AuthenticatedUser = Depends(get_current_user)):
+        await enforce_rate_limit(f"{name}:user:{current_user.id}", parsed_rate)
+
+    return dependency
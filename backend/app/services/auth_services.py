@@ -4,7 +4,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.user_models import User
-from app.utils import verify
+from app.utils import password_pool, verify
 
 
 async def get_user_for_loging(
@@ -19,7 +19,7 @@ async def get_user_for_loging(
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Invalid Credentials"
         )
-    if not verify(user_credentials.password, user.password):
+    if not await password_pool.run(verify, user_credentials.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Invalid Credentials"
         )
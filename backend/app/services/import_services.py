@@ -0,0 +1,237 @@
+import codecs
+import json
+import xml.etree.ElementTree as ET
+from typing import IO, Iterator, List, Tuple
+
+from fastapi import UploadFile
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.exceptions.quiz_exceptions import (
+    ImportingQuizException,
+    WrongFileTypeException,
+)
+from app.models.quiz_models import Question as Question_model
+from app.models.quiz_models import Quiz as Quiz_model
+from app.oauth2 import AuthenticatedUser
+from app.schemas.quiz_schemas import QuestionUpdate
+
+IMPORT_BATCH_SIZE = 1000
+JSON_READ_SIZE = 64 * 1024
+JSON_WHITESPACE = " \t\r\n"
+
+
+def iter_moodle_questions(stream: IO[bytes]) -> Iterator[dict]:
+    for _, element in ET.iterparse(stream, events=("end",)):
+        if element.tag != "question":
+            continue
+
+        question_type = element.get("type")
+        if question_type == "multichoice":
+            answers = {}
+            correct_answer = None
+            best_fraction = 0.0
+
+            for position, answer in enumerate(element.iterfind("answer"), 1):
+                answers[str(position)] = (answer.findtext("text") or "").strip()
+                fraction = float(answer.get("fraction") or 0)
+                if fraction > best_fraction:
+                    best_fraction = fraction
+                    correct_answer = str(position)
+
+            # Without a correct answer it is invalid and counted as skipped.
+            yield {
+                "question_text": (element.findtext("questiontext/text") or "").strip(),
+                "answers": answers,
+                "correct_answer": correct_answer,
+            }
+        elif question_type != "category":
+            # Category entries are not questions; other types cannot be imported.
+            yield {}
+
+        element.clear()
+
+
+class IncrementalJsonReader:
+    def __init__(self, stream: IO[bytes]):
+        self.stream = stream
+        self.decoder = json.JSONDecoder()
+        self.text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+
+        data = self.stream.read(JSON_READ_SIZE)
+        chunk = self.text_decoder.decode(data, final=not data)
+        if not data:
+            self.eof = True
+            return False
+
+        self.buffer = self.buffer[self.position :] + chunk
+        self.position = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while (
+                self.position < len(self.buffer)
+                and self.buffer[self.position] in JSON_WHITESPACE
+            ):
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON document")
+
+    def expect(self, token: str):
+        if self.peek() != token:
+            raise ValueError(f"Expected {token!r} in JSON document")
+        self.position += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+
+            if end == len(self.buffer) and not self.eof and self.fill():
+                continue
+
+            self.position = end
+            return value
+
+    def array_items(self) -> Iterator:
+        self.expect("[")
+        if self.peek() == "]":
+            self.position += 1
+            return
+
+        while True:
+            yield self.value()
+            if self.peek() == ",":
+                self.position += 1
+                continue
+            self.expect("]")
+            return
+
+    def object_items(self) -> Iterator[Tuple[str, "IncrementalJsonReader"]]:
+        self.expect("{")
+        if self.peek() == "}":
+            self.position += 1
+            return
+
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key, self
+            if self.peek() == ",":
+                self.position += 1
+                continue
+            self.expect("}")
+            return
+
+
+def iter_json_questions(stream: IO[bytes]) -> Iterator[dict]:
+    reader = IncrementalJsonReader(stream)
+
+    if reader.peek() == "[":
+        items = reader.array_items()
+    else:
+        items = None
+        for key, value_reader in reader.object_items():
+            if key == "questions":
+                items = value_reader.array_items()
+                break
+            value_reader.value()
+
+    for item in items or []:
+        if not isinstance(item, dict):
+            yield {}
+            continue
+
+        yield {
+            "question_text": item.get("question", item.get("question_text")),
+            "answers": item.get("answers"),
+            "correct_answer": item.get("correct_answer"),
+        }
+
+
+def next_batch(questions: Iterator[dict], size: int) -> Tuple[List[dict], int]:
+    batch = []
+    skipped = 0
+
+    for raw_question in questions:
+        try:
+            question = QuestionUpdate.model_validate(raw_question)
+        except ValidationError:
+            skipped += 1
+            continue
+
+        batch.append(question.model_dump(exclude={"id"}))
+        if len(batch) >= size:
+            break
+
+    return batch, skipped
+
+
+async def import_quiz(
+    file: UploadFile,
+    title: str,
+    db: AsyncSession,
+    current_user: AuthenticatedUser,
+    published: bool,
+):
+    if file.filename.endswith(".xml"):
+        questions = iter_moodle_questions(file.file)
+    elif file.filename.endswith(".json"):
+        questions = iter_json_questions(file.file)
+    else:
+        raise WrongFileTypeException()
+
+    new_quiz = Quiz_model(
+        title=title,
+        content=f"Imported from {file.filename}",
+        owner_id=current_user.id,
+        published=published,
+    )
+    db.add(new_quiz)
+
+    imported = 0
+    skipped = 0
+
+    try:
+        await db.flush()
+
+        while True:
+            batch, batch_skipped = await run_in_threadpool(
+                next_batch, questions, IMPORT_BATCH_SIZE
+            )
+            skipped += batch_skipped
+            if not batch:
+                break
+
+            for question in batch:
+                question["quiz_id"] = new_quiz.id
+            await db.execute(insert(Question_model), batch)
+            imported += len(batch)
+    except (ET.ParseError, ValueError) as e:
+        await db.rollback()
+        raise ImportingQuizException(str(e))
+
+    if not imported:
+        await db.rollback()
+        raise ImportingQuizException("No valid questions found")
+
+    await db.commit()
+
+    return {"quiz_id": new_quiz.id, "imported": imported, "skipped": skipped}
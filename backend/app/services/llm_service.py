@@ -1,21 +1,55 @@
 import json
+import logging
+import time
 from typing import List
 
-import openai
-
+from app.metrics import SLOW_BUCKETS, registry
 from app.settings.config import settings
 
+logger = logging.getLogger(__name__)
+
 CLARIN_API_KEY = settings.clarin_api_key
 
+LLM_REQUEST_SECONDS = registry.histogram(
+    "llm_request_duration_seconds", "LLM completion latency", buckets=SLOW_BUCKETS
+)
+LLM_TOKENS = registry.counter(
+    "llm_tokens_total", "Tokens used by LLM completions", ["type"]
+)
+LLM_ERRORS = registry.counter(
+    "llm_errors_total", "Failed or unusable LLM completions", ["error"]
+)
+
+
+def create_completion(client, messages: List[dict]):
+    started = time.perf_counter()
+    try:
+        response = client.chat.completions.create(
+            model="gpt-4o",
+            messages=messages,
+            temperature=0.7,
+            max_tokens=2000,
+        )
+    except Exception as e:
+        LLM_ERRORS.labels(type(e).__name__).inc()
+        raise
+    finally:
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - started)
+
+    if response.usage is not None:
+        LLM_TOKENS.labels("prompt").inc(response.usage.prompt_tokens)
+        LLM_TOKENS.labels("completion").inc(response.usage.completion_tokens)
+    return response
+
 
 def send_text_to_llm(text_chunks: List[str], questions_total: int) -> List[dict]:
     QUESTIONS_PER_CHUNK = questions_total // len(text_chunks)
     REMAINDER = questions_total % len(text_chunks)
     all_questions = []
 
-    client = openai.OpenAI(
-        api_key=CLARIN_API_KEY, base_url="https://services.clarin-pl.eu/api/v1/oapi/"
-    )
+    import openai
+
+    client = openai.OpenAI(api_key=CLARIN_API_KEY, base_url=settings.llm_base_url)
 
     system_prompt = """ You are an expert at creating educational quiz questions.
 
@@ -45,16 +79,12 @@ OUTPUT FORMAT (strict JSON array):
 The "C" field is the correct answer number (must be "1", "2", "3", or "4").
 Return ONLY the JSON array, no markdown formatting, no explanations."""
 
-    print(f"Processing {len(text_chunks)} chunks with LLM...")
-
     for i, chunk in enumerate(text_chunks):
         if not chunk.strip():
             continue
 
         questions_for_chunk = QUESTIONS_PER_CHUNK + (1 if i < REMAINDER else 0)
 
-        print(f"Chunk {i}/{len(text_chunks)} ({len(chunk)} chars)...")
-
         user_prompt = f"""Generate EXACTLY {questions_for_chunk} quiz questions from the following text.
 
     TEXT:
@@ -63,23 +93,15 @@ Return ONLY the JSON array, no markdown formatting, no explanations."""
 Remember: Return ONLY the JSON array with {questions_for_chunk} questions."""
 
         try:
-            print("Calling GPT-4o...")
-
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
+            response = create_completion(
+                client,
+                [
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt},
                 ],
-                temperature=0.7,
-                max_tokens=2000,
             )
 
             content = response.choices[0].message.content.strip()
-            print(f"Received response: {len(content)} chars")
-
-            print(f"Response preview: {content[:200]}...")
-
             if content.startswith("```json"):
                 content = content[7:]
             if content.startswith("```"):
@@ -89,38 +111,26 @@ Remember: Return ONLY the JSON array with {questions_for_chunk} questions."""
             content = content.strip()
 
             questions = json.loads(content)
-            print(f"Parsed: {len(questions)} questions")
 
             if not isinstance(questions, list):
-                print(f"ERROR: Expected list, got {type(questions)}\n")
+                logger.warning(f"Chunk {i}: expected a list, got {type(questions)}")
                 continue
 
             valid_questions = []
-            for idx, q in enumerate(questions, 1):
+            for q in questions:
                 if all(key in q for key in ["Q", "A", "C"]):
                     if isinstance(q["A"], dict) and q["C"] in ["1", "2", "3", "4"]:
                         valid_questions.append(q)
-                        print(f"Q{idx}: {q['Q'][:50]}...")
-                    else:
-                        print(f"Q{idx}: Invalid structure")
-                else:
-                    print(f"Q{idx}: Missing keys")
 
             all_questions.extend(valid_questions)
-            print(f"\nCHUNK {i} COMPLETE: {len(valid_questions)} valid questions added")
-            print(f"Running total: {len(all_questions)} questions\n")
 
         except json.JSONDecodeError as e:
-            print(f"JSON PARSE ERROR: {e}")
-            print(f"Full response:\n{content}\n")
+            LLM_ERRORS.labels(type(e).__name__).inc()
+            logger.warning(f"Chunk {i}: unparsable LLM response: {e}")
             continue
 
-        except Exception as e:
-            print(f"ERROR: {e}\n")
+        except Exception:
+            logger.exception(f"Chunk {i}: generating questions failed")
             continue
 
-    print(f"{'=' * 60}")
-    print(f"FINAL RESULT: {len(all_questions)} questions generated")
-    print(f"{'=' * 60}\n")
-
     return all_questions
@@ -0,0 +1,256 @@
+import os
+import random
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, List, Optional, Tuple
+
+from app.schemas.quiz_schemas import option_position
+from app.settings.config import settings
+from app.utils import smart_split
+
+DEJAVU_REGULAR_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+DEJAVU_BOLD_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+
+FONT_REGULAR = "Helvetica"
+FONT_BOLD = "Helvetica-Bold"
+
+ExamQuestion = Tuple[str, dict, str]
+
+render_pool: Optional[ProcessPoolExecutor] = None
+
+
+def register_fonts():
+    global FONT_REGULAR, FONT_BOLD
+
+    if FONT_REGULAR == "DejaVu":
+        return
+
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    try:
+        pdfmetrics.registerFont(TTFont("DejaVu", DEJAVU_REGULAR_PATH))
+        pdfmetrics.registerFont(TTFont("DejaVu-Bold", DEJAVU_BOLD_PATH))
+        FONT_REGULAR = "DejaVu"
+        FONT_BOLD = "DejaVu-Bold"
+    except Exception:
+        FONT_REGULAR = "Helvetica"
+        FONT_BOLD = "Helvetica-Bold"
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    global render_pool
+
+    if render_pool is None:
+        render_pool = ProcessPoolExecutor(
+            max_workers=settings.pdf_render_workers, initializer=register_fonts
+        )
+    return render_pool
+
+
+def shutdown_render_pool():
+    global render_pool
+
+    if render_pool is not None:
+        render_pool.shutdown(cancel_futures=True)
+        render_pool = None
+
+
+def cached_pdf_path(quiz_id: int, version: int) -> str:
+    return os.path.join(settings.pdf_cache_dir, f"{quiz_id}-v{version}.pdf")
+
+
+def temporary_pdf_path(quiz_id: int) -> str:
+    os.makedirs(settings.pdf_cache_dir, exist_ok=True)
+    return os.path.join(settings.pdf_cache_dir, f"{quiz_id}-{uuid.uuid4().hex}.tmp")
+
+
+def open_cached_pdf(quiz_id: int, version: int) -> Optional[IO[bytes]]:
+    # Callers get an open file, so eviction unlinking the path afterwards
+    # cannot break a response that is still being sent.
+    path = cached_pdf_path(quiz_id, version)
+    try:
+        pdf = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+    return pdf
+
+
+def draw_exam(c, title: str, questions: List[ExamQuestion]):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+
+    width, height = letter
+    c.setFont(FONT_BOLD, 12)
+    c.drawString(1 * inch, height - 0.8 * inch, f"Quiz: {title}")
+    c.setFont(FONT_REGULAR, 10)
+    c.drawString(1 * inch, height - 1.1 * inch, f"Total Questions: {len(questions)}")
+    c.drawString(1 * inch, height - 1.35 * inch, "Name: ____________________________")
+    c.drawString(4 * inch, height - 1.35 * inch, "Date: ____________________________")
+    c.line(0.75 * inch, height - 1.5 * inch, width - 0.75 * inch, height - 1.5 * inch)
+    y_position = height - 2 * inch
+    answer_key = []
+
+    for idx, (question_text, answers, correct_answer) in enumerate(questions, 1):
+        if y_position < 2.5 * inch:
+            c.showPage()
+            y_position = height - 1 * inch
+        c.setFont(FONT_BOLD, 8)
+        lines = smart_split(f"{idx}. {question_text}", 70)
+        for line in lines:
+            c.drawString(1 * inch, y_position, line)
+            y_position -= 0.2 * inch
+        c.setFont(FONT_REGULAR, 8)
+
+        sorted_keys = sorted(answers.keys(), key=option_position)
+        correct_letter = correct_answer
+        for i, key in enumerate(sorted_keys):
+            answer_letter = chr(65 + i)
+            if key == str(correct_answer):
+                correct_letter = answer_letter
+            lines = smart_split(f"   {answer_letter}. {answers[key]}", 95)
+            for line in lines:
+                c.drawString(1.2 * inch, y_position, line)
+                y_position -= 0.2 * inch
+
+        answer_key.append(f"{idx}. {correct_letter}")
+        y_position -= 0.1 * inch
+
+    c.showPage()
+    c.setFont(FONT_BOLD, 10)
+    title_width = c.stringWidth("ANSWER KEY", FONT_BOLD, 10)
+    c.drawString((width - title_width) / 2, height - 1 * inch, "ANSWER KEY")
+    c.line(0.75 * inch, height - 1.2 * inch, width - 0.75 * inch, height - 1.2 * inch)
+    y_position = height - 1.6 * inch
+    c.setFont(FONT_REGULAR, 8)
+    page_center = width / 2
+    col_spacing = 2 * inch
+    columns = [page_center - col_spacing, page_center, page_center + col_spacing]
+    for idx, answer in enumerate(answer_key):
+        c.drawString(columns[idx % 3], y_position, answer)
+        if (idx + 1) % 3 == 0:
+            y_position -= 0.2 * inch
+            if y_position < 1 * inch:
+                c.showPage()
+                c.setFont(FONT_BOLD, 12)
+                title_width = c.stringWidth("ANSWER KEY (continued)", FONT_BOLD, 12)
+                c.drawString(
+                    (width - title_width) / 2,
+                    height - 1 * inch,
+                    "ANSWER KEY (continued)",
+                )
+                c.setFont(FONT_REGULAR, 8)
+                y_position = height - 1.5 * inch
+    c.showPage()
+
+
+def evict_pdf_cache(directory: str, max_bytes: int, keep: Optional[str] = None):
+    entries = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.name.endswith(".pdf") and entry.path != keep:
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    if keep is not None:
+        total += os.path.getsize(keep)
+
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def render_exam(path: str, title: str, questions: List[ExamQuestion]) -> str:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    register_fonts()
+    c = canvas.Canvas(path, pagesize=letter)
+    draw_exam(c, title, questions)
+    c.save()
+    return path
+
+
+def store_cached_pdf(quiz_id: int, version: int, tmp_path: str) -> str:
+    path = cached_pdf_path(quiz_id, version)
+    os.replace(tmp_path, path)
+
+    for name in os.listdir(settings.pdf_cache_dir):
+        stale = os.path.join(settings.pdf_cache_dir, name)
+        if name.startswith(f"{quiz_id}-v") and name.endswith(".pdf") and stale != path:
+            try:
+                os.remove(stale)
+            except FileNotFoundError:
+                pass
+
+    evict_pdf_cache(settings.pdf_cache_dir, settings.pdf_cache_max_bytes, keep=path)
+    return path
+
+
+def variant_label(index: int) -> str:
+    return chr(65 + index)
+
+
+def shuffle_exam(
+    questions: List[ExamQuestion], seed: int, index: int
+) -> List[ExamQuestion]:
+    rng = random.Random(f"{seed}-{index}")
+    shuffled = []
+
+    for question_text, answers, correct_answer in rng.sample(questions, len(questions)):
+        keys = sorted(answers, key=option_position)
+        rng.shuffle(keys)
+        renumbered = {
+            str(position): answers[key] for position, key in enumerate(keys, 1)
+        }
+        correct = str(keys.index(correct_answer) + 1) if correct_answer in keys else ""
+        shuffled.append((question_text, renumbered, correct))
+
+    return shuffled
+
+
+def render_variant(
+    path: str, title: str, questions: List[ExamQuestion], seed: int, index: int
+) -> str:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    register_fonts()
+    c = canvas.Canvas(path, pagesize=letter)
+    draw_exam(
+        c,
+        f"{title} (Group {variant_label(index)})",
+        shuffle_exam(questions, seed, index),
+    )
+    c.save()
+    return path
+
+
+def merge_pdfs(paths: List[str], out_path: str) -> str:
+    import pymupdf
+
+    merged = pymupdf.open()
+    for path in paths:
+        with pymupdf.open(path) as document:
+            merged.insert_pdf(document)
+    merged.save(out_path)
+    merged.close()
+    return out_path
+
+
+def zip_files(paths: List[str], out_path: str, prefix: str = "") -> str:
+    with zipfile.ZipFile(out_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for path in paths:
+            archive.write(path, arcname=f"{prefix}{os.path.basename(path)}")
+    return out_path
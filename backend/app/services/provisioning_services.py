@@ -0,0 +1,220 @@
+import asyncio
+import csv
+import io
+import json
+import math
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.exceptions.quiz_exceptions import WrongFileTypeException
+from app.models.user_models import User
+from app.schemas.user_schemas import UserCreate
+from app.settings.config import settings
+from app.utils import hash
+
+PROVISIONING_FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+REPORT_COLUMNS = ("row", "email", "status", "id", "error")
+REPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+hashing_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_hashing_pool() -> ProcessPoolExecutor:
+    global hashing_pool
+
+    if hashing_pool is None:
+        hashing_pool = ProcessPoolExecutor(
+            max_workers=settings.provisioning_hash_workers
+        )
+    return hashing_pool
+
+
+def shutdown_hashing_pool():
+    global hashing_pool
+
+    if hashing_pool is not None:
+        hashing_pool.shutdown(cancel_futures=True)
+        hashing_pool = None
+
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    return [hash(password) for password in passwords]
+
+
+async def hash_passwords_in_parallel(passwords: List[str]) -> List[str]:
+    if not passwords:
+        return []
+
+    loop = asyncio.get_running_loop()
+    chunk_size = math.ceil(len(passwords) / settings.provisioning_hash_workers)
+    chunks = [
+        passwords[start : start + chunk_size]
+        for start in range(0, len(passwords), chunk_size)
+    ]
+    hashed = await asyncio.gather(
+        *(
+            loop.run_in_executor(get_hashing_pool(), hash_passwords, chunk)
+            for chunk in chunks
+        )
+    )
+    return [password for chunk in hashed for password in chunk]
+
+
+def provisioning_format(filename: str) -> str:
+    for suffix, format in PROVISIONING_FORMATS.items():
+        if filename.endswith(suffix):
+            return format
+    raise WrongFileTypeException()
+
+
+def iter_csv_rows(stream: IO[bytes]) -> Iterator[Tuple[int, object]]:
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig"))
+    for row_number, row in enumerate(reader, 1):
+        yield row_number, {key: value for key, value in row.items() if value}
+
+
+def iter_ndjson_rows(stream: IO[bytes]) -> Iterator[Tuple[int, object]]:
+    for row_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield row_number, json.loads(line)
+        except ValueError as e:
+            yield row_number, e
+
+
+def next_rows(rows: Iterator, size: int) -> List[Tuple[int, object]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            break
+    return batch
+
+
+def result_row(row_number: int, email, status: str, id=None, error=None) -> dict:
+    return {
+        "row": row_number,
+        "email": email,
+        "status": status,
+        "id": id,
+        "error": error,
+    }
+
+
+async def provision_batch(
+    rows: List[Tuple[int, object]], seen: set, db: AsyncSession
+) -> List[dict]:
+    results = {}
+    pending = []
+
+    for row_number, raw_user in rows:
+        email = raw_user.get("email") if isinstance(raw_user, dict) else None
+        try:
+            if isinstance(raw_user, Exception):
+                raise ValueError(f"Malformed row: {raw_user}")
+            user = UserCreate.model_validate(raw_user)
+        except (ValidationError, ValueError) as e:
+            message = e.errors()[0]["msg"] if isinstance(e, ValidationError) else e
+            results[row_number] = result_row(
+                row_number, email, "invalid", error=str(message)
+            )
+            continue
+
+        if user.email in seen:
+            results[row_number] = result_row(row_number, user.email, "duplicate")
+            continue
+        seen.add(user.email)
+        pending.append((row_number, user))
+
+    if pending:
+        existing = await db.execute(
+            select(User.email)
+            .where(User.email.in_([user.email for _, user in pending]))
+            .execution_options(include_deleted=True)
+        )
+        existing_emails = set(existing.scalars())
+        for row_number, user in pending:
+            if user.email in existing_emails:
+                results[row_number] = result_row(row_number, user.email, "exists")
+        pending = [
+            (row_number, user)
+            for row_number, user in pending
+            if user.email not in existing_emails
+        ]
+
+    if pending:
+        hashed_passwords = await hash_passwords_in_parallel(
+            [user.password for _, user in pending]
+        )
+        inserted = await db.execute(
+            insert(User)
+            .values(
+                [
+                    {
+                        "email": user.email,
+                        "password": hashed_password,
+                        "is_admin": user.is_admin,
+                    }
+                    for (_, user), hashed_password in zip(pending, hashed_passwords)
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=[User.email])
+            .returning(User.id, User.email)
+        )
+        created = {email: id for id, email in inserted.all()}
+        await db.commit()
+
+        for row_number, user in pending:
+            if user.email in created:
+                results[row_number] = result_row(
+                    row_number, user.email, "created", id=created[user.email]
+                )
+            else:
+                results[row_number] = result_row(row_number, user.email, "exists")
+
+    return [results[row_number] for row_number, _ in rows]
+
+
+async def provision_users(
+    stream: IO[bytes], format: str, db: AsyncSession
+) -> List[dict]:
+    iter_rows = iter_csv_rows if format == "csv" else iter_ndjson_rows
+    rows = iter_rows(stream)
+    seen = set()
+    results = []
+
+    while True:
+        batch = await run_in_threadpool(
+            next_rows, rows, settings.provisioning_batch_size
+        )
+        if not batch:
+            break
+        results.extend(await provision_batch(batch, seen, db))
+
+    return results
+
+
+def provisioning_report(results: List[dict], format: str) -> str:
+    if format == "ndjson":
+        return "".join(json.dumps(result) + "\n" for result in results)
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=REPORT_COLUMNS)
+    writer.writeheader()
+    writer.writerows(results)
+    return buffer.getvalue()
+
+
+def provisioning_summary(results: List[dict]) -> dict:
+    summary = {}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+    return summary
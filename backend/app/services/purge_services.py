@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy import delete, exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.quiz_models import Question as Question_model
+from app.models.quiz_models import Quiz as Quiz_model
+from app.models.user_models import User as User_model
+from app.settings.config import settings
+from app.settings.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+purge_requested = asyncio.Event()
+
+
+def request_purge():
+    purge_requested.set()
+
+
+def deleted_quiz_ids():
+    return select(Quiz_model.id).where(Quiz_model.deleted_at.is_not(None))
+
+
+async def purge_questions_batch(db: AsyncSession, batch_size: int) -> int:
+    batch = (
+        select(Question_model.id)
+        .where(Question_model.quiz_id.in_(deleted_quiz_ids()))
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        delete(Question_model)
+        .where(Question_model.id.in_(batch.scalar_subquery()))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+async def purge_quizzes_batch(db: AsyncSession, batch_size: int) -> int:
+    batch = (
+        select(Quiz_model.id)
+        .where(
+            Quiz_model.deleted_at.is_not(None),
+            ~exists().where(Question_model.quiz_id == Quiz_model.id),
+        )
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        delete(Quiz_model)
+        .where(Quiz_model.id.in_(batch.scalar_subquery()))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+async def purge_users_batch(db: AsyncSession, batch_size: int) -> int:
+    batch = (
+        select(User_model.id)
+        .where(
+            User_model.deleted_at.is_not(None),
+            ~exists().where(Quiz_model.owner_id == User_model.id),
+        )
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        delete(User_model)
+        .where(User_model.id.in_(batch.scalar_subquery()))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+PURGE_STEPS = (purge_questions_batch, purge_quizzes_batch, purge_users_batch)
+
+
+async def purge_deleted(db: AsyncSession, batch_size: int) -> int:
+    purged = 0
+
+    for step in PURGE_STEPS:
+        while True:
+            deleted = await step(db, batch_size)
+            await db.commit()
+            purged += deleted
+            if deleted < batch_size:
+                break
+
+    return purged
+
+
+async def run_purger(interval_seconds: Optional[float] = None):
+    interval_seconds = interval_seconds or settings.purge_interval_seconds
+
+    while True:
+        purge_requested.clear()
+        try:
+            async with AsyncSessionLocal() as db:
+                purged = await purge_deleted(db, settings.purge_batch_size)
+            if purged:
+                logger.info(f"Purged {purged} soft deleted rows")
+        except Exception:
+            logger.exception("Purging soft deleted rows failed")
+
+        try:
+            await asyncio.wait_for(purge_requested.wait(), interval_seconds)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,78 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.settings.config import settings
+
+
+class QuestionSet:
+    __slots__ = ("quiz_id", "version", "payload", "expires_at")
+
+    def __init__(self, quiz_id: int, version: int, payload: bytes, expires_at: float):
+        self.quiz_id = quiz_id
+        self.version = version
+        self.payload = payload
+        self.expires_at = expires_at
+
+
+class QuestionSetCache:
+    """LRU of serialised question sets bounded by total payload bytes.
+
+    Entries carry the Quiz.version they were read at. Callers compare it with
+    the current version before serving one, so an edit made through any worker
+    is seen at once; invalidate only frees the memory early.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: int):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.total_bytes = 0
+        self._entries: "OrderedDict[int, QuestionSet]" = OrderedDict()
+
+    def get(self, quiz_id: int) -> Optional[QuestionSet]:
+        entry = self._entries.get(quiz_id)
+        if entry is None:
+            return None
+
+        if entry.expires_at < time.monotonic():
+            self._remove(quiz_id)
+            return None
+
+        self._entries.move_to_end(quiz_id)
+        return entry
+
+    def put(self, quiz_id: int, version: int, payload: bytes) -> None:
+        if len(payload) > self.max_bytes:
+            return
+
+        current = self._entries.get(quiz_id)
+        if current is not None and current.version > version:
+            # A slower read of an older version must not replace a newer one.
+            return
+
+        self._remove(quiz_id)
+        self._entries[quiz_id] = QuestionSet(
+            quiz_id, version, payload, time.monotonic() + self.ttl_seconds
+        )
+        self.total_bytes += len(payload)
+
+        while self.total_bytes > self.max_bytes:
+            oldest_id = next(iter(self._entries))
+            self._remove(oldest_id)
+
+    def invalidate(self, quiz_id: int) -> None:
+        self._remove(quiz_id)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.total_bytes = 0
+
+    def _remove(self, quiz_id: int) -> None:
+        entry = self._entries.pop(quiz_id, None)
+        if entry is not None:
+            self.total_bytes -= len(entry.payload)
+
+
+question_cache = QuestionSetCache(
+    settings.question_cache_max_bytes, settings.question_cache_ttl_seconds
+)
@@ -1,79 +1,279 @@
+import asyncio
 import json
+import os
+import random
+import shutil
 import tempfile
-from typing import List, Optional
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
+import time
+import zipfile
+from functools import lru_cache
+from typing import IO, FrozenSet, List, Optional
+from urllib.parse import quote
+from xml.sax.saxutils import escape
 
-import pymupdf
-import pymupdf4llm
-from reportlab.lib.pagesizes import letter
 from fastapi import Response, UploadFile
-from fastapi.responses import FileResponse
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.units import inch
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
-from sqlalchemy import Result, delete, func, select
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import (
+    and_,
+    bindparam,
+    delete,
+    func,
+    insert,
+    or_,
+    select,
+    true,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from starlette.background import BackgroundTask
 
 from app.exceptions.quiz_exceptions import (
     ActionAlreadyDoneException,
     CreatingQuizException,
+    InvalidFieldsException,
     QuestionsNotFoundException,
     QuizNotFoundException,
     UserNotAuthorizedException,
     WrongFileTypeException,
 )
+from app.metrics import SLOW_BUCKETS, registry
 from app.models.quiz_models import Favourite as Favourite_model
 from app.models.quiz_models import Question as Question_model
 from app.models.quiz_models import Quiz as Quiz_model
 from app.models.user_models import User as User_model
-from app.pdf_parser.parser import PDFParser
-from app.schemas.quiz_schemas import FavouriteCreate, QuestionUpdate, QuizCreate
+from app.oauth2 import AuthenticatedUser
+from app.schemas.quiz_schemas import (
+    BulkExportRequest,
+    FavouriteCreate,
+    QuestionOut,
+    QuestionUpdate,
+    QuizCreate,
+)
 from app.services.llm_service import send_text_to_llm
+from app.services.pdf_services import (
+    get_render_pool,
+    merge_pdfs,
+    open_cached_pdf,
+    render_exam,
+    render_variant,
+    store_cached_pdf,
+    temporary_pdf_path,
+    variant_label,
+    zip_files,
+)
+from app.services.purge_services import request_purge
+from app.services.question_cache import question_cache
 from app.settings.config import settings
-from app.utils import smart_split, split_text
+from app.settings.database import hide_deleted, read_session_factory
+from app.utils import ZipStream, split_text
 
 MAX_NUMBER_OF_SENTENCES_IN_ONE_CHUNK = settings.max_number_of_sentences_in_one_chunk
 
+QUESTIONS_PER_FETCH = 500
+
+MOODLE_XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n<quiz>\n'
+MOODLE_XML_FOOTER = "</quiz>\n"
+
+EXPORT_FILE_SUFFIXES = {
+    "json": "_questions.json",
+    "xml": "_moodle.xml",
+    "pdf": "_test.pdf",
+}
+
+QUESTIONS_ADAPTER = TypeAdapter(List[QuestionOut])
+
+PDF_EXTRACTION_SECONDS = registry.histogram(
+    "pdf_extraction_duration_seconds",
+    "Time to extract text from uploaded PDFs",
+    buckets=SLOW_BUCKETS,
+)
+PDF_EXTRACTED_BYTES = registry.counter(
+    "pdf_extracted_bytes_total", "Bytes of uploaded PDFs text was extracted from"
+)
+EXPORT_SECONDS = registry.histogram(
+    "export_duration_seconds",
+    "Time to build and send JSON, Moodle XML and bulk ZIP exports",
+    ["format"],
+    buckets=SLOW_BUCKETS,
+)
+PDF_RENDER_SECONDS = registry.histogram(
+    "pdf_render_duration_seconds",
+    "Time to render exported PDFs, including waiting for a render worker",
+    ["kind"],
+    buckets=SLOW_BUCKETS,
+)
+
+QUIZ_FIELDS = {
+    "id": Quiz_model.id,
+    "title": Quiz_model.title,
+    "content": Quiz_model.content,
+    "published": Quiz_model.published,
+    "created_at": Quiz_model.created_at,
+    "owner_id": Quiz_model.owner_id,
+}
+OWNER_FIELDS = {
+    "owner__id": User_model.id,
+    "owner__email": User_model.email,
+    "owner__is_admin": User_model.is_admin,
+    "owner__created_at": User_model.created_at,
+}
+SPARSE_FIELDS = set(QUIZ_FIELDS) | {"owner", "favourites"}
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    if not requested or not set(requested) <= SPARSE_FIELDS:
+        raise InvalidFieldsException()
+
+    return list(dict.fromkeys(requested))
+
+
+def build_sparse_quiz_query(fields: FrozenSet[str]):
+    columns = [
+        column.label(name) for name, column in QUIZ_FIELDS.items() if name in fields
+    ]
+    group_by = [Quiz_model.id]
+
+    if "owner" in fields:
+        columns += [column.label(name) for name, column in OWNER_FIELDS.items()]
+        group_by.append(User_model.id)
+    if "favourites" in fields:
+        columns.append(func.count(Favourite_model.quiz_id).label("favourites"))
+
+    query = select(*columns).select_from(Quiz_model)
+
+    if "owner" in fields:
+        query = query.join(User_model, User_model.id == Quiz_model.owner_id)
+    if "favourites" in fields:
+        query = query.outerjoin(
+            Favourite_model, Favourite_model.quiz_id == Quiz_model.id
+        ).group_by(*group_by)
+
+    return query
+
+
+def to_sparse_item(row, fields: List[str]) -> dict:
+    mapping = row._mapping
+    quiz = {name: mapping[name] for name in QUIZ_FIELDS if name in fields}
+
+    if "owner" in fields:
+        quiz["owner"] = {
+            name.removeprefix("owner__"): mapping[name] for name in OWNER_FIELDS
+        }
+
+    item = {"Quiz": quiz}
+    if "favourites" in fields:
+        item["favourites"] = mapping["favourites"]
+    return item
+
+
+QUIZ_BY_ID = hide_deleted(select(Quiz_model).where(Quiz_model.id == bindparam("id")))
+
+
+def quiz_scope(scope: str):
+    if scope == "published":
+        return Quiz_model.published
+    if scope == "mine":
+        return Quiz_model.owner_id == bindparam("user_id")
+    # A filter rather than a join, so the favourites column still counts
+    # every user's favourites and not just the current user's one.
+    return Quiz_model.id.in_(
+        select(Favourite_model.quiz_id).where(
+            Favourite_model.user_id == bindparam("user_id")
+        )
+    )
+
+
+def with_search(query, search: bool):
+    if search:
+        query = query.where(Quiz_model.title.ilike(bindparam("search")))
+    return query
+
+
+@lru_cache(maxsize=None)
+def quiz_count_statement(scope: str, search: bool):
+    query = select(func.count(Quiz_model.id)).where(quiz_scope(scope))
+    return hide_deleted(with_search(query, search))
+
+
+@lru_cache(maxsize=None)
+def quiz_page_statement(scope: str, search: bool, fields: Optional[FrozenSet[str]]):
+    if fields:
+        query = build_sparse_quiz_query(fields)
+    else:
+        query = (
+            select(Quiz_model, func.count(Favourite_model.quiz_id).label("favourites"))
+            .outerjoin(Favourite_model, Favourite_model.quiz_id == Quiz_model.id)
+            .options(selectinload(Quiz_model.owner))
+            .group_by(Quiz_model.id)
+        )
+
+    query = with_search(query.where(quiz_scope(scope)), search)
+    return hide_deleted(query.limit(bindparam("limit")).offset(bindparam("skip")))
+
+
+@lru_cache(maxsize=None)
+def quiz_statement(fields: Optional[FrozenSet[str]]):
+    if fields:
+        query = build_sparse_quiz_query(fields)
+    else:
+        query = (
+            select(Quiz_model, func.count(Favourite_model.quiz_id).label("favourites"))
+            .outerjoin(Favourite_model, Favourite_model.quiz_id == Quiz_model.id)
+            .options(selectinload(Quiz_model.owner))
+            .group_by(Quiz_model.id)
+        )
+    return hide_deleted(query.where(Quiz_model.id == bindparam("id")))
+
 
 async def get_quiz_by_id(id, db) -> Quiz_model:
-    result = await db.execute(select(Quiz_model).where(Quiz_model.id == id))
+    result = await db.execute(QUIZ_BY_ID, {"id": id})
     quiz = result.scalar_one_or_none()
     if not quiz:
         raise QuizNotFoundException()
     return quiz
 
 
-async def get_all_quizzes(
-    db: AsyncSession, limit: int, skip: int, search: Optional[str]
+async def list_quizzes(
+    db: AsyncSession,
+    scope: str,
+    limit: int,
+    skip: int,
+    search: Optional[str],
+    fields: Optional[List[str]],
+    user_id: Optional[int] = None,
 ):
-    count_query = select(func.count(Quiz_model.id)).where(Quiz_model.published)
+    params = {"user_id": user_id, "limit": limit, "skip": skip}
     if search:
-        count_query = count_query.where(Quiz_model.title.ilike(f"%{search}%"))
+        params["search"] = f"%{search}%"
 
-    total_result = await db.execute(count_query)
+    total_result = await db.execute(quiz_count_statement(scope, bool(search)), params)
     total = total_result.scalar()
 
-    query = (
-        select(Quiz_model, func.count(Favourite_model.quiz_id).label("favourites"))
-        .outerjoin(Favourite_model, Favourite_model.quiz_id == Quiz_model.id)
-        .options(selectinload(Quiz_model.owner))
-        .group_by(Quiz_model.id)
-        .where(Quiz_model.published)
-        .limit(limit)
-        .offset(skip)
+    result = await db.execute(
+        quiz_page_statement(scope, bool(search), frozenset(fields or ())), params
     )
 
-    if search:
-        query = query.where(Quiz_model.title.ilike(f"%{search}%"))
+    if fields:
+        items = [to_sparse_item(row, fields) for row in result.all()]
+        return {"items": items, "total": total}
+
+    return {"items": result.all(), "total": total}
 
-    result = await db.execute(query)
-    quizzes = result.all()
 
-    return {"items": quizzes, "total": total}
+async def get_all_quizzes(
+    db: AsyncSession,
+    limit: int,
+    skip: int,
+    search: Optional[str],
+    fields: Optional[List[str]] = None,
+):
+    return await list_quizzes(db, "published", limit, skip, search, fields)
 
 
 async def insert_new_quiz(
@@ -81,7 +281,7 @@ async def insert_new_quiz(
     title: str,
     questions_total: str,
     db: AsyncSession,
-    current_user: User_model,
+    current_user: AuthenticatedUser,
     published: bool,
 ):
     text_content = None
@@ -90,19 +290,18 @@ async def insert_new_quiz(
     if file.filename.endswith(".txt"):
         text_content = content.decode("utf-8")
     elif file.filename.endswith(".pdf"):
+        import pymupdf
+        import pymupdf4llm
+
         # parser = PDFParser(content, debug=True)
         # text_content = parser.parse()
-        pdf_doc = pymupdf.open(stream=content, filetype="pdf")
+        with PDF_EXTRACTION_SECONDS.time():
+            pdf_doc = pymupdf.open(stream=content, filetype="pdf")
 
-        text_content = pymupdf4llm.to_markdown(pdf_doc)
+            text_content = pymupdf4llm.to_markdown(pdf_doc)
 
-        pdf_doc.close()
-        if text_content:
-            print(f"Successfully extracted {len(text_content)} characters")
-            preview = text_content[:200].replace("\n", " ")
-            print(f"Preview: {preview}")
-        else:
-            print("No text extracted")
+            pdf_doc.close()
+        PDF_EXTRACTED_BYTES.inc(len(content))
     else:
         raise WrongFileTypeException()
 
@@ -119,7 +318,6 @@ async def insert_new_quiz(
         quiz_questions = send_text_to_llm(text_in_chunks, questions_total)
 
         if not quiz_questions:
-            print("Warning: No questions generated, using fallback")
             raise Exception("No questions generated from text")
 
         for question in quiz_questions:
@@ -140,102 +338,100 @@ async def insert_new_quiz(
 
 
 async def get_my_favourite_quizzes(
-    db: AsyncSession, current_user: User_model, limit: int, skip: int, search: str
+    db: AsyncSession,
+    current_user: AuthenticatedUser,
+    limit: int,
+    skip: int,
+    search: str,
+    fields: Optional[List[str]] = None,
 ):
-    count_query = (
-        select(func.count(Quiz_model.id))
-        .join(Favourite_model, Favourite_model.quiz_id == Quiz_model.id)
-        .where(Favourite_model.user_id == current_user.id)
-    )
-    if search:
-        count_query = count_query.where(Quiz_model.title.ilike(f"%{search}%"))
-
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-
-    query = (
-        select(Quiz_model, func.count(Favourite_model.quiz_id).label("favourites"))
-        .join(Favourite_model, Favourite_model.quiz_id == Quiz_model.id)
-        .where(Favourite_model.user_id == current_user.id)
-        .options(selectinload(Quiz_model.owner))
-        .group_by(Quiz_model.id)
-        .limit(limit)
-        .offset(skip)
+    return await list_quizzes(
+        db, "favourites", limit, skip, search, fields, current_user.id
     )
 
-    if search:
-        query = query.where(Quiz_model.title.ilike(f"%{search}%"))
-
-    result = await db.execute(query)
-    quizzes = result.all()
-
-    return {"items": quizzes, "total": total}
-
 
 async def get_my_quizzes(
-    db: AsyncSession, current_user: User_model, limit: int, skip: int, search: str
+    db: AsyncSession,
+    current_user: AuthenticatedUser,
+    limit: int,
+    skip: int,
+    search: str,
+    fields: Optional[List[str]] = None,
 ):
-    count_query = select(func.count(Quiz_model.id)).where(
-        Quiz_model.owner_id == current_user.id
-    )
-    if search:
-        count_query = count_query.where(Quiz_model.title.ilike(f"%{search}%"))
+    return await list_quizzes(db, "mine", limit, skip, search, fields, current_user.id)
 
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-
-    query = (
-        select(Quiz_model, func.count(Favourite_model.quiz_id).label("favourites"))
-        .outerjoin(Favourite_model, Favourite_model.quiz_id == Quiz_model.id)
-        .options(selectinload(Quiz_model.owner))
-        .group_by(Quiz_model.id)
-        .where(Quiz_model.owner_id == current_user.id)
-        .limit(limit)
-        .offset(skip)
-    )
-
-    if search:
-        query = query.where(Quiz_model.title.ilike(f"%{search}%"))
 
-    result = await db.execute(query)
-    quizzes = result.all()
-
-    return {"items": quizzes, "total": total}
-
-
-async def get_one_quiz(id, db) -> Result:
-    query = (
-        select(Quiz_model, func.count(Favourite_model.quiz_id).label("favourites"))
-        .outerjoin(Favourite_model, Favourite_model.quiz_id == Quiz_model.id)
-        .options(selectinload(Quiz_model.owner))
-        .group_by(Quiz_model.id)
-        .where(Quiz_model.id == id)
-    )
-
-    result = await db.execute(query)
+async def get_one_quiz(id, db, fields: Optional[List[str]] = None):
+    result = await db.execute(quiz_statement(frozenset(fields or ())), {"id": id})
     quiz = result.first()
 
     if not quiz:
         raise QuizNotFoundException()
 
+    if fields:
+        return to_sparse_item(quiz, fields)
     return quiz
 
 
-async def get_questions(id, db, current_user) -> List[Question_model]:
-    quiz = await get_quiz_by_id(id, db)
+QUESTIONS_ALLOWED = or_(
+    Quiz_model.published, Quiz_model.owner_id == bindparam("user_id")
+)
+# Questions are only joined when the caller's cached copy is not the current
+# version, so a cache hit still checks access and version in one row.
+QUESTIONS_STATEMENT = hide_deleted(
+    select(
+        Quiz_model.version,
+        QUESTIONS_ALLOWED.label("allowed"),
+        Question_model.id,
+        Question_model.quiz_id,
+        Question_model.question_text,
+        Question_model.answers,
+        Question_model.correct_answer,
+    )
+    .outerjoin(
+        Question_model,
+        and_(
+            Question_model.quiz_id == Quiz_model.id,
+            QUESTIONS_ALLOWED,
+            Quiz_model.version != bindparam("cached_version"),
+        ),
+    )
+    .where(Quiz_model.id == bindparam("id"))
+    .order_by(Question_model.id)
+)
 
-    if not quiz.published:
-        if quiz.owner_id != current_user.id:
-            raise UserNotAuthorizedException()
 
+async def get_questions(id, db, current_user) -> Response:
+    cached = question_cache.get(id)
     result = await db.execute(
-        select(Question_model).where(Question_model.quiz_id == id)
+        QUESTIONS_STATEMENT,
+        {
+            "id": id,
+            "user_id": current_user.id,
+            "cached_version": -1 if cached is None else cached.version,
+        },
     )
-    questions = result.scalars().all()
+    rows = result.all()
+
+    if not rows:
+        raise QuizNotFoundException()
+
+    quiz = rows[0]
+    if not quiz.allowed:
+        raise UserNotAuthorizedException()
 
-    if not questions:
+    if cached is not None and cached.version == quiz.version:
+        return Response(content=cached.payload, media_type="application/json")
+
+    if quiz.id is None:
         raise QuestionsNotFoundException()
-    return questions
+
+    payload = QUESTIONS_ADAPTER.dump_json(
+        QUESTIONS_ADAPTER.validate_python([row._mapping for row in rows])
+    )
+    question_cache.put(id, quiz.version, payload)
+
+    return Response(content=payload, media_type="application/json")
 
 
 async def remove_quiz(id, db, current_user):
@@ -247,15 +443,17 @@ async def remove_quiz(id, db, current_user):
     if quiz.owner_id != current_user.id and not current_user.is_admin:
         raise UserNotAuthorizedException()
 
-    await db.delete(quiz)
+    quiz.deleted_at = func.now()
     await db.commit()
+    question_cache.invalidate(id)
+    request_purge()
 
 
 async def update_quiz_values(
     id: int,
     updated_quiz: QuizCreate,
     db: AsyncSession,
-    current_user: User_model,
+    current_user: AuthenticatedUser,
 ):
     quiz = await get_quiz_by_id(id, db)
 
@@ -267,8 +465,10 @@ async def update_quiz_values(
 
     for key, value in updated_quiz.dict().items():
         setattr(quiz, key, value)
+    quiz.version = Quiz_model.version + 1
 
     await db.commit()
+    question_cache.invalidate(id)
     await db.refresh(quiz)
     return quiz
 
@@ -277,7 +477,7 @@ async def update_questions(
     id: int,
     questions: List[QuestionUpdate],
     db: AsyncSession,
-    current_user: User_model,
+    current_user: AuthenticatedUser,
 ):
     quiz = await get_quiz_by_id(id, db)
     if not quiz:
@@ -286,26 +486,59 @@ async def update_questions(
     if quiz.owner_id != current_user.id:
         raise UserNotAuthorizedException()
 
-    await db.execute(delete(Question_model).where(Question_model.quiz_id == id))
+    result = await db.execute(
+        select(
+            Question_model.id,
+            Question_model.question_text,
+            Question_model.answers,
+            Question_model.correct_answer,
+        ).where(Question_model.quiz_id == id)
+    )
+    current = {row.id: row for row in result.all()}
+
+    to_insert = []
+    to_update = []
+    kept_ids = set()
 
     for question_data in questions:
-        new_question = Question_model(
-            quiz_id=id,
-            question_text=question_data.question_text,
-            answers=question_data.answers,
-            correct_answer=question_data.correct_answer,
-        )
-        db.add(new_question)
+        values = {
+            "question_text": question_data.question_text,
+            "answers": question_data.answers,
+            "correct_answer": question_data.correct_answer,
+        }
+        existing = current.get(question_data.id)
+
+        if existing is None or question_data.id in kept_ids:
+            to_insert.append({"quiz_id": id, **values})
+            continue
+
+        kept_ids.add(existing.id)
+        if any(getattr(existing, key) != value for key, value in values.items()):
+            to_update.append({"id": existing.id, **values})
+
+    to_delete = [question_id for question_id in current if question_id not in kept_ids]
+
+    if to_delete:
+        await db.execute(delete(Question_model).where(Question_model.id.in_(to_delete)))
+    if to_update:
+        await db.execute(update(Question_model), to_update)
+    if to_insert:
+        await db.execute(insert(Question_model), to_insert)
+    quiz.version = Quiz_model.version + 1
 
     await db.commit()
+    question_cache.invalidate(id)
 
-    return {"message": f"Updated {len(questions)} questions"}
+    return {
+        "message": f"Updated {len(questions)} questions "
+        f"({len(to_insert)} added, {len(to_update)} changed, {len(to_delete)} removed)"
+    }
 
 
 async def add_to_favourites(
     favourite: FavouriteCreate,
     db: AsyncSession,
-    current_user: User_model,
+    current_user: AuthenticatedUser,
 ):
     result = await db.execute(
         select(Quiz_model).where(Quiz_model.id == favourite.quiz_id)
@@ -346,90 +579,125 @@ async def add_to_favourites(
         return {"message": "Successfully deleted from favourites"}
 
 
-async def export_moodle_xml(quiz_id, db):
-    result = await db.execute(select(Quiz_model).where(Quiz_model.id == quiz_id))
-    quiz = result.scalar_one_or_none()
-    if not quiz:
-        raise QuizNotFoundException
-    
-    questions_result = await db.execute(
-        select(Question_model).where(Question_model.quiz_id == quiz_id)
+def moodle_xml_question(idx: int, question) -> str:
+    question_text, answers, correct_answer = question
+    answers_xml = "".join(
+        f'    <answer fraction="{"100" if key == correct_answer else "0"}"'
+        ' format="html">\n'
+        f"      <text>{escape(text)}</text>\n"
+        "    </answer>\n"
+        for key, text in answers.items()
     )
-    questions = questions_result.scalars().all()
-    
-    root = ET.Element("quiz")
-    
-    for idx, q in enumerate(questions, 1):
-        answers_dict = json.loads(q.answers) if isinstance(q.answers, str) else q.answers
-        
-        question = ET.SubElement(root, "question", type="multichoice")
-        
-        name = ET.SubElement(question, "name")
-        name_text = ET.SubElement(name, "text")
-        name_text.text = f"Question {idx}"
-        
-        questiontext = ET.SubElement(question, "questiontext", format="html")
-        questiontext_text = ET.SubElement(questiontext, "text")
-        questiontext_text.text = q.question_text
-        
-        ET.SubElement(question, "defaultgrade").text = "1"
-        ET.SubElement(question, "penalty").text = "0.3333333"
-        ET.SubElement(question, "shuffleanswers").text = "true"
-        ET.SubElement(question, "single").text = "true"
-        ET.SubElement(question, "answernumbering").text = "abc"
-        
-        for answer_key, answer_text in answers_dict.items():
-            is_correct = answer_key == q.correct_answer
-            fraction = "100" if is_correct else "0"
-            
-            answer = ET.SubElement(question, "answer", fraction=fraction, format="html")
-            answer_text_elem = ET.SubElement(answer, "text")
-            answer_text_elem.text = answer_text
-
-    xml_string = ET.tostring(root, encoding='unicode')
-    
-    dom = minidom.parseString(xml_string)
-    pretty_xml = dom.toprettyxml(indent="  ", encoding="UTF-8")
-    
-    return Response(
-        content=pretty_xml,
-        media_type="application/xml",
-        headers={
-            "Content-Disposition": f'attachment; filename="{quiz.title}_moodle.xml"'
-        },
+
+    return (
+        '  <question type="multichoice">\n'
+        "    <name>\n"
+        f"      <text>Question {idx}</text>\n"
+        "    </name>\n"
+        '    <questiontext format="html">\n'
+        f"      <text>{escape(question_text)}</text>\n"
+        "    </questiontext>\n"
+        "    <defaultgrade>1</defaultgrade>\n"
+        "    <penalty>0.3333333</penalty>\n"
+        "    <shuffleanswers>true</shuffleanswers>\n"
+        "    <single>true</single>\n"
+        "    <answernumbering>abc</answernumbering>\n"
+        f"{answers_xml}"
+        "  </question>\n"
     )
 
 
-async def export_json(quiz_id, db):
-    result = await db.execute(select(Quiz_model).where(Quiz_model.id == quiz_id))
-    quiz = result.scalar_one_or_none()
+async def stream_questions(quiz_id: int):
+    session_factory = await read_session_factory()
+    async with session_factory() as db:
+        result = await db.stream(
+            select(
+                Question_model.question_text,
+                Question_model.answers,
+                Question_model.correct_answer,
+            )
+            .where(Question_model.quiz_id == quiz_id)
+            .order_by(Question_model.id)
+            .execution_options(yield_per=QUESTIONS_PER_FETCH)
+        )
+        async for question in result:
+            yield question
 
-    if not quiz:
+
+async def stream_moodle_xml(quiz_id: int):
+    with EXPORT_SECONDS.labels("xml").time():
+        yield MOODLE_XML_HEADER
+
+        idx = 0
+        async for question in stream_questions(quiz_id):
+            idx += 1
+            yield moodle_xml_question(idx, question)
+
+        yield MOODLE_XML_FOOTER
+
+
+async def export_moodle_xml(quiz_id, db):
+    result = await db.execute(select(Quiz_model.title).where(Quiz_model.id == quiz_id))
+    title = result.scalar_one_or_none()
+    if title is None:
         raise QuizNotFoundException
 
-    questions_result = await db.execute(
-        select(Question_model).where(Question_model.quiz_id == quiz_id)
+    return StreamingResponse(
+        stream_moodle_xml(quiz_id),
+        media_type="application/xml",
+        headers={"Content-Disposition": f'attachment; filename="{title}_moodle.xml"'},
     )
-    questions = questions_result.scalars().all()
 
+
+def quiz_json_document(title: str, created_at, questions) -> bytes:
     export_data = {
-        "quiz_title": quiz.title,
-        "created_at": str(quiz.created_at),
+        "quiz_title": title,
+        "created_at": str(created_at),
         "total_questions": len(questions),
         "questions": [
             {
-                "question": q.question_text,
-                "answers": json.loads(q.answers)
-                if isinstance(q.answers, str)
-                else q.answers,
-                "correct_answer": q.correct_answer,
+                "question": question_text,
+                "answers": answers,
+                "correct_answer": correct_answer,
             }
-            for q in questions
+            for question_text, answers, correct_answer in questions
         ],
     }
+    return json.dumps(export_data, ensure_ascii=False, indent=2).encode()
+
+
+def quiz_moodle_xml_document(questions) -> bytes:
+    body = "".join(
+        moodle_xml_question(idx, question) for idx, question in enumerate(questions, 1)
+    )
+    return f"{MOODLE_XML_HEADER}{body}{MOODLE_XML_FOOTER}".encode()
+
+
+async def export_json(quiz_id, db):
+    result = await db.execute(
+        select(Quiz_model.title, Quiz_model.created_at).where(Quiz_model.id == quiz_id)
+    )
+    quiz = result.one_or_none()
+
+    if not quiz:
+        raise QuizNotFoundException
+
+    with EXPORT_SECONDS.labels("json").time():
+        questions_result = await db.execute(
+            select(
+                Question_model.question_text,
+                Question_model.answers,
+                Question_model.correct_answer,
+            )
+            .where(Question_model.quiz_id == quiz_id)
+            .order_by(Question_model.id)
+        )
+        content = quiz_json_document(
+            quiz.title, quiz.created_at, questions_result.all()
+        )
 
     return Response(
-        content=json.dumps(export_data, ensure_ascii=False, indent=2),
+        content=content,
         media_type="application/json",
         headers={
             "Content-Disposition": f'attachment; filename="{quiz.title}_questions.json"'
@@ -437,107 +705,286 @@ async def export_json(quiz_id, db):
     )
 
 
-async def export_pdf(quiz_id: int, db: AsyncSession):
-    try:
-        pdfmetrics.registerFont(
-            TTFont("DejaVu", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf")
-        )
-        pdfmetrics.registerFont(
-            TTFont(
-                "DejaVu-Bold", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
-            )
-        )
-        FONT_REGULAR = "DejaVu"
-        FONT_BOLD = "DejaVu-Bold"
-    except Exception:
-        FONT_REGULAR = "Helvetica"
-        FONT_BOLD = "Helvetica-Bold"
-    result = await db.execute(select(Quiz_model).where(Quiz_model.id == quiz_id))
-    quiz = result.scalar_one_or_none()
-    if not quiz:
+def export_allowed(current_user: AuthenticatedUser):
+    if current_user.is_admin:
+        return true()
+    return or_(Quiz_model.published, Quiz_model.owner_id == current_user.id)
+
+
+async def get_exportable_quiz(
+    quiz_id: int, db: AsyncSession, current_user: AuthenticatedUser
+):
+    result = await db.execute(
+        select(
+            Quiz_model.title,
+            Quiz_model.version,
+            export_allowed(current_user).label("allowed"),
+        ).where(Quiz_model.id == quiz_id)
+    )
+    quiz = result.one_or_none()
+    if quiz is None:
         raise QuizNotFoundException
+    if not quiz.allowed:
+        raise UserNotAuthorizedException()
+    return quiz
+
+
+async def get_question_rows(quiz_id: int, db: AsyncSession):
     questions_result = await db.execute(
-        select(Question_model).where(Question_model.quiz_id == quiz_id)
+        select(
+            Question_model.question_text,
+            Question_model.answers,
+            Question_model.correct_answer,
+        )
+        .where(Question_model.quiz_id == quiz_id)
+        .order_by(Question_model.id)
     )
-    questions = questions_result.scalars().all()
-    tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-    tmp_path = tmp_file.name
-    tmp_file.close()
-    c = canvas.Canvas(tmp_path, pagesize=letter)
-    width, height = letter
-    c.setFont(FONT_BOLD, 12)
-    c.drawString(1 * inch, height - 0.8 * inch, f"Quiz: {quiz.title}")
-    c.setFont(FONT_REGULAR, 10)
-    c.drawString(1 * inch, height - 1.1 * inch, f"Total Questions: {len(questions)}")
-    c.drawString(1 * inch, height - 1.35 * inch, "Name: ____________________________")
-    c.drawString(4 * inch, height - 1.35 * inch, "Date: ____________________________")
-    c.line(0.75 * inch, height - 1.5 * inch, width - 0.75 * inch, height - 1.5 * inch)
-    y_position = height - 2 * inch
-    answer_key = []
-    
-    number_to_letter = {'1': 'A', '2': 'B', '3': 'C', '4': 'D', '5': 'E', '6': 'F'}
-    
-    for idx, q in enumerate(questions, 1):
-        if y_position < 2.5 * inch:
-            c.showPage()
-            y_position = height - 1 * inch
-        c.setFont(FONT_BOLD, 8)
-        question_text = f"{idx}. {q.question_text}"
-        lines = smart_split(question_text, 70)
-        for line in lines:
-            c.drawString(1 * inch, y_position, line)
-            y_position -= 0.2 * inch
-        c.setFont(FONT_REGULAR, 8)
-        answers = json.loads(q.answers) if isinstance(q.answers, str) else q.answers
-        
-        sorted_keys = sorted(answers.keys())
-        for i, key in enumerate(sorted_keys):
-            answer_letter = chr(65 + i)
-            answer_text = f"   {answer_letter}. {answers[key]}"
-            lines = smart_split(answer_text, 95)
-            for line in lines:
-                c.drawString(1.2 * inch, y_position, line)
-                y_position -= 0.2 * inch
-        
-        correct_num = q.correct_answer
-        correct_letter = number_to_letter.get(str(correct_num), correct_num)
-        answer_key.append(f"{idx}. {correct_letter}")
-        y_position -= 0.1 * inch
-        
-    c.showPage()
-    c.setFont(FONT_BOLD, 10)
-    title_width = c.stringWidth("ANSWER KEY", FONT_BOLD, 10)
-    c.drawString((width - title_width) / 2, height - 1 * inch, "ANSWER KEY")
-    c.line(0.75 * inch, height - 1.2 * inch, width - 0.75 * inch, height - 1.2 * inch)
-    y_position = height - 1.6 * inch
-    c.setFont(FONT_REGULAR, 8)
-    page_center = width / 2
-    col_spacing = 2 * inch
-    col1_x = page_center - col_spacing
-    col2_x = page_center
-    col3_x = page_center + col_spacing
-    for idx, answer in enumerate(answer_key):
-        if idx % 3 == 0:
-            x_pos = col1_x
-        elif idx % 3 == 1:
-            x_pos = col2_x
+    return [tuple(row) for row in questions_result.all()]
+
+
+async def render_in_pool(kind: str, render, *args):
+    loop = asyncio.get_running_loop()
+    with PDF_RENDER_SECONDS.labels(kind).time():
+        return await loop.run_in_executor(get_render_pool(), render, *args)
+
+
+async def render_exam_pdf(
+    quiz_id: int, version: int, title: str, questions: list
+) -> IO[bytes]:
+    tmp_path = temporary_pdf_path(quiz_id)
+    try:
+        await render_in_pool("exam", render_exam, tmp_path, title, questions)
+        # Opened before it is published, so eviction can only unlink the name.
+        pdf = open(tmp_path, "rb")
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, store_cached_pdf, quiz_id, version, tmp_path
+            )
+        except BaseException:
+            pdf.close()
+            raise
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return pdf
+
+
+def iter_file(file: IO[bytes], chunk_size: int = 64 * 1024):
+    with file:
+        while chunk := file.read(chunk_size):
+            yield chunk
+
+
+def attachment(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+async def export_pdf(quiz_id: int, db: AsyncSession, current_user: AuthenticatedUser):
+    quiz = await get_exportable_quiz(quiz_id, db, current_user)
+    pdf = open_cached_pdf(quiz_id, quiz.version)
+    if pdf is None:
+        questions = await get_question_rows(quiz_id, db)
+        pdf = await render_exam_pdf(quiz_id, quiz.version, quiz.title, questions)
+
+    return StreamingResponse(
+        iter_file(pdf),
+        media_type="application/pdf",
+        headers={
+            "Content-Length": str(os.fstat(pdf.fileno()).st_size),
+            "Content-Disposition": attachment(f"{quiz.title}_test.pdf"),
+        },
+    )
+
+
+async def export_pdf_variants(
+    quiz_id: int,
+    db: AsyncSession,
+    variants: int,
+    seed: Optional[int],
+    archive: bool,
+    current_user: AuthenticatedUser,
+):
+    title = (await get_exportable_quiz(quiz_id, db, current_user)).title
+    questions = await get_question_rows(quiz_id, db)
+    name = title.replace("/", "_")
+
+    if seed is None:
+        seed = random.randrange(2**31)
+
+    loop = asyncio.get_running_loop()
+    pool = get_render_pool()
+    work_dir = tempfile.mkdtemp(prefix="quiz_variants_")
+
+    try:
+        paths = await asyncio.gather(
+            *(
+                render_in_pool(
+                    "variant",
+                    render_variant,
+                    os.path.join(work_dir, f"group_{variant_label(index)}.pdf"),
+                    title,
+                    questions,
+                    seed,
+                    index,
+                )
+                for index in range(variants)
+            )
+        )
+
+        if archive:
+            out_path = await loop.run_in_executor(
+                pool,
+                zip_files,
+                paths,
+                os.path.join(work_dir, "variants.zip"),
+                f"{name}_",
+            )
+            media_type = "application/zip"
+            filename = f"{name}_variants.zip"
         else:
-            x_pos = col3_x
-        c.drawString(x_pos, y_position, answer)
-        if (idx + 1) % 3 == 0:
-            y_position -= 0.2 * inch
-            if y_position < 1 * inch:
-                c.showPage()
-                c.setFont(FONT_BOLD, 12)
-                title_width = c.stringWidth("ANSWER KEY (continued)", FONT_BOLD, 12)
-                c.drawString((width - title_width) / 2, height - 1 * inch, "ANSWER KEY (continued)")
-                c.setFont(FONT_REGULAR, 8)
-                y_position = height - 1.5 * inch
-    c.save()
+            out_path = await loop.run_in_executor(
+                pool, merge_pdfs, paths, os.path.join(work_dir, "variants.pdf")
+            )
+            media_type = "application/pdf"
+            filename = f"{name}_variants.pdf"
+    except Exception:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
 
     return FileResponse(
-        tmp_path,
-        media_type="application/pdf",
-        filename=f"{quiz.title}_test.pdf",
-        background=None,
+        out_path,
+        media_type=media_type,
+        filename=filename,
+        headers={"X-Exam-Seed": str(seed)},
+        background=BackgroundTask(shutil.rmtree, work_dir, ignore_errors=True),
+    )
+
+
+async def resolve_bulk_export(
+    export_request: BulkExportRequest, db: AsyncSession, current_user: AuthenticatedUser
+) -> List[int]:
+    query = (
+        select(Quiz_model.id)
+        .where(export_allowed(current_user))
+        .order_by(Quiz_model.id)
+    )
+    if export_request.quiz_ids is not None:
+        query = query.where(Quiz_model.id.in_(export_request.quiz_ids))
+    if export_request.search:
+        query = query.where(Quiz_model.title.ilike(f"%{export_request.search}%"))
+    if export_request.only_mine:
+        query = query.where(Quiz_model.owner_id == current_user.id)
+
+    result = await db.execute(query)
+    quiz_ids = result.scalars().all()
+
+    if not quiz_ids:
+        raise QuizNotFoundException()
+
+    return quiz_ids
+
+
+async def fetch_export_quizzes(quiz_ids: List[int], queue: asyncio.Queue):
+    try:
+        session_factory = await read_session_factory()
+        async with session_factory() as db:
+            for quiz_id in quiz_ids:
+                result = await db.execute(
+                    select(
+                        Quiz_model.title, Quiz_model.created_at, Quiz_model.version
+                    ).where(Quiz_model.id == quiz_id)
+                )
+                quiz = result.one_or_none()
+                if quiz is None:
+                    continue
+
+                questions_result = await db.execute(
+                    select(
+                        Question_model.question_text,
+                        Question_model.answers,
+                        Question_model.correct_answer,
+                    )
+                    .where(Question_model.quiz_id == quiz_id)
+                    .order_by(Question_model.id)
+                )
+                questions = [tuple(row) for row in questions_result.all()]
+
+                await queue.put(
+                    (quiz_id, quiz.title, quiz.created_at, quiz.version, questions)
+                )
+    except Exception as e:
+        await queue.put(e)
+        return
+
+    await queue.put(None)
+
+
+def write_zip_entries(archive: zipfile.ZipFile, entries):
+    for name, content in entries:
+        if isinstance(content, bytes):
+            archive.writestr(name, content)
+            continue
+        info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_STORED
+        with content, archive.open(info, "w") as entry:
+            shutil.copyfileobj(content, entry)
+
+
+async def stream_bulk_export(quiz_ids: List[int], formats: List[str]):
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=1)
+    producer = asyncio.create_task(fetch_export_quizzes(quiz_ids, queue))
+    stream = ZipStream()
+
+    try:
+        with EXPORT_SECONDS.labels("zip").time():
+            with zipfile.ZipFile(
+                stream, "w", compression=zipfile.ZIP_DEFLATED
+            ) as archive:
+                while (item := await queue.get()) is not None:
+                    if isinstance(item, Exception):
+                        raise item
+
+                    quiz_id, title, created_at, version, questions = item
+                    name = f"{quiz_id}_{title.replace('/', '_')}"
+                    entries = []
+
+                    for export_format in formats:
+                        if export_format == "json":
+                            content = quiz_json_document(title, created_at, questions)
+                        elif export_format == "xml":
+                            content = quiz_moodle_xml_document(questions)
+                        else:
+                            content = open_cached_pdf(quiz_id, version)
+                            if content is None:
+                                content = await render_exam_pdf(
+                                    quiz_id, version, title, questions
+                                )
+                        entries.append(
+                            (f"{name}{EXPORT_FILE_SUFFIXES[export_format]}", content)
+                        )
+
+                    await loop.run_in_executor(
+                        None, write_zip_entries, archive, entries
+                    )
+                    yield stream.drain()
+
+            yield stream.drain()
+    finally:
+        producer.cancel()
+
+
+async def export_bulk(
+    export_request: BulkExportRequest, db: AsyncSession, current_user: AuthenticatedUser
+):
+    quiz_ids = await resolve_bulk_export(export_request, db, current_user)
+    formats = list(dict.fromkeys(export_request.formats))
+
+    return StreamingResponse(
+        stream_bulk_export(quiz_ids, formats),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="quizzes_export.zip"'},
     )
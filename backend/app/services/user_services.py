@@ -1,15 +1,33 @@
+import csv
+import io
+import json
+from functools import lru_cache
+from typing import Optional, Union
+
+from fastapi.responses import StreamingResponse
 from psycopg2 import IntegrityError
-from sqlalchemy import select
+from sqlalchemy import bindparam, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.exceptions.user_exceptions import UserCreatingException, UserNotFoundException
+from app.models.quiz_models import Quiz
 from app.models.user_models import User
+from app.oauth2 import AuthenticatedUser, user_cache
 from app.schemas.user_schemas import UserCreate
-from app.utils import hash
+from app.services.purge_services import request_purge
+from app.services.question_cache import question_cache
+from app.settings.database import hide_deleted, read_session_factory
+from app.utils import hash, password_pool
+
+USER_COLUMNS = ("id", "email", "is_admin", "created_at")
+USERS_PER_FETCH = 1000
+
+
+USER_BY_ID = hide_deleted(select(User).where(User.id == bindparam("id")))
 
 
 async def get_one_user(id: int, db: AsyncSession) -> User:
-    result = await db.execute(select(User).where(User.id == id))
+    result = await db.execute(USER_BY_ID, {"id": id})
     user = result.scalar_one_or_none()
 
     if not user:
@@ -18,16 +36,106 @@ async def get_one_user(id: int, db: AsyncSession) -> User:
     return user
 
 
-async def get_users(db: AsyncSession) -> User:
-    result = await db.execute(select(User))
-    users = result.scalars()
-
-    return users
+def email_prefix_pattern(email_prefix: str) -> str:
+    escaped = email_prefix.lower().replace("/", "//")
+    return escaped.replace("%", "/%").replace("_", "/_") + "%"
+
+
+def users_params(email_prefix: Optional[str], **params) -> dict:
+    if email_prefix:
+        params["email_pattern"] = email_prefix_pattern(email_prefix)
+    return params
+
+
+@lru_cache(maxsize=None)
+def users_statement(filtered: bool, after_id: bool = False, limit: bool = False):
+    query = select(*(getattr(User, column) for column in USER_COLUMNS))
+    if filtered:
+        query = query.where(
+            func.lower(User.email).like(bindparam("email_pattern"), escape="/")
+        )
+    if after_id:
+        query = query.where(User.id > bindparam("after_id"))
+    query = query.order_by(User.id)
+    if limit:
+        query = query.limit(bindparam("limit"))
+    return hide_deleted(query)
+
+
+async def get_users(
+    db: AsyncSession,
+    limit: int = 50,
+    after_id: Optional[int] = None,
+    email_prefix: Optional[str] = None,
+) -> dict:
+    result = await db.execute(
+        users_statement(bool(email_prefix), after_id is not None, True),
+        users_params(email_prefix, after_id=after_id, limit=limit + 1),
+    )
+    users = result.all()
+
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = users[-1].id
+
+    return {"items": users, "next_cursor": next_cursor}
+
+
+async def stream_user_batches(email_prefix: Optional[str]):
+    session_factory = await read_session_factory()
+    async with session_factory() as db:
+        result = await db.stream(
+            users_statement(bool(email_prefix)),
+            users_params(email_prefix),
+            execution_options={"yield_per": USERS_PER_FETCH},
+        )
+        async for users in result.partitions():
+            yield users
+
+
+def user_record(user) -> dict:
+    return {
+        "id": user.id,
+        "email": user.email,
+        "is_admin": user.is_admin,
+        "created_at": user.created_at.isoformat(),
+    }
+
+
+async def stream_users_ndjson(email_prefix: Optional[str]):
+    async for users in stream_user_batches(email_prefix):
+        yield "".join(json.dumps(user_record(user)) + "\n" for user in users)
+
+
+async def stream_users_csv(email_prefix: Optional[str]):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=USER_COLUMNS)
+    writer.writeheader()
+    yield buffer.getvalue()
+
+    async for users in stream_user_batches(email_prefix):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(user_record(user) for user in users)
+        yield buffer.getvalue()
+
+
+def export_users(format: str, email_prefix: Optional[str]) -> StreamingResponse:
+    if format == "csv":
+        return StreamingResponse(
+            stream_users_csv(email_prefix),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="users.csv"'},
+        )
+    return StreamingResponse(
+        stream_users_ndjson(email_prefix), media_type="application/x-ndjson"
+    )
 
 
 async def create_new_user(user: UserCreate, db: AsyncSession) -> User:
     try:
-        hashed_password = hash(user.password)
+        hashed_password = await password_pool.run(hash, user.password)
         user.password = hashed_password
 
         new_user = User(**user.model_dump())
@@ -45,12 +153,42 @@ async def create_new_user(user: UserCreate, db: AsyncSession) -> User:
         raise
 
 
-async def delete_account(db: AsyncSession, user: User):
+def revoke_tokens(user: User):
+    # Tokens carry the version they were issued with; the callers also drop
+    # the user from user_cache once the change is committed.
+    user.token_version = User.token_version + 1
+
+
+async def set_admin(id: int, is_admin: bool, db: AsyncSession) -> User:
+    user = await get_one_user(id, db)
+
+    user.is_admin = is_admin
+    revoke_tokens(user)
+    await db.commit()
+    await db.refresh(user)
+    user_cache.invalidate(user.id)
+
+    return user
+
+
+async def delete_account(db: AsyncSession, user: Union[User, AuthenticatedUser]):
     result = await db.execute(select(User).where(User.id == user.id))
     user = result.scalar_one_or_none()
 
     if not user:
         raise UserNotFoundException()
 
-    await db.delete(user)
+    user.deleted_at = func.now()
+    revoke_tokens(user)
+    result = await db.execute(
+        update(Quiz)
+        .where(Quiz.owner_id == user.id, Quiz.deleted_at.is_(None))
+        .values(deleted_at=func.now())
+        .returning(Quiz.id)
+    )
+    quiz_ids = result.scalars().all()
     await db.commit()
+    user_cache.invalidate(user.id)
+    for quiz_id in quiz_ids:
+        question_cache.invalidate(quiz_id)
+    request_purge()
@@ -1,3 +1,7 @@
+import os
+import tempfile
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 
@@ -14,6 +18,57 @@ class Settings(BaseSettings):
     default_admin_email: str
     default_admin_password: str
     clarin_api_key: str
+    llm_base_url: str = "https://services.clarin-pl.eu/api/v1/oapi/"
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_pool_timeout: float = 30
+    database_pool_recycle: int = 1800
+    database_pool_pre_ping: bool = True
+    database_statement_cache_size: int = 100
+    database_prepared_statement_cache_size: int = 100
+    database_replica_hostname: Optional[str] = None
+    database_replica_port: Optional[str] = None
+    replica_max_lag_seconds: float = 5
+    replica_lag_check_seconds: float = 5
+    question_cache_max_bytes: int = 32 * 1024 * 1024
+    question_cache_ttl_seconds: int = 60
+    pdf_cache_dir: str = os.path.join(tempfile.gettempdir(), "quiz_pdf_cache")
+    pdf_cache_max_bytes: int = 256 * 1024 * 1024
+    pdf_render_workers: int = 2
+    password_hash_workers: int = os.cpu_count() or 1
+    auth_cache_ttl_seconds: int = 30
+    auth_cache_max_entries: int = 10000
+    rate_limit_backend: str = "memory"
+    rate_limit_max_keys: int = 100000
+    login_rate_limit: str = "10/minute"
+    login_ip_rate_limit: str = "100/minute"
+    trusted_proxies: str = ""
+    signup_rate_limit: str = "5/hour"
+    quiz_generation_rate_limit: str = "10/hour"
+    max_concurrent_generations: int = 4
+    password_hash_max_queue: int = 64
+    purge_batch_size: int = 5000
+    purge_interval_seconds: int = 60
+    provisioning_batch_size: int = 1000
+    provisioning_hash_workers: int = os.cpu_count() or 1
+    eager_startup: bool = False
+    metrics_token: Optional[str] = None
+    metrics_multiproc_dir: Optional[str] = None
+    metrics_flush_seconds: float = 5
+    profile_dir: str = os.path.join(tempfile.gettempdir(), "quiz_profiles")
+    profile_max_files: int = 200
+    profile_sample_rate: float = 0.0
+    profile_interval_ms: float = 5
+    profile_traceback_frames: int = 1
+    profile_token_expire_minutes: int = 15
+    loop_watchdog_enabled: bool = True
+    loop_stall_threshold_ms: float = 100
+    loop_heartbeat_interval_ms: float = 25
+    slow_query_threshold_ms: float = 200
+    slow_query_max_statements: int = 500
+    slow_query_explain_sample_rate: float = 0.1
+    slow_query_explain_interval_seconds: float = 300
+    slow_query_explain_timeout_ms: float = 10000
 
     class Config:
         env_file = ".env"
@@ -1,23 +1,255 @@
+import asyncio
+import time
+from typing import Optional
+
+from sqlalchemy import Column, event, make_url, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import Session, with_loader_criteria
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.sql.sqltypes import TIMESTAMP
 
+from app.metrics import Histogram, current_query_stats, registry
 from app.models import *
 from app.models.user_models import *
+from app.query_log import slow_query_log
 from app.settings.config import settings
 
 SQLALCHEMY_DATABASE_URL = f"postgresql+asyncpg://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}"
 
-engine = create_async_engine(SQLALCHEMY_DATABASE_URL)
+
+class PoolMetrics:
+    def __init__(self):
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.checkout_seconds = Histogram()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool recording how long callers wait to check out a connection."""
+
+    metrics = PoolMetrics()
+
+    def connect(self):
+        self.metrics.waiting += 1
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.waiting -= 1
+            self.metrics.checkout_seconds.observe(time.perf_counter() - started)
+
+        self.metrics.checkouts += 1
+        return connection
+
+
+class ReplicaQueuePool(InstrumentedQueuePool):
+    metrics = PoolMetrics()
+
+
+DB_QUERY_SECONDS = registry.histogram(
+    "db_query_duration_seconds", "Time spent executing SQL statements"
+)
+
+
+def track_queries(async_engine):
+    sync_engine = async_engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def query_started(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_started"] = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def query_finished(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info.pop("query_started")
+        DB_QUERY_SECONDS.observe(elapsed)
+
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.count += 1
+            stats.seconds += elapsed
+
+        if not context.execution_options.get("skip_query_log", False):
+            slow_query_log.record(
+                async_engine, statement, parameters, executemany, elapsed
+            )
+
+
+def create_pooled_engine(url: str, poolclass):
+    pooled_engine = create_async_engine(
+        make_url(url).update_query_dict(
+            {
+                "prepared_statement_cache_size": str(
+                    settings.database_prepared_statement_cache_size
+                )
+            }
+        ),
+        poolclass=poolclass,
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+        pool_timeout=settings.database_pool_timeout,
+        pool_recycle=settings.database_pool_recycle,
+        pool_pre_ping=settings.database_pool_pre_ping,
+        connect_args={"statement_cache_size": settings.database_statement_cache_size},
+    )
+    track_queries(pooled_engine)
+    return pooled_engine
+
+
+engine = create_pooled_engine(SQLALCHEMY_DATABASE_URL, InstrumentedQueuePool)
+
+read_engine = None
+if settings.database_replica_hostname:
+    SQLALCHEMY_REPLICA_URL = f"postgresql+asyncpg://{settings.database_username}:{settings.database_password}@{settings.database_replica_hostname}:{settings.database_replica_port or settings.database_port}/{settings.database_name}"
+    read_engine = create_pooled_engine(SQLALCHEMY_REPLICA_URL, ReplicaQueuePool)
 
 AsyncSessionLocal = async_sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
+ReadSessionLocal = async_sessionmaker(
+    read_engine or engine, class_=AsyncSession, expire_on_commit=False
+)
+
+# Zero when the replica has replayed everything it received, otherwise the age
+# of the last replayed transaction. NULL (so zero) on a server that is not a standby.
+REPLICATION_LAG = text("""
+    SELECT COALESCE(
+        CASE
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+        END,
+        0
+    )
+    """)
+
+
+class ReplicaLagMonitor:
+    """Polls the replica lag in the background; reads use the last result."""
+
+    def __init__(self, max_lag_seconds: float, check_interval_seconds: float):
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self.lag_seconds: Optional[float] = None
+        self.usable = False
+        self.task: Optional[asyncio.Task] = None
+
+    async def check(self):
+        try:
+            async with read_engine.connect() as conn:
+                self.lag_seconds = float(await conn.scalar(REPLICATION_LAG))
+            self.usable = self.lag_seconds <= self.max_lag_seconds
+        except Exception:
+            self.lag_seconds = None
+            self.usable = False
+
+    async def run(self):
+        while True:
+            await self.check()
+            await asyncio.sleep(self.check_interval_seconds)
+
+    def start(self):
+        if read_engine is not None and self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        self.usable = False
+
+    async def is_usable(self) -> bool:
+        return read_engine is not None and self.usable
+
+
+replica_monitor = ReplicaLagMonitor(
+    settings.replica_max_lag_seconds, settings.replica_lag_check_seconds
+)
+
+
+async def read_session_factory() -> async_sessionmaker:
+    if await replica_monitor.is_usable():
+        return ReadSessionLocal
+    return AsyncSessionLocal
+
 
 Base = declarative_base()
 
+
+class SoftDeleteMixin:
+    deleted_at = Column(TIMESTAMP(timezone=True), nullable=True)
+
+
+SOFT_DELETE_CRITERIA = with_loader_criteria(
+    SoftDeleteMixin, lambda cls: cls.deleted_at.is_(None), include_aliases=True
+)
+
+
+def hide_deleted(statement):
+    """Apply the soft delete filter up front, for statements built once at import.
+
+    Leaving it to the session hook would copy the statement on every execution and
+    throw away its memoized cache key.
+    """
+    return statement.options(SOFT_DELETE_CRITERIA).execution_options(
+        soft_delete_filtered=True
+    )
+
+
+@event.listens_for(Session, "do_orm_execute")
+def hide_soft_deleted(execute_state):
+    options = execute_state.execution_options
+    if (
+        execute_state.is_select
+        and not execute_state.is_column_load
+        and not execute_state.is_relationship_load
+        and not options.get("include_deleted", False)
+        and not options.get("soft_delete_filtered", False)
+    ):
+        execute_state.statement = execute_state.statement.options(SOFT_DELETE_CRITERIA)
+
+
 # Base.metadata.create_all(bind=engine)
 
 
+def engine_pool_stats(engine) -> dict:
+    pool = engine.pool
+    metrics = pool.metrics
+
+    return {
+        "size": pool.size(),
+        "max_overflow": settings.database_max_overflow,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        "waiting": metrics.waiting,
+        "checkouts": metrics.checkouts,
+        "timeouts": metrics.timeouts,
+        "checkout_seconds": metrics.checkout_seconds.snapshot(),
+    }
+
+
+def pool_stats() -> dict:
+    stats = engine_pool_stats(engine)
+    stats["replica"] = None
+    if read_engine is not None:
+        stats["replica"] = engine_pool_stats(read_engine)
+        stats["replica"]["lag_seconds"] = replica_monitor.lag_seconds
+        stats["replica"]["usable"] = replica_monitor.usable
+    return stats
+
+
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
+
+
+async def get_read_db():
+    session_factory = await read_session_factory()
+    async with session_factory() as session:
+        yield session
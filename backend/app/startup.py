@@ -0,0 +1,72 @@
+import asyncio
+import importlib
+import logging
+import os
+import time
+from concurrent.futures import Executor
+from typing import Dict
+
+from sqlalchemy import text
+
+from app.services.pdf_services import get_render_pool, register_fonts
+from app.settings.config import settings
+from app.settings.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Only needed by upload, export and generation routes, so they are imported on
+# first use unless the app is started with EAGER_STARTUP.
+HEAVY_MODULES = (
+    "pymupdf",
+    "pymupdf4llm",
+    "reportlab.pdfgen.canvas",
+    "openai",
+    "fontTools.ttLib",
+)
+
+
+def import_heavy_modules() -> Dict[str, float]:
+    timings = {}
+    for name in HEAVY_MODULES:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            logger.warning(f"Could not preload {name}")
+            continue
+        timings[name] = time.perf_counter() - started
+    return timings
+
+
+def start_workers(pool: Executor, workers: int):
+    for future in [pool.submit(os.getpid) for _ in range(workers)]:
+        future.result()
+
+
+async def open_database_connections(count: int):
+    async def connect():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(connect() for _ in range(count)))
+
+
+async def warm_up():
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+
+    timings = await loop.run_in_executor(None, import_heavy_modules)
+    for name, seconds in timings.items():
+        logger.info(f"Preloaded {name} in {seconds * 1000:.0f}ms")
+
+    register_fonts()
+    await loop.run_in_executor(
+        None, start_workers, get_render_pool(), settings.pdf_render_workers
+    )
+
+    try:
+        await open_database_connections(settings.database_pool_size)
+    except Exception:
+        logger.exception("Could not pre-open database connections")
+
+    logger.info(f"Warm-up finished in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,173 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from app.exceptions.admission_exceptions import CapacityExceededException
+from app.routers import auth
+from app.services.admission_services import (
+    ConcurrencyLimiter,
+    MemoryRateLimiter,
+    PostgresConcurrencyLimiter,
+    client_ip,
+    enforce_rate_limit,
+    limit_by_ip,
+    limit_login,
+    parse_networks,
+    parse_rate,
+)
+from app.utils import PasswordHashingPool
+from fastapi import HTTPException, Request
+
+
+def test_parse_rate():
+    assert parse_rate("10/minute") == (10, 60.0)
+    assert parse_rate("3/30") == (3, 30.0)
+    assert parse_rate("") is None
+
+    with pytest.raises(ValueError):
+        parse_rate("0/minute")
+
+
+@pytest.mark.asyncio
+async def test_memory_rate_limiter_allows_burst_then_refills():
+    limiter = MemoryRateLimiter(max_keys=10)
+
+    with patch("app.services.admission_services.time.monotonic", return_value=100.0):
+        assert await limiter.hit("login:ip:1", 2, 60) == 0
+        assert await limiter.hit("login:ip:1", 2, 60) == 0
+        assert await limiter.hit("login:ip:1", 2, 60) == pytest.approx(30)
+        assert await limiter.hit("login:ip:2", 2, 60) == 0
+
+    with patch("app.services.admission_services.time.monotonic", return_value=130.0):
+        assert await limiter.hit("login:ip:1", 2, 60) == 0
+
+
+@pytest.mark.asyncio
+async def test_memory_rate_limiter_evicts_oldest_keys():
+    limiter = MemoryRateLimiter(max_keys=2)
+
+    for client in range(3):
+        await limiter.hit(f"login:ip:{client}", 1, 60)
+
+    assert list(limiter._buckets) == ["login:ip:1", "login:ip:2"]
+
+
+@pytest.mark.asyncio
+async def test_enforce_rate_limit_raises_429_with_retry_after():
+    limiter = MemoryRateLimiter(max_keys=10)
+
+    with patch("app.services.admission_services.rate_limiter", limiter):
+        await enforce_rate_limit("signup:ip:1", (1, 3600))
+        with pytest.raises(HTTPException) as exc_info:
+            await enforce_rate_limit("signup:ip:1", (1, 3600))
+
+    assert exc_info.value.status_code == 429
+    assert int(exc_info.value.headers["Retry-After"]) > 3500
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limiter_rejects_over_limit():
+    limiter = ConcurrencyLimiter("quiz_generation", limit=1)
+
+    async with limiter.slot():
+        with pytest.raises(CapacityExceededException) as exc_info:
+            async with limiter.slot():
+                pass
+        assert exc_info.value.retry_after > 0
+
+    async with limiter.slot():
+        assert limiter.in_flight == 1
+    assert limiter.in_flight == 0
+    assert limiter.completed == 2
+
+
+@pytest.mark.asyncio
+async def test_password_pool_rejects_when_queue_is_full():
+    pool = PasswordHashingPool(max_workers=1, max_queue=0)
+    pool.in_flight = 1
+
+    with pytest.raises(CapacityExceededException):
+        await pool.run(str.upper, "secret")
+
+    assert pool.stats()["rejected"] == 1
+    pool.executor.shutdown()
+
+
+def request_from(host: str, forwarded: str = None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "client": (host, 1234), "headers": headers})
+
+
+def test_client_ip_uses_forwarded_header_only_from_trusted_proxies():
+    proxies = parse_networks("10.0.0.0/8, 192.168.1.1")
+
+    with patch("app.services.admission_services.TRUSTED_PROXIES", proxies):
+        assert client_ip(request_from("10.0.0.5", "203.0.113.7")) == "203.0.113.7"
+        assert (
+            client_ip(
+                request_from("10.0.0.5", "198.51.100.1, 203.0.113.7, 192.168.1.1")
+            )
+            == "203.0.113.7"
+        )
+        assert client_ip(request_from("10.0.0.5")) == "10.0.0.5"
+        assert client_ip(request_from("203.0.113.9", "1.2.3.4")) == "203.0.113.9"
+
+
+@pytest.mark.asyncio
+async def test_login_limit_is_per_account_behind_one_address():
+    limiter = MemoryRateLimiter(max_keys=10)
+    dependency = limit_login("1/minute")
+    request = request_from("203.0.113.7")
+
+    with patch("app.services.admission_services.rate_limiter", limiter):
+        for student in range(3):
+            credentials = MagicMock(username=f"Student{student}@school.edu")
+            await dependency(request, credentials)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await dependency(request, MagicMock(username="student0@school.edu"))
+
+    assert exc_info.value.status_code == 429
+
+
+@pytest.mark.asyncio
+async def test_login_address_limit_covers_all_accounts():
+    limiter = MemoryRateLimiter(max_keys=10)
+    per_address = limit_by_ip("login", "2/minute")
+    request = request_from("203.0.113.7")
+
+    with patch("app.services.admission_services.rate_limiter", limiter):
+        await per_address(request)
+        await per_address(request)
+        with pytest.raises(HTTPException) as exc_info:
+            await per_address(request)
+        await per_address(request_from("198.51.100.1"))
+
+    assert exc_info.value.status_code == 429
+
+
+def test_login_route_limits_by_address_and_by_account():
+    [route] = [route for route in auth.router.routes if route.path == "/login"]
+
+    assert [d.dependency.__qualname__.split(".")[0] for d in route.dependencies] == [
+        "limit_by_ip",
+        "limit_login",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_postgres_slot_discards_connection_when_unlock_is_cancelled():
+    conn = AsyncMock()
+    conn.scalar.return_value = True
+    conn.execute.side_effect = asyncio.CancelledError
+    connect = MagicMock()
+    connect.return_value.__aenter__.return_value = conn
+    limiter = PostgresConcurrencyLimiter("quiz_generation", limit=2)
+
+    with patch.object(limiter, "lock_engine", MagicMock(connect=connect)):
+        with pytest.raises(asyncio.CancelledError):
+            async with limiter.slot():
+                pass
+
+    conn.invalidate.assert_awaited_once()
+    assert limiter.in_flight == 0
@@ -0,0 +1,109 @@
+import io
+import json
+from unittest.mock import patch
+
+import pytest
+from app.exceptions.quiz_exceptions import ImportingQuizException
+from app.services.import_services import (
+    import_quiz,
+    iter_json_questions,
+    iter_moodle_questions,
+    next_batch,
+)
+
+MOODLE_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<quiz>
+  <question type="category"><category><text>$course$</text></category></question>
+  <question type="multichoice">
+    <questiontext format="html"><text>Stolica Polski?</text></questiontext>
+    <answer fraction="0"><text>Krak\xc3\xb3w</text></answer>
+    <answer fraction="100"><text>Warszawa</text></answer>
+  </question>
+</quiz>
+"""
+
+
+def test_iter_moodle_questions_reads_multichoice_only():
+    questions = list(iter_moodle_questions(io.BytesIO(MOODLE_XML)))
+
+    assert questions == [
+        {
+            "question_text": "Stolica Polski?",
+            "answers": {"1": "Kraków", "2": "Warszawa"},
+            "correct_answer": "2",
+        }
+    ]
+
+
+def test_unsupported_and_unanswered_moodle_questions_are_skipped():
+    document = MOODLE_XML.replace(
+        b"</quiz>",
+        b"""<question type="truefalse">
+    <questiontext format="html"><text>Is it?</text></questiontext>
+  </question>
+  <question type="multichoice">
+    <questiontext format="html"><text>No answer?</text></questiontext>
+    <answer fraction="0"><text>a</text></answer>
+    <answer fraction="0"><text>b</text></answer>
+  </question>
+</quiz>""",
+    )
+
+    batch, skipped = next_batch(iter_moodle_questions(io.BytesIO(document)), 10)
+
+    assert [question["question_text"] for question in batch] == ["Stolica Polski?"]
+    assert skipped == 2
+
+
+@patch("app.services.import_services.JSON_READ_SIZE", 5)
+def test_iter_json_questions_reads_export_in_small_chunks():
+    export = {
+        "quiz_title": 'Tricky "questions": [',
+        "created_at": "2025-10-11 18:12:13",
+        "total_questions": 2,
+        "questions": [
+            {
+                "question": "Zażółć?",
+                "answers": {"1": "a", "2": "b"},
+                "correct_answer": "1",
+            },
+            {
+                "question": "2 + 2?",
+                "answers": {"1": "3", "2": "4"},
+                "correct_answer": "2",
+            },
+        ],
+    }
+    stream = io.BytesIO(json.dumps(export, ensure_ascii=False).encode())
+
+    questions = list(iter_json_questions(stream))
+
+    assert [q["question_text"] for q in questions] == ["Zażółć?", "2 + 2?"]
+
+
+def test_next_batch_skips_invalid_questions():
+    questions = iter(
+        [
+            {"question_text": "Ok?", "answers": {"1": "a"}, "correct_answer": "1"},
+            {"question_text": None, "answers": {}, "correct_answer": "1"},
+            {"question_text": "Ok too?", "answers": {"1": "a"}, "correct_answer": "1"},
+        ]
+    )
+
+    batch, skipped = next_batch(questions, 1)
+    assert len(batch) == 1 and skipped == 0
+
+    batch, skipped = next_batch(questions, 10)
+    assert [q["question_text"] for q in batch] == ["Ok too?"]
+    assert skipped == 1
+
+
+@pytest.mark.asyncio
+async def test_import_quiz_malformed_file(mock_db_session, mock_user):
+    upload = type("Upload", (), {"filename": "bank.xml", "file": io.BytesIO(b"<quiz>")})
+
+    with pytest.raises(ImportingQuizException):
+        await import_quiz(upload, "Bank", mock_db_session, mock_user, True)
+
+    mock_db_session.rollback.assert_called_once()
+    mock_db_session.commit.assert_not_called()
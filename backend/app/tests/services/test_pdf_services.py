@@ -0,0 +1,58 @@
+import os
+
+from app.services.pdf_services import (
+    evict_pdf_cache,
+    open_cached_pdf,
+    shuffle_exam,
+    store_cached_pdf,
+    temporary_pdf_path,
+)
+from app.settings.config import settings
+
+
+def cache_pdf(quiz_id: int, version: int, content: bytes):
+    path = temporary_pdf_path(quiz_id)
+    with open(path, "wb") as f:
+        f.write(content)
+    store_cached_pdf(quiz_id, version, path)
+
+
+def test_open_cached_pdf_survives_replacement_by_a_new_version(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "pdf_cache_dir", str(tmp_path))
+    cache_pdf(7, 1, b"old")
+    pdf = open_cached_pdf(7, 1)
+
+    cache_pdf(7, 2, b"new")
+
+    with pdf:
+        assert pdf.read() == b"old"
+    assert open_cached_pdf(7, 1) is None
+    with open_cached_pdf(7, 2) as current:
+        assert current.read() == b"new"
+    assert os.listdir(tmp_path) == ["7-v2.pdf"]
+
+
+def test_evict_pdf_cache_removes_oldest_first(tmp_path):
+    for age, name in enumerate(["3-new.pdf", "2-mid.pdf", "1-old.pdf"]):
+        path = tmp_path / name
+        path.write_bytes(b"x" * 10)
+        os.utime(path, (1000 - age, 1000 - age))
+
+    evict_pdf_cache(str(tmp_path), 20, keep=str(tmp_path / "3-new.pdf"))
+
+    assert sorted(os.listdir(tmp_path)) == ["2-mid.pdf", "3-new.pdf"]
+
+
+def test_shuffle_exam_is_reproducible_and_keeps_correct_answer():
+    questions = [
+        (f"Question {i}?", {"1": "wrong", "2": "right", "3": "no", "4": "nope"}, "2")
+        for i in range(10)
+    ]
+
+    first = shuffle_exam(questions, seed=7, index=1)
+
+    assert first == shuffle_exam(questions, seed=7, index=1)
+    assert first != shuffle_exam(questions, seed=7, index=2)
+    assert sorted(text for text, _, _ in first) == sorted(t for t, _, _ in questions)
+    for _, answers, correct in first:
+        assert answers[correct] == "right"
@@ -0,0 +1,90 @@
+import io
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from app.exceptions.quiz_exceptions import WrongFileTypeException
+from app.services.provisioning_services import (
+    iter_csv_rows,
+    iter_ndjson_rows,
+    provision_users,
+    provisioning_format,
+    provisioning_report,
+)
+
+
+def test_provisioning_format():
+    assert provisioning_format("school.csv") == "csv"
+    assert provisioning_format("school.jsonl") == "ndjson"
+
+    with pytest.raises(WrongFileTypeException):
+        provisioning_format("school.xlsx")
+
+
+def test_iter_csv_rows_drops_empty_values():
+    stream = io.BytesIO(
+        b"email,password,is_admin\na@school.com,secret,\nb@school.com,secret,true\n"
+    )
+
+    rows = list(iter_csv_rows(stream))
+
+    assert rows == [
+        (1, {"email": "a@school.com", "password": "secret"}),
+        (2, {"email": "b@school.com", "password": "secret", "is_admin": "true"}),
+    ]
+
+
+def test_iter_ndjson_rows_reports_malformed_lines():
+    stream = io.BytesIO(b'{"email": "a@school.com", "password": "x"}\n\n{oops\n')
+
+    rows = list(iter_ndjson_rows(stream))
+
+    assert rows[0] == (1, {"email": "a@school.com", "password": "x"})
+    assert rows[1][0] == 3
+    assert isinstance(rows[1][1], ValueError)
+
+
+@pytest.mark.asyncio
+async def test_provision_users_reports_every_row(mock_db_session):
+    stream = io.BytesIO(
+        b"email,password\n"
+        b"new@school.com,secret\n"
+        b"old@school.com,secret\n"
+        b"new@school.com,again\n"
+        b"not-an-email,secret\n"
+        b"race@school.com,secret\n"
+    )
+    existing = MagicMock()
+    existing.scalars.return_value = ["old@school.com"]
+    inserted = MagicMock()
+    inserted.all.return_value = [(10, "new@school.com")]
+    mock_db_session.execute.side_effect = [existing, inserted]
+
+    with patch(
+        "app.services.provisioning_services.hash_passwords_in_parallel",
+        AsyncMock(side_effect=lambda passwords: [f"hashed-{p}" for p in passwords]),
+    ) as mock_hash:
+        results = await provision_users(stream, "csv", mock_db_session)
+
+    assert [(r["row"], r["status"]) for r in results] == [
+        (1, "created"),
+        (2, "exists"),
+        (3, "duplicate"),
+        (4, "invalid"),
+        (5, "exists"),
+    ]
+    assert results[0]["id"] == 10
+    mock_hash.assert_awaited_once_with(["secret", "secret"])
+    mock_db_session.commit.assert_awaited_once()
+
+
+def test_provisioning_report_csv():
+    results = [
+        {"row": 1, "email": "a@school.com", "status": "created", "id": 3, "error": None}
+    ]
+
+    report = provisioning_report(results, "csv")
+
+    assert report.splitlines() == [
+        "row,email,status,id,error",
+        "1,a@school.com,created,3,",
+    ]
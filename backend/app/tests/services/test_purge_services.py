@@ -0,0 +1,71 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from app.services.purge_services import (
+    purge_deleted,
+    purge_questions_batch,
+    purge_users_batch,
+)
+from app.services.quiz_services import remove_quiz
+from sqlalchemy.dialects import postgresql
+
+
+def deleted_rows(count):
+    result = MagicMock()
+    result.rowcount = count
+    return result
+
+
+@pytest.mark.asyncio
+async def test_purge_questions_deletes_bounded_batch(mock_db_session):
+    mock_db_session.execute.return_value = deleted_rows(3)
+
+    assert await purge_questions_batch(mock_db_session, 100) == 3
+
+    statement = mock_db_session.execute.call_args[0][0]
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert sql.startswith("DELETE FROM questions WHERE questions.id IN")
+    assert "quizzes.deleted_at IS NOT NULL" in sql
+    assert "LIMIT" in sql
+    assert "FOR UPDATE SKIP LOCKED" in sql
+
+
+@pytest.mark.asyncio
+async def test_purge_users_waits_for_their_quizzes(mock_db_session):
+    mock_db_session.execute.return_value = deleted_rows(0)
+
+    await purge_users_batch(mock_db_session, 100)
+
+    statement = mock_db_session.execute.call_args[0][0]
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert "NOT (EXISTS (SELECT" in sql
+    assert "quizzes.owner_id = users.id" in sql
+
+
+@pytest.mark.asyncio
+async def test_purge_deleted_commits_each_batch(mock_db_session):
+    questions = AsyncMock(side_effect=[2, 2, 1])
+    quizzes = AsyncMock(return_value=1)
+    users = AsyncMock(return_value=0)
+
+    with patch("app.services.purge_services.PURGE_STEPS", (questions, quizzes, users)):
+        purged = await purge_deleted(mock_db_session, batch_size=2)
+
+    assert purged == 6
+    assert questions.await_count == 3
+    assert mock_db_session.commit.await_count == 5
+
+
+@pytest.mark.asyncio
+async def test_remove_quiz_soft_deletes(mock_db_session, mock_user):
+    quiz = MagicMock(owner_id=mock_user.id, deleted_at=None)
+
+    with patch(
+        "app.services.quiz_services.get_quiz_by_id", AsyncMock(return_value=quiz)
+    ), patch("app.services.quiz_services.request_purge") as mock_request_purge:
+        await remove_quiz(1, mock_db_session, mock_user)
+
+    assert quiz.deleted_at is not None
+    mock_db_session.delete.assert_not_called()
+    mock_db_session.commit.assert_called_once()
+    mock_request_purge.assert_called_once()
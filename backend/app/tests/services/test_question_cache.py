@@ -0,0 +1,55 @@
+from app.services.question_cache import QuestionSetCache
+
+
+def test_put_and_get():
+    cache = QuestionSetCache(max_bytes=1024, ttl_seconds=60)
+
+    cache.put(1, 3, b"[]")
+    entry = cache.get(1)
+
+    assert entry.payload == b"[]"
+    assert entry.version == 3
+    assert cache.total_bytes == 2
+
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = QuestionSetCache(max_bytes=10, ttl_seconds=60)
+
+    cache.put(1, 0, b"aaaa")
+    cache.put(2, 0, b"bbbb")
+    cache.get(1)
+    cache.put(3, 0, b"cccc")
+
+    assert cache.get(2) is None
+    assert cache.get(1) is not None
+    assert cache.get(3) is not None
+    assert cache.total_bytes == 8
+
+
+def test_invalidate_drops_entry():
+    cache = QuestionSetCache(max_bytes=1024, ttl_seconds=60)
+    cache.put(1, 0, b"old")
+
+    cache.invalidate(1)
+
+    assert cache.get(1) is None
+    assert cache.total_bytes == 0
+
+
+def test_older_version_does_not_replace_newer_entry():
+    cache = QuestionSetCache(max_bytes=1024, ttl_seconds=60)
+
+    cache.put(1, 4, b"new")
+    cache.put(1, 3, b"old")
+
+    assert cache.get(1).payload == b"new"
+    assert cache.total_bytes == 3
+
+
+def test_expired_entry_is_dropped():
+    cache = QuestionSetCache(max_bytes=1024, ttl_seconds=-1)
+
+    cache.put(1, 0, b"[]")
+
+    assert cache.get(1) is None
+    assert cache.total_bytes == 0
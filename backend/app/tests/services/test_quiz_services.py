@@ -0,0 +1,321 @@
+import os
+import xml.etree.ElementTree as ET
+import zipfile
+from unittest.mock import MagicMock, patch
+
+import pytest
+from app.exceptions.quiz_exceptions import (
+    InvalidFieldsException,
+    QuestionsNotFoundException,
+    QuizNotFoundException,
+    UserNotAuthorizedException,
+)
+from app.schemas.quiz_schemas import QuestionUpdate
+from app.services.question_cache import question_cache
+from app.services.quiz_services import (
+    export_pdf_variants,
+    get_all_quizzes,
+    get_one_quiz,
+    get_questions,
+    moodle_xml_question,
+    parse_fields,
+    quiz_count_statement,
+    quiz_page_statement,
+    update_questions,
+)
+
+
+def test_parse_fields_none_when_not_requested():
+    assert parse_fields(None) is None
+    assert parse_fields("") is None
+
+
+def test_parse_fields_strips_and_deduplicates():
+    assert parse_fields("id, title,id,favourites") == ["id", "title", "favourites"]
+
+
+def test_parse_fields_unknown_field():
+    with pytest.raises(InvalidFieldsException):
+        parse_fields("id,password")
+
+
+@pytest.mark.asyncio
+async def test_get_all_quizzes_reuses_prebuilt_statements(mock_db_session):
+    mock_result = MagicMock()
+    mock_result.scalar.return_value = 0
+    mock_result.all.return_value = []
+    mock_db_session.execute.return_value = mock_result
+
+    await get_all_quizzes(mock_db_session, 10, 20, "math", ["title", "id"])
+    await get_all_quizzes(mock_db_session, 5, 0, "bio", ["id", "title"])
+
+    (count, count_params), (page, _), (_, _), (page_again, params) = [
+        call.args for call in mock_db_session.execute.call_args_list
+    ]
+    assert count is quiz_count_statement("published", True)
+    assert page is quiz_page_statement("published", True, frozenset({"id", "title"}))
+    assert page_again is page
+    assert count_params["search"] == "%math%"
+    assert params == {"user_id": None, "limit": 5, "skip": 0, "search": "%bio%"}
+
+
+def test_favourites_scope_counts_all_favourites_in_both_shapes():
+    for fields in (frozenset(), frozenset({"id", "favourites"})):
+        sql = str(quiz_page_statement("favourites", False, fields))
+
+        assert "LEFT OUTER JOIN favourites" in sql
+        assert "quizzes.id IN (SELECT favourites.quiz_id" in sql
+
+
+@pytest.mark.asyncio
+async def test_get_one_quiz_sparse(mock_db_session):
+    row = MagicMock()
+    row._mapping = {"id": 1, "title": "Biology", "favourites": 3}
+    mock_result = MagicMock()
+    mock_result.first.return_value = row
+    mock_db_session.execute.return_value = mock_result
+
+    result = await get_one_quiz(1, mock_db_session, ["id", "title", "favourites"])
+
+    assert result == {"Quiz": {"id": 1, "title": "Biology"}, "favourites": 3}
+    mock_db_session.execute.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_get_one_quiz_sparse_not_found(mock_db_session):
+    mock_result = MagicMock()
+    mock_result.first.return_value = None
+    mock_db_session.execute.return_value = mock_result
+
+    with pytest.raises(QuizNotFoundException):
+        await get_one_quiz(999, mock_db_session, ["id"])
+
+
+def question_row(**values):
+    row = MagicMock(**values)
+    row._mapping = values
+    return row
+
+
+@pytest.mark.asyncio
+async def test_get_questions_served_from_cache_while_version_matches(
+    mock_db_session, mock_user
+):
+    question_cache.clear()
+    full = MagicMock()
+    full.all.return_value = [
+        question_row(
+            version=3,
+            allowed=True,
+            id=1,
+            quiz_id=5,
+            question_text="2 + 2?",
+            answers={"1": "3", "2": "4"},
+            correct_answer="2",
+        )
+    ]
+    unchanged = MagicMock()
+    unchanged.all.return_value = [question_row(version=3, allowed=True, id=None)]
+    mock_db_session.execute.side_effect = [full, unchanged]
+
+    first = await get_questions(5, mock_db_session, mock_user)
+    second = await get_questions(5, mock_db_session, mock_user)
+
+    assert first.body == second.body
+    assert b'"question_text":"2 + 2?"' in first.body
+    params = [call.args[1] for call in mock_db_session.execute.call_args_list]
+    assert [p["cached_version"] for p in params] == [-1, 3]
+
+
+@pytest.mark.asyncio
+async def test_get_questions_reloads_after_edit_in_another_worker(
+    mock_db_session, mock_user
+):
+    question_cache.clear()
+    question_cache.put(5, 3, b"[]")
+    mock_result = MagicMock()
+    mock_result.all.return_value = [
+        question_row(
+            version=4,
+            allowed=True,
+            id=1,
+            quiz_id=5,
+            question_text="3 + 3?",
+            answers={"1": "6", "2": "7"},
+            correct_answer="1",
+        )
+    ]
+    mock_db_session.execute.return_value = mock_result
+
+    response = await get_questions(5, mock_db_session, mock_user)
+
+    assert b'"question_text":"3 + 3?"' in response.body
+    assert question_cache.get(5).version == 4
+
+
+@pytest.mark.asyncio
+async def test_get_questions_quiz_not_found(mock_db_session, mock_user):
+    question_cache.clear()
+    mock_result = MagicMock()
+    mock_result.all.return_value = []
+    mock_db_session.execute.return_value = mock_result
+
+    with pytest.raises(QuizNotFoundException):
+        await get_questions(7, mock_db_session, mock_user)
+
+
+@pytest.mark.asyncio
+async def test_get_questions_not_authorized(mock_db_session, mock_user):
+    question_cache.clear()
+    mock_result = MagicMock()
+    mock_result.all.return_value = [question_row(version=0, allowed=False, id=None)]
+    mock_db_session.execute.return_value = mock_result
+
+    with pytest.raises(UserNotAuthorizedException):
+        await get_questions(8, mock_db_session, mock_user)
+
+
+@pytest.mark.asyncio
+async def test_get_questions_no_questions(mock_db_session, mock_user):
+    question_cache.clear()
+    mock_result = MagicMock()
+    mock_result.all.return_value = [question_row(version=0, allowed=True, id=None)]
+    mock_db_session.execute.return_value = mock_result
+
+    with pytest.raises(QuestionsNotFoundException):
+        await get_questions(9, mock_db_session, mock_user)
+
+
+@pytest.mark.asyncio
+async def test_get_questions_cached_unpublished_quiz(mock_db_session, mock_user):
+    question_cache.clear()
+    question_cache.put(6, 0, b"[]")
+    mock_result = MagicMock()
+    mock_result.all.return_value = [question_row(version=0, allowed=False, id=None)]
+    mock_db_session.execute.return_value = mock_result
+
+    with pytest.raises(UserNotAuthorizedException):
+        await get_questions(6, mock_db_session, mock_user)
+
+
+@pytest.mark.asyncio
+async def test_update_questions_applies_diff(mock_db_session, mock_user):
+    quiz_result = MagicMock()
+    quiz_result.scalar_one_or_none.return_value = MagicMock(owner_id=mock_user.id)
+    current_result = MagicMock()
+    current_result.all.return_value = [
+        MagicMock(id=1, question_text="Same?", answers={"1": "a"}, correct_answer="1"),
+        MagicMock(id=2, question_text="Typo?", answers={"1": "a"}, correct_answer="1"),
+        MagicMock(id=3, question_text="Gone?", answers={"1": "a"}, correct_answer="1"),
+    ]
+    mock_db_session.execute.side_effect = [
+        quiz_result,
+        current_result,
+        MagicMock(),
+        MagicMock(),
+        MagicMock(),
+    ]
+    questions = [
+        QuestionUpdate(
+            id=1, question_text="Same?", answers={"1": "a"}, correct_answer="1"
+        ),
+        QuestionUpdate(
+            id=2, question_text="Fixed?", answers={"1": "a"}, correct_answer="1"
+        ),
+        QuestionUpdate(question_text="New?", answers={"1": "a"}, correct_answer="1"),
+    ]
+
+    result = await update_questions(5, questions, mock_db_session, mock_user)
+
+    assert "1 added, 1 changed, 1 removed" in result["message"]
+    update_call, insert_call = mock_db_session.execute.call_args_list[3:]
+    assert update_call.args[1] == [
+        {
+            "id": 2,
+            "question_text": "Fixed?",
+            "answers": {"1": "a"},
+            "correct_answer": "1",
+        }
+    ]
+    assert insert_call.args[1] == [
+        {
+            "quiz_id": 5,
+            "question_text": "New?",
+            "answers": {"1": "a"},
+            "correct_answer": "1",
+        }
+    ]
+    mock_db_session.commit.assert_called_once()
+
+
+def test_question_update_renumbers_answers():
+    question = QuestionUpdate(
+        question_text="Capital of France?",
+        answers={"B": "Paris", "A": "Lyon"},
+        correct_answer="B",
+    )
+
+    assert question.answers == {"1": "Lyon", "2": "Paris"}
+    assert question.correct_answer == "2"
+
+
+def test_moodle_xml_question_is_escaped():
+    question = ("Is 1 < 2 & 3 > 2?", {"1": "Yes <b>", "2": "No"}, "1")
+
+    document = ET.fromstring(f"<quiz>{moodle_xml_question(1, question)}</quiz>")
+
+    assert document.find("question/questiontext/text").text == question[0]
+    answers = document.findall("question/answer")
+    assert [answer.get("fraction") for answer in answers] == ["100", "0"]
+    assert answers[0].find("text").text == "Yes <b>"
+
+
+@pytest.mark.asyncio
+async def test_export_pdf_variants_forbidden_for_private_quiz(
+    mock_db_session, mock_user
+):
+    mock_result = MagicMock()
+    mock_result.one_or_none.return_value = MagicMock(title="Quiz", allowed=False)
+    mock_db_session.execute.return_value = mock_result
+
+    with pytest.raises(UserNotAuthorizedException):
+        await export_pdf_variants(7, mock_db_session, 2, None, False, mock_user)
+
+    [statement] = [call.args[0] for call in mock_db_session.execute.call_args_list]
+    assert "quizzes.published OR quizzes.owner_id = :owner_id_1" in str(statement)
+
+
+@pytest.mark.asyncio
+async def test_export_pdf_variants_keeps_files_inside_work_dir(
+    mock_db_session, mock_user, tmp_path
+):
+    quiz_result = MagicMock()
+    quiz_result.one_or_none.return_value = MagicMock(
+        title="../../tmp/escaped", allowed=True
+    )
+    questions_result = MagicMock()
+    questions_result.all.return_value = []
+    mock_db_session.execute.side_effect = [quiz_result, questions_result]
+    rendered = []
+
+    async def render(kind, render, path, *args):
+        rendered.append(path)
+        with open(path, "wb") as f:
+            f.write(b"%PDF")
+        return path
+
+    with patch("app.services.quiz_services.render_in_pool", render), patch(
+        "app.services.quiz_services.get_render_pool", return_value=None
+    ), patch("tempfile.tempdir", str(tmp_path)):
+        response = await export_pdf_variants(7, mock_db_session, 2, 1, True, mock_user)
+
+    work_dir = os.path.dirname(response.path)
+    assert [os.path.dirname(path) for path in rendered] == [work_dir, work_dir]
+    with zipfile.ZipFile(response.path) as archive:
+        assert archive.namelist() == [
+            ".._.._tmp_escaped_group_A.pdf",
+            ".._.._tmp_escaped_group_B.pdf",
+        ]
+    assert response.headers["content-disposition"] == (
+        'attachment; filename=".._.._tmp_escaped_variants.zip"'
+    )
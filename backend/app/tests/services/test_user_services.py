@@ -1,12 +1,19 @@
+from datetime import datetime, timezone
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from app.exceptions.user_exceptions import UserCreatingException, UserNotFoundException
+from app.oauth2 import user_cache
+from app.services.question_cache import question_cache
 from app.services.user_services import (
     create_new_user,
     delete_account,
     get_one_user,
     get_users,
+    set_admin,
+    stream_users_csv,
+    users_params,
+    users_statement,
 )
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -52,41 +59,70 @@ async def test_get_one_user_with_different_ids(mock_db_session):
 @pytest.mark.asyncio
 async def test_get_users_success(mock_db_session, sample_users_list):
     mock_result = MagicMock()
-    mock_result.scalars.return_value = sample_users_list
+    mock_result.all.return_value = sample_users_list
     mock_db_session.execute.return_value = mock_result
 
     result = await get_users(mock_db_session)
 
-    assert result == sample_users_list
-    assert len(result) == len(sample_users_list)
+    assert result["items"] == sample_users_list
+    assert result["next_cursor"] is None
     mock_db_session.execute.assert_called_once()
 
 
 @pytest.mark.asyncio
 async def test_get_users_empty_list(mock_db_session):
     mock_result = MagicMock()
-    mock_result.scalars.return_value = []
+    mock_result.all.return_value = []
     mock_db_session.execute.return_value = mock_result
 
     result = await get_users(mock_db_session)
 
-    assert result == []
-    assert len(result) == 0
+    assert result == {"items": [], "next_cursor": None}
     mock_db_session.execute.assert_called_once()
 
 
 @pytest.mark.asyncio
-async def test_get_users_multiple_users(mock_db_session):
-    users = [MagicMock(id=i, email=f"user{i}@test.com") for i in range(1, 11)]
+async def test_get_users_returns_next_cursor(mock_db_session):
+    users = [MagicMock(id=i, email=f"user{i}@test.com") for i in range(1, 12)]
     mock_result = MagicMock()
-    mock_result.scalars.return_value = users
+    mock_result.all.return_value = users
     mock_db_session.execute.return_value = mock_result
 
-    result = await get_users(mock_db_session)
+    result = await get_users(mock_db_session, limit=10, after_id=0)
+
+    assert len(result["items"]) == 10
+    assert result["items"][0].id == 1
+    assert result["next_cursor"] == 10
+    query, params = mock_db_session.execute.call_args[0]
+    assert query is users_statement(False, True, True)
+    assert params == {"after_id": 0, "limit": 11}
+
+
+def test_users_statement_filters_by_escaped_email_prefix():
+    compiled = str(users_statement(True).compile())
+
+    assert "lower(users.email) LIKE :email_pattern ESCAPE '/'" in compiled
+    assert "password" not in compiled
+    assert users_params("Jan_K%") == {"email_pattern": "jan/_k/%%"}
+    assert users_statement(True) is users_statement(True)
+
+
+@pytest.mark.asyncio
+async def test_stream_users_csv(sample_users_list):
+    created_at = datetime(2025, 10, 11, 18, 12, 13, tzinfo=timezone.utc)
+    for user in sample_users_list:
+        user.created_at = created_at
+
+    async def batches(email_prefix):
+        yield sample_users_list
 
-    assert len(result) == 10
-    assert result[0].id == 1
-    assert result[9].id == 10
+    with patch("app.services.user_services.stream_user_batches", batches):
+        chunks = [chunk async for chunk in stream_users_csv(None)]
+
+    rows = "".join(chunks).splitlines()
+    assert rows[0] == "id,email,is_admin,created_at"
+    assert rows[1] == "1,test@example.com,False,2025-10-11T18:12:13+00:00"
+    assert len(rows) == 3
 
 
 @pytest.mark.asyncio
@@ -184,11 +220,14 @@ async def test_delete_account_success(mock_db_session, mock_user):
     mock_db_session.delete = AsyncMock()
     mock_db_session.commit = AsyncMock()
 
-    await delete_account(mock_db_session, mock_user)
+    with patch("app.services.user_services.request_purge") as mock_request_purge:
+        await delete_account(mock_db_session, mock_user)
 
-    mock_db_session.execute.assert_called_once()
-    mock_db_session.delete.assert_called_once_with(mock_user)
+    assert mock_user.deleted_at is not None
+    assert mock_db_session.execute.call_count == 2
+    mock_db_session.delete.assert_not_called()
     mock_db_session.commit.assert_called_once()
+    mock_request_purge.assert_called_once()
 
 
 @pytest.mark.asyncio
@@ -207,27 +246,60 @@ async def test_delete_account_user_not_found(mock_db_session, mock_user):
 async def test_delete_account_operations_order(mock_db_session, mock_user):
     mock_result = MagicMock()
     mock_result.scalar_one_or_none.return_value = mock_user
-    mock_db_session.execute.return_value = mock_result
 
     operations = []
-    mock_db_session.delete = AsyncMock(
-        side_effect=lambda x: operations.append("delete")
-    )
+
+    async def execute(statement):
+        operations.append(statement.__visit_name__)
+        return mock_result
+
+    mock_db_session.execute = AsyncMock(side_effect=execute)
     mock_db_session.commit = AsyncMock(side_effect=lambda: operations.append("commit"))
 
     await delete_account(mock_db_session, mock_user)
 
-    assert operations == ["delete", "commit"]
+    assert operations == ["select", "update", "commit"]
 
 
 @pytest.mark.asyncio
-async def test_delete_account_deletes_correct_user(mock_db_session, mock_user):
+async def test_delete_account_hides_users_quizzes(mock_db_session, mock_user):
     mock_result = MagicMock()
     mock_result.scalar_one_or_none.return_value = mock_user
+    mock_result.scalars.return_value.all.return_value = [11]
     mock_db_session.execute.return_value = mock_result
-    mock_db_session.delete = AsyncMock()
-    mock_db_session.commit = AsyncMock()
+    question_cache.put(11, 0, b"[]")
 
     await delete_account(mock_db_session, mock_user)
 
-    mock_db_session.delete.assert_called_once_with(mock_user)
+    statement = mock_db_session.execute.call_args_list[1][0][0]
+    compiled = statement.compile()
+    assert str(compiled).startswith("UPDATE quizzes SET deleted_at=now()")
+    assert mock_user.id in compiled.params.values()
+    assert question_cache.get(11) is None
+
+
+@pytest.mark.asyncio
+async def test_set_admin_revokes_issued_tokens(mock_db_session, mock_user):
+    mock_result = MagicMock()
+    mock_result.scalar_one_or_none.return_value = mock_user
+    mock_db_session.execute.return_value = mock_result
+    user_cache.put(mock_user.id, True, 0)
+
+    await set_admin(mock_user.id, False, mock_db_session)
+
+    assert str(mock_user.token_version) == "users.token_version + :token_version_1"
+    assert user_cache.get(mock_user.id) is None
+
+
+@pytest.mark.asyncio
+async def test_delete_account_revokes_issued_tokens(mock_db_session, mock_user):
+    mock_result = MagicMock()
+    mock_result.scalar_one_or_none.return_value = mock_user
+    mock_db_session.execute.return_value = mock_result
+    user_cache.put(mock_user.id, False, 0)
+
+    with patch("app.services.user_services.request_purge"):
+        await delete_account(mock_db_session, mock_user)
+
+    assert str(mock_user.token_version) == "users.token_version + :token_version_1"
+    assert user_cache.get(mock_user.id) is None
@@ -0,0 +1,129 @@
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+from app.loadtest.runner import LoadTest, parse_rates
+from app.loadtest.stats import (
+    Recorder,
+    build_report,
+    compare_reports,
+    format_comparison,
+    percentile,
+    regressions,
+)
+
+
+def test_percentile_uses_nearest_rank():
+    values = [float(i) for i in range(1, 101)]
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([0.2], 99) == 0.2
+    assert percentile([], 50) == 0.0
+
+
+def test_report_counts_server_and_network_errors():
+    recorder = Recorder()
+    recorder.record("GET /quizzes", "200", 0.010)
+    recorder.record("GET /quizzes", "404", 0.020)
+    recorder.record("GET /quizzes", "503", 0.030)
+    recorder.record("GET /quizzes", "ReadTimeout", 0.040)
+
+    report = build_report(recorder, seconds=2, config={})
+    route = report["routes"]["GET /quizzes"]
+
+    assert route["requests"] == 4
+    assert route["errors"] == 2
+    assert route["throughput_rps"] == 2
+    assert route["latency_ms"]["p50"] == 20
+    assert route["latency_ms"]["max"] == 40
+    assert report["total"]["requests"] == 4
+
+
+def make_report(p95: float, routes=("GET /quizzes",)) -> dict:
+    stats = {
+        "throughput_rps": 10.0,
+        "latency_ms": {"p50": 5.0, "p95": p95, "p99": p95 * 2},
+    }
+    return {"total": stats, "routes": {route: stats for route in routes}}
+
+
+def test_compare_reports_flags_p95_regressions():
+    base = make_report(p95=10)
+    head = make_report(p95=13, routes=("GET /quizzes", "GET /quizzes/{id}"))
+
+    rows = compare_reports(base, head)
+
+    assert [row["route"] for row in rows] == [
+        "total",
+        "GET /quizzes",
+        "GET /quizzes/{id}",
+    ]
+    assert rows[1]["p95"] == {"base": 10, "head": 13, "change_percent": 30.0}
+    assert rows[2]["p95"]["change_percent"] is None
+    assert regressions(rows, "p95", 25) == ["total", "GET /quizzes"]
+    assert regressions(rows, "p95", 50) == []
+    assert "10.0 -> 13.0 (+30.0%)" in format_comparison(rows)
+
+
+def test_parse_rates_overrides_defaults_and_drops_disabled():
+    rates = parse_rates(["search=0.5", "upload=0"], {"browse": 2, "upload": 1})
+
+    assert rates == {"browse": 2, "search": 0.5}
+    with pytest.raises(ValueError):
+        parse_rates(["checkout=1"], {})
+
+
+def fake_api() -> FastAPI:
+    app = FastAPI()
+    quizzes = [{"id": id} for id in range(1, 6)]
+
+    @app.post("/users", status_code=201)
+    def sign_up():
+        return {}
+
+    @app.post("/login")
+    def log_in():
+        return {"access_token": "token", "token_type": "bearer"}
+
+    @app.get("/quizzes")
+    def list_quizzes():
+        return {"items": quizzes, "total": len(quizzes)}
+
+    @app.get("/quizzes/{id}")
+    def get_quiz(id: int):
+        return {"id": id}
+
+    @app.get("/quizzes/play/{id}")
+    def play(id: int):
+        if id == 5:
+            raise HTTPException(status_code=500)
+        return []
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_load_test_runs_scenarios_and_reports_per_route():
+    load_test = LoadTest(
+        "http://test",
+        {"browse": 40, "play": 40},
+        duration=0.5,
+        users=2,
+        seed_quizzes=0,
+        transport=httpx.ASGITransport(app=fake_api()),
+    )
+
+    report = await load_test.run()
+
+    assert set(report["routes"]) == {
+        "GET /quizzes",
+        "GET /quizzes/{id}",
+        "GET /quizzes/play/{id}",
+    }
+    assert report["routes"]["GET /quizzes"]["statuses"] == {
+        "200": report["scenarios"]["browse"]["started"]
+    }
+    play = report["scenarios"]["play"]
+    assert play["started"] == play["completed"] + play["failed"]
+    assert report["config"]["rates"] == {"browse": 40, "play": 40}
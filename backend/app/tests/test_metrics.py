@@ -0,0 +1,112 @@
+import json
+import os
+import subprocess
+import sys
+
+from app.metrics import (
+    Histogram,
+    MetricsRegistry,
+    MultiProcessStore,
+    merge_snapshots,
+    render_prometheus,
+)
+from app.middleware import (
+    DB_QUERIES_PER_REQUEST,
+    HTTP_REQUEST_SECONDS,
+    MetricsMiddleware,
+)
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+def test_histogram_snapshot_is_cumulative():
+    histogram = Histogram(buckets=(0.1, 1))
+
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == {"0.1": 2, "1": 3, "+Inf": 4}
+    assert snapshot["count"] == 4
+    assert snapshot["sum"] == 3.65
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    requests = registry.histogram("requests_seconds", "Latency", ["route"], (0.5,))
+    errors = registry.counter("errors_total", "Errors", ["error"])
+    requests.labels("/quizzes").observe(0.2)
+    errors.labels('Bad "quote"').inc(2)
+
+    text = render_prometheus(registry.snapshot())
+
+    assert "# TYPE requests_seconds histogram" in text
+    assert 'requests_seconds_bucket{route="/quizzes",le="0.5"} 1' in text
+    assert 'requests_seconds_count{route="/quizzes"} 1' in text
+    assert 'errors_total{error="Bad \\"quote\\""} 2.0' in text
+
+
+def test_multiprocess_store_sums_counters_and_labels_gauges(tmp_path):
+    registry = MetricsRegistry()
+    hits = registry.counter("hits_total", "Hits")
+    in_flight = registry.gauge("in_flight", "In flight")
+    hits.inc(3)
+    in_flight.set(2)
+    store = MultiProcessStore(str(tmp_path))
+    store.write(registry.snapshot())
+
+    other = registry.snapshot()
+    (tmp_path / "metrics-1.json").write_text(json.dumps({"pid": 1, "metrics": other}))
+
+    merged = merge_snapshots(store.read_all())
+
+    assert merged["hits_total"]["samples"] == {(): 6.0}
+    assert merged["in_flight"]["labels"] == ["pid"]
+    assert merged["in_flight"]["samples"][("1",)] == 2.0
+    assert len(merged["in_flight"]["samples"]) == 2
+
+
+def exited_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_multiprocess_store_folds_exited_processes_into_one_file(tmp_path):
+    registry = MetricsRegistry()
+    hits = registry.counter("hits_total", "Hits")
+    in_flight = registry.gauge("in_flight", "In flight")
+    hits.inc(3)
+    in_flight.set(2)
+    store = MultiProcessStore(str(tmp_path))
+    store.write(registry.snapshot())
+
+    dead = {"pid": exited_pid(), "metrics": registry.snapshot()}
+    for _ in range(2):
+        (tmp_path / f"metrics-{dead['pid']}.json").write_text(json.dumps(dead))
+        store.merge_exited()
+
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith(".json")) == [
+        f"metrics-{os.getpid()}.json",
+        "metrics-exited.json",
+    ]
+    merged = merge_snapshots(store.read_all())
+    assert merged["hits_total"]["samples"] == {(): 9.0}
+    assert list(merged["in_flight"]["samples"]) == [(str(os.getpid()),)]
+
+
+def test_metrics_middleware_records_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    with TestClient(app) as client:
+        client.get("/items/1")
+        client.get("/items/2")
+
+    histogram = HTTP_REQUEST_SECONDS.labels("GET", "/items/{item_id}", "200")
+    assert histogram.count == 2
+    assert DB_QUERIES_PER_REQUEST.labels("/items/{item_id}").count == 2
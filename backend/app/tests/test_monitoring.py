@@ -0,0 +1,87 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from app.routers.monitoring import get_pool_stats
+from app.settings.database import (
+    AsyncSessionLocal,
+    InstrumentedQueuePool,
+    ReadSessionLocal,
+    ReplicaLagMonitor,
+    engine,
+    read_session_factory,
+    replica_monitor,
+)
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_report_configured_pool(mock_admin_user):
+    stats = await get_pool_stats(mock_admin_user)
+
+    assert isinstance(engine.pool, InstrumentedQueuePool)
+    assert stats["size"] == engine.pool.size()
+    assert stats["checked_out"] == 0
+    assert stats["waiting"] == 0
+    assert "+Inf" in stats["checkout_seconds"]["buckets"]
+    assert stats["replica"] is None
+
+
+def replica_engine(lag=None, error=None):
+    conn = MagicMock()
+    conn.scalar = AsyncMock(return_value=lag, side_effect=error)
+    connect = MagicMock()
+    connect.__aenter__ = AsyncMock(return_value=conn)
+    connect.__aexit__ = AsyncMock(return_value=False)
+    read_engine = MagicMock()
+    read_engine.connect.return_value = connect
+    return read_engine
+
+
+@pytest.mark.asyncio
+async def test_replica_monitor_without_replica():
+    monitor = ReplicaLagMonitor(max_lag_seconds=5, check_interval_seconds=5)
+
+    with patch("app.settings.database.read_engine", None):
+        assert await monitor.is_usable() is False
+
+
+@pytest.mark.asyncio
+async def test_replica_monitor_polls_in_background_until_stopped():
+    monitor = ReplicaLagMonitor(max_lag_seconds=5, check_interval_seconds=60)
+    read_engine = replica_engine(lag=1.5)
+
+    with patch("app.settings.database.read_engine", read_engine):
+        assert await monitor.is_usable() is False
+        monitor.start()
+        await asyncio.sleep(0)
+        assert await monitor.is_usable() is True
+        await monitor.stop()
+        assert await monitor.is_usable() is False
+
+    assert monitor.task is None
+    assert monitor.lag_seconds == 1.5
+    read_engine.connect.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_replica_monitor_falls_back_when_lagging_or_down():
+    lagging = ReplicaLagMonitor(max_lag_seconds=5, check_interval_seconds=0)
+    down = ReplicaLagMonitor(max_lag_seconds=5, check_interval_seconds=0)
+
+    with patch("app.settings.database.read_engine", replica_engine(lag=30)):
+        await lagging.check()
+        assert await lagging.is_usable() is False
+    with patch(
+        "app.settings.database.read_engine", replica_engine(error=OSError("down"))
+    ):
+        await down.check()
+        assert await down.is_usable() is False
+    assert down.lag_seconds is None
+
+
+@pytest.mark.asyncio
+async def test_read_session_factory_prefers_usable_replica():
+    with patch.object(replica_monitor, "is_usable", AsyncMock(return_value=True)):
+        assert await read_session_factory() is ReadSessionLocal
+    with patch.object(replica_monitor, "is_usable", AsyncMock(return_value=False)):
+        assert await read_session_factory() is AsyncSessionLocal
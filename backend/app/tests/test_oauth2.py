@@ -0,0 +1,52 @@
+from unittest.mock import MagicMock
+
+import pytest
+from app.oauth2 import create_access_token, get_current_user, user_cache
+from fastapi import HTTPException
+
+
+def user_row(id=1, is_admin=False, token_version=0):
+    return MagicMock(id=id, is_admin=is_admin, token_version=token_version)
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_is_cached(mock_db_session):
+    user_cache.clear()
+    mock_result = MagicMock()
+    mock_result.one_or_none.return_value = user_row()
+    mock_db_session.execute.return_value = mock_result
+    token = create_access_token({"user_id": 1, "ver": 0})
+
+    first = await get_current_user(token, mock_db_session)
+    second = await get_current_user(token, mock_db_session)
+
+    assert first is second
+    assert first.id == 1 and first.is_admin is False
+    mock_db_session.execute.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_rejects_old_token_version(mock_db_session):
+    user_cache.clear()
+    user_cache.put(1, False, 2)
+    token = create_access_token({"user_id": 1, "ver": 1})
+
+    with pytest.raises(HTTPException) as exc_info:
+        await get_current_user(token, mock_db_session)
+
+    assert exc_info.value.status_code == 401
+    mock_db_session.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_after_invalidation(mock_db_session):
+    user_cache.clear()
+    user_cache.put(1, False, 0)
+    user_cache.invalidate(1)
+    mock_result = MagicMock()
+    mock_result.one_or_none.return_value = None
+    mock_db_session.execute.return_value = mock_result
+    token = create_access_token({"user_id": 1})
+
+    with pytest.raises(HTTPException):
+        await get_current_user(token, mock_db_session)
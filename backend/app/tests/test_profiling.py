@@ -0,0 +1,73 @@
+import time
+
+import pytest
+from app.middleware import ProfilingMiddleware
+from app.oauth2 import verify_access_token
+from app.profiling import (
+    create_profiling_token,
+    profile_store,
+    profiler,
+    verify_profiling_token,
+)
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+
+def busy_work(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+
+    @app.get("/slow/{item_id}")
+    async def slow(item_id: int):
+        busy_work(0.1)
+        return {"id": item_id}
+
+    return app
+
+
+def test_profiling_token_is_not_an_access_token():
+    token = create_profiling_token(1)
+
+    assert verify_profiling_token(token)
+    assert not verify_profiling_token("not-a-token")
+    with pytest.raises(HTTPException):
+        verify_access_token(token, HTTPException(status_code=401))
+
+
+def test_profiled_request_stores_collapsed_stacks(tmp_path, monkeypatch):
+    monkeypatch.setattr(profile_store, "directory", str(tmp_path))
+
+    with TestClient(make_app()) as client:
+        plain = client.get("/slow/1")
+        profiled = client.get(
+            "/slow/2", headers={"X-Profile": create_profiling_token(1)}
+        )
+
+    assert "x-profile-id" not in plain.headers
+    profile_id = profiled.headers["x-profile-id"]
+    [metadata] = profile_store.list()
+    assert metadata["id"] == profile_id
+    assert metadata["route"] == "/slow/{item_id}"
+    assert metadata["status"] == 200
+    assert metadata["memory_peak_bytes"] >= metadata["memory_start_bytes"]
+    assert profiler.active is None
+
+    with open(profile_store.collapsed_path(profile_id)) as f:
+        stacks = dict(line.rsplit(" ", 1) for line in f.read().splitlines())
+    assert any(stack.endswith(")") and "busy_work" in stack for stack in stacks)
+    assert all(int(count) > 0 for count in stacks.values())
+    assert profile_store.collapsed_path("../etc/passwd") is None
+
+
+def test_sampled_requests_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(profiler, "sample_rate", 0)
+    assert profiler.trigger(None) is None
+
+    monkeypatch.setattr(profiler, "sample_rate", 1)
+    assert profiler.trigger(None) == "sampled"
@@ -0,0 +1,140 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from app.metrics import QueryStats, current_query_stats
+from app.query_log import (
+    SlowQueryLog,
+    StatementStats,
+    can_analyze,
+    normalize_sql,
+    parameters_shape,
+)
+
+
+def make_log(**overrides) -> SlowQueryLog:
+    options = dict(
+        threshold_seconds=0.1,
+        max_statements=10,
+        explain_sample_rate=1.0,
+        explain_interval_seconds=300,
+    )
+    options.update(overrides)
+    return SlowQueryLog(**options)
+
+
+def test_normalize_sql_replaces_literals_and_collapses_lists():
+    sql = normalize_sql(
+        "SELECT quizzes.id\n  FROM quizzes WHERE quizzes.title = 'it''s' "
+        "AND quizzes.id IN ($1, $2, $3) LIMIT 10"
+    )
+
+    assert sql == (
+        "SELECT quizzes.id FROM quizzes WHERE quizzes.title = ? "
+        "AND quizzes.id IN (...) LIMIT ?"
+    )
+
+
+def test_normalize_sql_collapses_multi_row_inserts():
+    sql = normalize_sql("INSERT INTO t (a, b) VALUES ($1, $2), ($3, $4), ($5, $6)")
+
+    assert sql == "INSERT INTO t (a, b) VALUES (...)"
+
+
+def test_parameters_shape_hides_values():
+    assert parameters_shape((1, "secret", None), False) == "(int, str, NoneType)"
+    assert parameters_shape({"email": "a@b.c"}, False) == "{email: str}"
+    assert parameters_shape([(1, "a"), (2, "b")], True) == "2 x (int, str)"
+
+
+@pytest.mark.asyncio
+async def test_record_aggregates_by_statement_and_route():
+    log = make_log(explain_sample_rate=0)
+    stats = QueryStats({"route": SimpleNamespace(path="/quizzes/{id}")})
+    token = current_query_stats.set(stats)
+    try:
+        log.record(None, "SELECT * FROM quizzes WHERE id = $1", (1,), False, 0.02)
+        log.record(None, "SELECT * FROM quizzes  WHERE id = $1", (2,), False, 0.3)
+    finally:
+        current_query_stats.reset(token)
+    log.record(None, "SELECT 1", (), False, 0.01)
+
+    top = log.top(5)
+
+    assert top[0]["sql"] == "SELECT * FROM quizzes WHERE id = $1"
+    assert top[0]["calls"] == 2
+    assert top[0]["slow_calls"] == 1
+    assert top[0]["max_seconds"] == 0.3
+    assert top[0]["routes"] == {"/quizzes/{id}": 2}
+    assert top[0]["parameters"] == "(int)"
+    assert top[1]["routes"] == {"background": 1}
+
+
+def test_record_evicts_cheapest_statement_when_full():
+    log = make_log(max_statements=2)
+
+    log.record(None, "SELECT a FROM t", (), False, 0.05)
+    log.record(None, "SELECT b FROM t", (), False, 0.01)
+    log.record(None, "SELECT c FROM t", (), False, 0.02)
+
+    assert [stats["sql"] for stats in log.top(5)] == [
+        "SELECT a FROM t",
+        "SELECT c FROM t",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_slow_select_is_explained_once():
+    log = make_log()
+
+    with patch.object(log, "explain") as explain:
+        log.record("engine", "SELECT * FROM quizzes", (), False, 0.5)
+        log.record("engine", "SELECT * FROM quizzes", (), False, 0.5)
+
+    explain.assert_called_once()
+    assert explain.call_args.args[0] == "engine"
+
+
+@pytest.mark.asyncio
+async def test_writes_and_locking_reads_are_not_explained():
+    log = make_log()
+
+    with patch.object(log, "explain") as explain:
+        log.record(None, "UPDATE quizzes SET title = $1", ("x",), False, 0.5)
+        log.record(None, "DELETE FROM quizzes WHERE id = $1", (1,), False, 0.5)
+        log.record(None, "SELECT * FROM users WHERE id = $1 FOR UPDATE", (1,), False, 1)
+
+    explain.assert_not_called()
+    assert all(stats["slow_calls"] == 1 for stats in log.top(5))
+
+
+def test_only_selects_calling_pure_functions_are_analyzed():
+    assert can_analyze(
+        "SELECT quizzes.id, count(favourites.quiz_id) AS favourites FROM quizzes "
+        "LEFT OUTER JOIN favourites ON favourites.quiz_id = quizzes.id "
+        "WHERE lower(quizzes.title) LIKE $1 AND quizzes.id IN ($2, $3) "
+        "GROUP BY quizzes.id"
+    )
+    assert not can_analyze("SELECT pg_try_advisory_lock($1, $2)")
+    assert not can_analyze("SELECT pg_advisory_unlock($1::INTEGER, $2::INTEGER)")
+    assert not can_analyze("SELECT nextval('quizzes_id_seq')")
+
+
+@pytest.mark.asyncio
+async def test_explain_runs_plain_explain_for_function_calls():
+    conn = AsyncMock()
+    conn.execution_options = AsyncMock(return_value=conn)
+    conn.exec_driver_sql.return_value = MagicMock(scalar=MagicMock(return_value="[]"))
+    conn.begin = MagicMock()
+    conn.begin.return_value.__aenter__.return_value = AsyncMock()
+    engine = MagicMock()
+    engine.connect.return_value.__aenter__.return_value = conn
+    log = make_log()
+    stats = StatementStats("SELECT pg_try_advisory_lock(?, ?)")
+
+    await log.explain(engine, stats, "SELECT pg_try_advisory_lock($1, $2)", (1, 0))
+
+    explain_sql = conn.exec_driver_sql.call_args_list[-1].args[0]
+    assert explain_sql.startswith("EXPLAIN (FORMAT JSON) ")
+    assert stats.explain == []
+    assert stats.analyzed is False
@@ -0,0 +1,42 @@
+import subprocess
+import sys
+
+from app.scripts.import_report import import_costs_by_package, parse_import_times
+from app.startup import HEAVY_MODULES
+
+IMPORT_TIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     sqlalchemy.util
+import time:       300 |        420 |   sqlalchemy
+import time:        80 |        500 | app.main
+"""
+
+
+def test_parse_import_times():
+    costs = parse_import_times(IMPORT_TIME_OUTPUT.splitlines())
+
+    assert [cost.module for cost in costs] == [
+        "sqlalchemy.util",
+        "sqlalchemy",
+        "app.main",
+    ]
+    assert costs[1].self_us == 300
+    assert costs[2].cumulative_us == 500
+    assert import_costs_by_package(costs) == {"sqlalchemy": 420, "app": 80}
+
+
+def test_app_import_does_not_load_heavy_modules():
+    packages = sorted({name.partition(".")[0] for name in HEAVY_MODULES})
+    process = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, app.main; "
+            f"print([name for name in {packages!r} if name in sys.modules])",
+        ],
+        capture_output=True,
+        text=True,
+    )
+
+    assert process.returncode == 0, process.stderr
+    assert process.stdout.strip() == "[]"
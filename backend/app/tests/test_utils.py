@@ -0,0 +1,22 @@
+import time
+
+import pytest
+from app.utils import PasswordHashingPool
+
+
+@pytest.mark.asyncio
+async def test_password_pool_runs_job_and_records_latency():
+    pool = PasswordHashingPool(max_workers=1, max_queue=0)
+
+    def slow_upper(value):
+        time.sleep(0.01)
+        return value.upper()
+
+    result = await pool.run(slow_upper, "secret")
+
+    stats = pool.stats()
+    assert result == "SECRET"
+    assert stats["completed"] == 1
+    assert stats["in_flight"] == 0
+    assert stats["run_seconds_total"] >= 0.01
+    pool.executor.shutdown()
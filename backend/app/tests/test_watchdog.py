@@ -0,0 +1,55 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from app.watchdog import (
+    LOOP_STALL_SECONDS,
+    LOOP_STALLS,
+    LoopWatchdog,
+    request_scopes,
+)
+
+
+def block_the_loop(seconds: float):
+    time.sleep(seconds)
+
+
+@pytest.mark.asyncio
+async def test_watchdog_reports_blocking_call_with_route(caplog):
+    watchdog = LoopWatchdog(threshold_seconds=0.05, interval_seconds=0.01)
+    watchdog.start()
+
+    async def handler():
+        request_scopes[asyncio.current_task()] = {
+            "route": SimpleNamespace(path="/quizzes/{id}")
+        }
+        await asyncio.sleep(0.03)
+        block_the_loop(0.2)
+        await asyncio.sleep(0.03)
+
+    try:
+        await asyncio.create_task(handler())
+    finally:
+        await watchdog.stop()
+
+    labels = ("/quizzes/{id}", "app/tests/test_watchdog.py:block_the_loop")
+    assert LOOP_STALLS.labels(*labels).value == 1
+    stall = LOOP_STALL_SECONDS.labels(*labels)
+    assert stall.count == 1
+    assert stall.sum >= 0.1
+    assert "block_the_loop" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_watchdog_ignores_short_callbacks():
+    watchdog = LoopWatchdog(threshold_seconds=0.2, interval_seconds=0.01)
+    watchdog.start()
+    try:
+        for _ in range(5):
+            block_the_loop(0.01)
+            await asyncio.sleep(0.01)
+    finally:
+        await watchdog.stop()
+
+    assert watchdog.reported_beat is None
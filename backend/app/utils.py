@@ -1,10 +1,16 @@
+import asyncio
+import io
+import math
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from fastapi import Depends, HTTPException, status
 from passlib.context import CryptContext
 
-from app.models.user_models import User
-from app.oauth2 import get_current_user
+from app.exceptions.admission_exceptions import CapacityExceededException
+from app.oauth2 import AuthenticatedUser, get_current_user
+from app.settings.config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -17,6 +23,85 @@ def verify(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 
+class PasswordHashingPool:
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="password-hashing"
+        )
+        self.in_flight = 0
+        self.completed = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.rejected = 0
+
+    def retry_after(self) -> int:
+        average_run = self.run_seconds / self.completed if self.completed else 0.1
+        backlog = self.in_flight - self.max_workers + 1
+        return max(1, math.ceil(backlog * average_run / self.max_workers))
+
+    async def run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        if self.in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise CapacityExceededException(self.retry_after())
+
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            result = func(*args)
+            return result, started, time.perf_counter()
+
+        self.in_flight += 1
+        try:
+            result, started, finished = await loop.run_in_executor(self.executor, job)
+        finally:
+            self.in_flight -= 1
+
+        self.completed += 1
+        self.wait_seconds += started - submitted
+        self.run_seconds += finished - started
+        self.max_wait_seconds = max(self.max_wait_seconds, started - submitted)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - self.max_workers),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_seconds_total": self.wait_seconds,
+            "run_seconds_total": self.run_seconds,
+            "max_wait_seconds": self.max_wait_seconds,
+        }
+
+
+password_pool = PasswordHashingPool(
+    settings.password_hash_workers, settings.password_hash_max_queue
+)
+
+
+class ZipStream(io.RawIOBase):
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
 def split_text(text: str, max_chunk_length: int):
     sentences = re.split(r"(?<=[.!?]) +", text)
 
@@ -66,7 +151,9 @@ def smart_split(text, max_length):
     return lines
 
 
-async def require_admin(current_user: User = Depends(get_current_user)) -> User:
+async def require_admin(
+    current_user: AuthenticatedUser = Depends(get_current_user),
+) -> AuthenticatedUser:
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
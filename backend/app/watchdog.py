@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+from typing import Optional, Tuple
+
+from app.metrics import registry, route_path
+from app.settings.config import settings
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LOOP_LAG_SECONDS = registry.histogram(
+    "event_loop_lag_seconds", "How late the event loop heartbeat ran"
+)
+LOOP_STALLS = registry.counter(
+    "event_loop_stalls_total",
+    "Times the event loop was blocked longer than the stall threshold",
+    ["route", "location"],
+)
+LOOP_STALL_SECONDS = registry.histogram(
+    "event_loop_stall_seconds",
+    "How long the event loop stayed blocked, per stall",
+    ["route", "location"],
+)
+
+# Filled in by the metrics middleware so a stall can be attributed to a route.
+request_scopes: "weakref.WeakKeyDictionary[asyncio.Task, dict]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def stall_location(frame) -> str:
+    code = frame.f_code
+    while frame is not None:
+        path = os.path.abspath(frame.f_code.co_filename)
+        if path.startswith(APP_DIR + os.sep):
+            relative = os.path.relpath(path, os.path.dirname(APP_DIR))
+            return f"{relative}:{frame.f_code.co_name}"
+        frame = frame.f_back
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class LoopWatchdog:
+    """Detects callbacks that block the event loop.
+
+    A heartbeat coroutine records when the loop last got to run it. A thread
+    checks the heartbeat and, once it is older than the threshold, captures the
+    loop thread's stack while the blocking call is still on it.
+    """
+
+    def __init__(self, threshold_seconds: float, interval_seconds: float):
+        self.threshold_seconds = threshold_seconds
+        self.interval_seconds = interval_seconds
+        self.last_beat = time.monotonic()
+        self.reported_beat: Optional[float] = None
+        self.stall_labels: Optional[Tuple[str, str]] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self._stopped.clear()
+        self._heartbeat = asyncio.create_task(self.heartbeat())
+        self._thread = threading.Thread(target=self.watch, daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stopped.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            await asyncio.gather(self._heartbeat, return_exceptions=True)
+        if self._thread is not None:
+            self._thread.join()
+
+    async def heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval_seconds
+            await asyncio.sleep(self.interval_seconds)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            LOOP_LAG_SECONDS.observe(lag)
+
+            stalled_beat = self.last_beat
+            self.last_beat = now
+            if self.reported_beat == stalled_beat and self.stall_labels is not None:
+                LOOP_STALL_SECONDS.labels(*self.stall_labels).observe(lag)
+                logger.warning(
+                    f"Event loop was blocked for {lag * 1000:.0f}ms "
+                    f"in {self.stall_labels[0]} ({self.stall_labels[1]})"
+                )
+                self.stall_labels = None
+
+    def watch(self):
+        while not self._stopped.wait(self.interval_seconds / 2):
+            beat = self.last_beat
+            if time.monotonic() - beat < self.threshold_seconds:
+                continue
+            if self.reported_beat == beat:
+                continue
+
+            self.reported_beat = beat
+            self.report_stall(time.monotonic() - beat)
+
+    def current_route(self) -> str:
+        # The loop's running task, read from another thread; racy but it only
+        # labels a stall that is still in progress.
+        current_tasks = getattr(asyncio.tasks, "_current_tasks", {})
+        task = current_tasks.get(self.loop)
+        if task is None:
+            return "none"
+        scope = request_scopes.get(task)
+        return route_path(scope) if scope is not None else "background"
+
+    def report_stall(self, blocked_seconds: float):
+        frame = sys._current_frames().get(self.loop_thread_id)
+        if frame is None:
+            return
+
+        route = self.current_route()
+        location = stall_location(frame)
+        self.stall_labels = (route, location)
+        LOOP_STALLS.labels(route, location).inc()
+
+        stack = "".join(traceback.format_stack(frame))
+        logger.warning(
+            f"Event loop blocked for over {blocked_seconds * 1000:.0f}ms "
+            f"in {route} at {location}\n{stack}"
+        )
+
+
+loop_watchdog = LoopWatchdog(
+    settings.loop_stall_threshold_ms / 1000, settings.loop_heartbeat_interval_ms / 1000
+)
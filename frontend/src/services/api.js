@@ -52,13 +52,13 @@ export const authAPI = {
 
 // ===== QUIZZES =====
 export const quizAPI = {
-  getAll: (limit = 100, skip = 0, search = '') =>
-    api.get('/quizzes', { params: { limit, skip, search } }),
-  getMyQuizzes: (limit = 100, skip = 0, search = '') =>
-    api.get('/quizzes/my_quizzes', { params: { limit, skip, search } }),
-  getMyFavouriteQuizzes: (limit = 100, skip = 0, search = '') =>
-    api.get('/quizzes/my_favourite_quizzes', { params: { limit, skip, search } }),
-  getById: id => api.get(`/quizzes/${id}`),
+  getAll: (limit = 100, skip = 0, search = '', fields) =>
+    api.get('/quizzes', { params: { limit, skip, search, fields } }),
+  getMyQuizzes: (limit = 100, skip = 0, search = '', fields) =>
+    api.get('/quizzes/my_quizzes', { params: { limit, skip, search, fields } }),
+  getMyFavouriteQuizzes: (limit = 100, skip = 0, search = '', fields) =>
+    api.get('/quizzes/my_favourite_quizzes', { params: { limit, skip, search, fields } }),
+  getById: (id, fields) => api.get(`/quizzes/${id}`, { params: { fields } }),
   getQuestions: id => api.get(`/quizzes/play/${id}`),
   create: async (file, title, published = true, total_questions = 20) => {
     const formData = new FormData()
@@ -103,7 +103,15 @@ export const userAPI = {
 
 // ===== ADMIN =====
 export const adminAPI = {
-  getAllUsers: () => api.get('/users'),
+  getUsers: (limit = 50, afterId = null, emailPrefix = '') =>
+    api.get('/users', {
+      params: { limit, after_id: afterId ?? undefined, email_prefix: emailPrefix || undefined },
+    }),
+  exportUsers: (emailPrefix = '') =>
+    api.get('/users', {
+      params: { format: 'csv', email_prefix: emailPrefix || undefined },
+      responseType: 'blob',
+    }),
   deleteUser: userId => api.delete(`/users/${userId}`),
   getAllQuizzes: (limit = 1000, skip = 0) =>
     api.get('/quizzes', { params: { limit, skip, search: '' } }),